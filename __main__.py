@@ -4,12 +4,15 @@ import sys
 from manga.updateAnilistIds import UpdateTrackerIds
 from manga.missingChapters import CheckGapsInChapters
 from manga.checkForUpdates import CheckForUpdates
+from manga.refreshMetadata import RefreshMetadata
 from mainRunner import MainRunner
+from watchRunner import WatchRunner
 import datetime
 from appContainer import ApplicationContainer
 import configparser
 
 from manga.checkMissingSQL import CheckMissingChaptersInSQL
+from manga.gateways.anilist import AnilistGateway
 
 
 def main(
@@ -18,6 +21,9 @@ def main(
     checkMissingChapters: CheckGapsInChapters,
     updateTrackerIds: UpdateTrackerIds,
     checkForUpdates: CheckForUpdates,
+    tracker: AnilistGateway,
+    watchRunner: WatchRunner,
+    refreshMetadata: RefreshMetadata,
 ):
     parser = argparse.ArgumentParser(
         ("Running without arguments does the normal program execution, "
@@ -33,7 +39,9 @@ def main(
         action="store_true",
         help=("Prints missing chapters from downloaded series."
               "This checks all series, while normal execution"
-              " only checks those updated"),
+              " only checks those updated. Only series whose chapters"
+              " changed since the last check are recomputed,"
+              " --force recomputes all of them"),
     )
     parser.add_argument(
         "--mangaUpdates",
@@ -56,17 +64,43 @@ def main(
         help=("May ask for user interaction"
               "at times where the program would otherwise stop"),
     )
+    parser.add_argument(
+        "--rescan",
+        action="store_true",
+        help=("Lists every source folder again, "
+              "instead of only those that changed since the last run"),
+    )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help=("Keeps running, processing chapters as soon as they're downloaded "
+              "instead of waiting for the next run"),
+    )
+    parser.add_argument(
+        "--refreshMetadata",
+        action="store_true",
+        help=("Updates ComicInfo.xml in every archive with the current "
+              "Anilist data of its series. Pages aren't rewritten"),
+    )
+    parser.add_argument(
+        "--offline",
+        action="store_true",
+        help=("Only uses Anilist responses cached by previous runs. "
+              "Nothing that isn't cached is requested"),
+    )
 
     args = parser.parse_args()
     print(args)
 
+    tracker.offline = args.offline
+
     if args.checkMissingSQL:
         checkMissingSQL.execute(fixAfter=args.force)
         return
 
     if args.checkMissingChapters:
         date = datetime.datetime.utcfromtimestamp(0)
-        checkMissingChapters.getGapsFromChaptersSince(date)
+        checkMissingChapters.getGapsFromChaptersSince(date, full=args.force)
         return
 
     if args.mangaUpdates:
@@ -81,7 +115,15 @@ def main(
             print("Invalid number of arguments")
         return
 
-    mainRunner.execute(interactive=args.interactive)
+    if args.refreshMetadata:
+        refreshMetadata.execute()
+        return
+
+    if args.watch:
+        watchRunner.run(interactive=args.interactive)
+        return
+
+    mainRunner.execute(interactive=args.interactive, rescan=args.rescan)
     return
 
 
@@ -101,4 +143,7 @@ if __name__ == "__main__":
         application.manga.checkGapsInChapters,
         application.manga.updateTrackerIds,
         application.manga.checkForUpdates,
+        application.gateways.tracker,
+        application.watchRunner,
+        application.manga.refreshMetadata,
     )
@@ -2,6 +2,7 @@
 from manga.mangaContainer import MangaContainer
 from manga.gateways.gatewayContainer import GatewayContainer
 from mainRunner import MainRunner
+from watchRunner import WatchRunner
 
 
 class ApplicationContainer():
@@ -23,6 +24,14 @@ class ApplicationContainer():
             self.manga.deleteReadChapters,
             self.manga.calculateChapterName,
             self.manga.updateTrackerIds,
-            self.manga.createMetadata
+            self.manga.createMetadata,
+            self.config["manga"].getint("ingestworkers", fallback=1),
+            self.manga.sourceScanner,
+            self.gateways.jobJournal,
+        )
+        self.watchRunner = WatchRunner(
+            self.mainRunner,
+            self.config["manga"]["sourcefolder"],
+            self.config["manga"].getfloat("watchdebounce", fallback=30),
         )
         pass
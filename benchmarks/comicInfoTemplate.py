@@ -0,0 +1,80 @@
+"""Time to generate ComicInfo.xml for a batch of chapters,
+building the whole tree per chapter against the per-series template.
+
+Usage: python benchmarks/comicInfoTemplate.py [chapters] [series]
+"""
+import os
+import sys
+import time
+from pathlib import Path
+from unittest.mock import MagicMock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from manga.createMetadata3 import CreateMetadata3, buildComicInfo  # noqa: E402
+from models.anilistToComicInfo import AnilistComicInfo  # noqa: E402
+from models.manga import Chapter  # noqa: E402
+
+
+def seriesInfo(anilistId: int) -> AnilistComicInfo:
+    return AnilistComicInfo(
+        tracker_id=anilistId,
+        title=f"Series {anilistId}",
+        manga_format="MANGA",
+        status="RELEASING",
+        description="A long summary of the series. " * 20,
+        country_of_origin="JP",
+        original_source="ORIGINAL",
+        genres=["Action", "Adventure", "Comedy"],
+        writer="Writer",
+        penciller="Artist",
+        inker="Artist",
+        synonyms=f"Romaji {anilistId}",
+        is_adult=False,
+        site_url=f"https://anilist.co/manga/{anilistId}",
+        chapters=None,
+        volumes=None,
+        tags=[f"Theme: Tag {number}" for number in range(10)],
+    )
+
+
+def main():
+    chapterCount = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    seriesCount = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    library = dict(
+        (anilistId, seriesInfo(anilistId)) for anilistId in range(seriesCount)
+    )
+    chapters = [
+        Chapter(number % seriesCount, "folder", str(number),
+                f"Series {number % seriesCount}",
+                Path("/source"), Path("/archive"), "Group", "2021")
+        for number in range(chapterCount)
+    ]
+
+    start = time.perf_counter()
+    fullTree = [
+        buildComicInfo(library[chapter.anilistId], chapter.chapterName,
+                       chapter.chapterNumber, str(chapter.year), chapter.scan_info)
+        for chapter in chapters
+    ]
+    fullTreeTime = time.perf_counter() - start
+
+    anilist = MagicMock()
+    anilist.search_media_by_id = library.get
+    filesystem = MagicMock()
+    templated = []
+    filesystem.saveFile = lambda stringData, filepath: templated.append(stringData)
+    sut = CreateMetadata3(filesystem, anilist)
+    start = time.perf_counter()
+    for chapter in chapters:
+        sut.execute(chapter)
+    templateTime = time.perf_counter() - start
+
+    assert templated == fullTree, "outputs differ"
+    print(f"{chapterCount} chapters of {seriesCount} series")
+    print(f"full tree: {fullTreeTime:.3f}s")
+    print(f"template:  {templateTime:.3f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""Peak RSS of a synthetic library held in memory,
+with the slotted models against plain classes like the ones they replaced.
+
+Usage: python benchmarks/modelMemory.py [chapters]
+"""
+import os
+import resource
+import subprocess
+import sys
+from pathlib import Path
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.manga import Chapter  # noqa: E402
+from models.tracker import TrackerSeries  # noqa: E402
+
+CHAPTERS_PER_SERIES = 50
+
+
+class PlainChapter:
+    def __init__(self, anilistId, seriesName, chapterNumber, chapterName,
+                 sourcePath, archivePath, scan_info="", year="2021"):
+        self.anilistId = anilistId
+        self.seriesName = seriesName
+        self.chapterNumber = chapterNumber
+        self.chapterName = chapterName
+        self.sourcePath = sourcePath
+        self.archivePath = archivePath
+        self.scan_info = scan_info
+        self.year = year
+
+    def __hash__(self):
+        return hash(self.anilistId) + hash(self.chapterNumber)
+
+
+class PlainTrackerSeries:
+    def __init__(self, tracker_id, titles, status, chapters, country_of_origin,
+                 progress):
+        self.tracker_id = tracker_id
+        self.titles = titles
+        self.status = status
+        self.chapters = chapters
+        self.country_of_origin = country_of_origin
+        self.progress = progress
+
+
+def peakRssKb() -> int:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def buildLibrary(chapterCount: int, chapterType, seriesType):
+    series = []
+    chapters = []
+    for anilistId in range(chapterCount // CHAPTERS_PER_SERIES):
+        name = f"Series {anilistId}"
+        series.append(seriesType(anilistId, [name, f"{name} alt"], "RELEASING",
+                                 None, "JP", 0))
+        for number in range(CHAPTERS_PER_SERIES):
+            source = Path(f"/source/lang/src/{name}/Ch {number}")
+            archive = Path(f"/archive/lang/src/{name}/Ch {number}.cbz")
+            chapters.append(chapterType(anilistId, name, str(number), name,
+                                        source, archive, "scan", "2021"))
+    return series, chapters
+
+
+def measure(variant: str, chapterCount: int):
+    before = peakRssKb()
+    if variant == "slotted":
+        library = buildLibrary(chapterCount, Chapter, TrackerSeries)
+    else:
+        library = buildLibrary(chapterCount, PlainChapter, PlainTrackerSeries)
+    # Hashing every chapter, like the sets of new chapters do
+    unique = set(library[1])
+    print(f"{variant}: {peakRssKb() - before} KiB peak RSS growth "
+          f"for {len(unique)} chapters")
+
+
+def main():
+    chapterCount = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    if len(sys.argv) > 2:
+        measure(sys.argv[2], chapterCount)
+        return
+    # A fresh process each, so one variant's peak doesn't hide the other's
+    for variant in ["plain", "slotted"]:
+        subprocess.run([sys.executable, __file__, str(chapterCount), variant],
+                       check=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+import queue
+import threading
+from typing import Any, Callable, Iterable, List, Optional
+from cross.decorators import Logger
+
+_DONE = object()
+
+
+class Stage:
+    """One step of a Pipeline.
+    func receives an item and returns the item for the next stage,
+    or None to drop it"""
+
+    def __init__(self, name: str, func: Callable[[Any], Any], workers: int = 1):
+        self.name = name
+        self.func = func
+        self.workers = max(1, workers)
+
+
+@Logger
+class Pipeline:
+    """Runs items through a chain of stages. Every stage has its own thread(s)
+    and stages are connected by bounded queues, so a slow stage
+    holds back the ones feeding it instead of piling up work in memory.
+
+    The first exception raised by any stage stops the pipeline
+    and is re-raised from run()"""
+
+    def __init__(self, stages: List[Stage], queueSize: int = 8) -> None:
+        self.stages = stages
+        self.queueSize = queueSize
+
+    def run(self, items: Iterable) -> List:
+        """Feeds items from the calling thread, so the source iterable
+        can safely use resources bound to it (e.g. the sqlite connection).
+        Returns the outputs of the last stage"""
+        self.__error: Optional[BaseException] = None
+        self.__stop = threading.Event()
+        results = []
+
+        queues = [queue.Queue(self.queueSize) for _ in self.stages]
+        threads = []
+        for index, stage in enumerate(self.stages):
+            inbox = queues[index]
+            outbox = queues[index + 1] if index + 1 < len(queues) else None
+            nextWorkers = (
+                self.stages[index + 1].workers if outbox is not None else 0
+            )
+            remaining = [stage.workers]
+            lock = threading.Lock()
+            for number in range(stage.workers):
+                thread = threading.Thread(
+                    target=self.__work,
+                    args=(stage, inbox, outbox, nextWorkers, remaining, lock, results),
+                    name=f"{stage.name}-{number}",
+                    daemon=True,
+                )
+                thread.start()
+                threads.append(thread)
+
+        try:
+            for item in items:
+                if self.__stop.is_set():
+                    break
+                queues[0].put(item)
+        except BaseException as thrown_exception:
+            self.__fail(thrown_exception)
+        finally:
+            for _ in range(self.stages[0].workers):
+                queues[0].put(_DONE)
+            for thread in threads:
+                thread.join()
+
+        if self.__error is not None:
+            raise self.__error
+        return results
+
+    def stop(self):
+        """Stops feeding new items. Items already queued are dropped"""
+        self.__stop.set()
+
+    def __fail(self, thrown_exception: BaseException):
+        if self.__error is None:
+            self.__error = thrown_exception
+        self.__stop.set()
+
+    def __work(self, stage, inbox, outbox, nextWorkers, remaining, lock, results):
+        while True:
+            item = inbox.get()
+            if item is _DONE:
+                break
+            if self.__stop.is_set():
+                continue
+            try:
+                output = stage.func(item)
+            except BaseException as thrown_exception:
+                self.logger.error(f"Stage {stage.name} failed")
+                self.__fail(thrown_exception)
+                continue
+            if output is None:
+                continue
+            if outbox is None:
+                results.append(output)
+            else:
+                outbox.put(output)
+
+        with lock:
+            remaining[0] -= 1
+            isLast = remaining[0] == 0
+        if isLast and outbox is not None:
+            for _ in range(nextWorkers):
+                outbox.put(_DONE)
@@ -0,0 +1,200 @@
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import time
+from typing import Dict, List, Optional, Set, Tuple
+from cross.decorators import Logger
+
+# From <sys/inotify.h>
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = IN_CREATE | IN_MOVED_TO | IN_CLOSE_WRITE | IN_MODIFY | IN_ONLYDIR
+EVENT_HEADER = struct.Struct("iIII")
+
+
+def _visibleDirs(path: str) -> List[str]:
+    try:
+        with os.scandir(path) as entries:
+            return [
+                entry.path
+                for entry in entries
+                if not entry.name.startswith(".") and entry.is_dir()
+            ]
+    except OSError:
+        return []
+
+
+def _foldersAtDepth(root: str, depth: int) -> List[str]:
+    folders = [root]
+    for _ in range(depth):
+        folders = [child for folder in folders for child in _visibleDirs(folder)]
+    return folders
+
+
+class Debouncer:
+    """Holds back paths until nothing happened to them for quietSeconds"""
+
+    def __init__(self, quietSeconds: float, clock=time.monotonic) -> None:
+        self.quietSeconds = quietSeconds
+        self.clock = clock
+        self.lastSeen: Dict[str, float] = {}
+
+    def touch(self, path: str):
+        self.lastSeen[path] = self.clock()
+
+    def popDue(self) -> List[str]:
+        """Paths that have been quiet long enough, oldest first"""
+        now = self.clock()
+        due = [
+            path
+            for path, seen in sorted(self.lastSeen.items(), key=lambda x: x[1])
+            if now - seen >= self.quietSeconds
+        ]
+        for path in due:
+            del self.lastSeen[path]
+        return due
+
+    def timeUntilDue(self) -> Optional[float]:
+        """None when nothing is waiting"""
+        if not self.lastSeen:
+            return None
+        oldest = min(self.lastSeen.values())
+        return max(0.0, oldest + self.quietSeconds - self.clock())
+
+
+class WatcherInterface:
+    """Reports the folders `depth` levels under root with activity in them"""
+
+    def read(self, timeout: Optional[float]) -> List[str]:
+        """Blocks up to timeout seconds (forever if None) for activity"""
+        pass
+
+    def close(self):
+        pass
+
+
+@Logger
+class InotifyWatcher(WatcherInterface):
+    """Watches every folder down to `depth` levels under root with inotify.
+    Folders created later are watched as they appear"""
+
+    def __init__(self, root: str, depth: int) -> None:
+        self.root = os.path.normpath(root)
+        self.depth = depth
+        libcName = ctypes.util.find_library("c") or "libc.so.6"
+        self.libc = ctypes.CDLL(libcName, use_errno=True)
+        self.fd = self.libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno))
+        # watch descriptor -> (folder, depth)
+        self.watches: Dict[int, Tuple[str, int]] = {}
+        self.__watchTree(self.root, 0)
+
+    def __watchTree(self, folder: str, depth: int) -> List[str]:
+        """Watches folder and everything under it.
+        Returns the folders at self.depth found on the way"""
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(folder), WATCH_MASK)
+        if wd < 0:
+            # Removed before we got to it, or not a folder
+            return []
+        self.watches[wd] = (folder, depth)
+        if depth == self.depth:
+            return [folder]
+        found = []
+        for child in _visibleDirs(folder):
+            found += self.__watchTree(child, depth + 1)
+        return found
+
+    def read(self, timeout: Optional[float]) -> List[str]:
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return []
+        try:
+            buffer = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+
+        active: Set[str] = set()
+        offset = 0
+        while offset < len(buffer):
+            wd, mask, _, length = EVENT_HEADER.unpack_from(buffer, offset)
+            offset += EVENT_HEADER.size
+            name = os.fsdecode(buffer[offset:offset + length].rstrip(b"\0"))
+            offset += length
+
+            if mask & IN_Q_OVERFLOW:
+                self.logger.warning("Missed filesystem events. Rescanning")
+                active.update(_foldersAtDepth(self.root, self.depth))
+                continue
+            if mask & IN_IGNORED:
+                self.watches.pop(wd, None)
+                continue
+            watched = self.watches.get(wd)
+            if watched is None:
+                continue
+            folder, depth = watched
+            if depth == self.depth:
+                active.add(folder)
+            elif name and not name.startswith(".") and mask & IN_ISDIR:
+                active.update(self.__watchTree(os.path.join(folder, name), depth + 1))
+        return sorted(active)
+
+    def close(self):
+        os.close(self.fd)
+
+
+class PollingWatcher(WatcherInterface):
+    """Fallback for systems without inotify.
+    Compares the folders' mtimes every interval seconds"""
+
+    def __init__(self, root: str, depth: int, interval: float = 5.0) -> None:
+        self.root = os.path.normpath(root)
+        self.depth = depth
+        self.interval = interval
+        self.seen = self.__snapshot()
+        self.lastPoll = time.monotonic()
+
+    def __snapshot(self) -> Dict[str, int]:
+        snapshot = {}
+        for folder in _foldersAtDepth(self.root, self.depth):
+            try:
+                snapshot[folder] = os.stat(folder).st_mtime_ns
+            except OSError:
+                continue
+        return snapshot
+
+    def read(self, timeout: Optional[float]) -> List[str]:
+        time.sleep(self.interval if timeout is None else min(timeout, self.interval))
+        if time.monotonic() - self.lastPoll < self.interval:
+            return []
+        self.lastPoll = time.monotonic()
+        current = self.__snapshot()
+        active = [
+            folder
+            for folder, mtime in current.items()
+            if self.seen.get(folder) != mtime
+        ]
+        self.seen = current
+        return sorted(active)
+
+
+def createWatcher(root: str, depth: int) -> WatcherInterface:
+    try:
+        return InotifyWatcher(root, depth)
+    except (OSError, AttributeError) as thrown_exception:
+        InotifyWatcher.logger.warning(
+            f"inotify unavailable ({thrown_exception}). Polling instead"
+        )
+        return PollingWatcher(root, depth)
@@ -1,10 +1,11 @@
 import datetime
-import glob
+import os
 import re
 import html
-from typing import List, Optional, Set
+from typing import Iterable, Iterator, List, Optional, Set, Tuple
 from pathlib import Path
 from cross.decorators import Logger
+from cross.pipeline import Pipeline, Stage
 from manga.updateAnilistIds import UpdateTrackerIds
 from manga.mangagetchapter import CalculateChapterName
 from manga.deleteReadAnilist import DeleteReadChapters
@@ -13,6 +14,8 @@ from manga.createMetadata import CreateMetadataInterface
 from manga.gateways.pushover import PushServiceInterface
 from manga.gateways.database import DatabaseGateway
 from manga.gateways.filesystem import FilesystemInterface
+from manga.gateways.jobJournal import JobJournalInterface
+from manga.sourceScanner import SourceScanner
 from models.manga import Chapter, MissingChapter
 
 
@@ -23,6 +26,9 @@ from models.manga import Chapter, MissingChapter
 
 @Logger
 class MainRunner:
+    # Chapters whose Anilist data is prefetched together, one Anilist page
+    PREFETCH_BATCH = 50
+
     def __init__(
         self,
         sourceFolder: str,
@@ -35,6 +41,9 @@ class MainRunner:
         calcChapterName: CalculateChapterName,
         updateTrackerIds: UpdateTrackerIds,
         createMetadata: CreateMetadataInterface,
+        workers: int = 1,
+        sourceScanner: Optional[SourceScanner] = None,
+        jobJournal: Optional[JobJournalInterface] = None,
     ) -> None:
         self.database = database
         self.pushNotification = push
@@ -46,66 +55,26 @@ class MainRunner:
         self.calcChapterName = calcChapterName
         self.updateTrackerIds = updateTrackerIds
         self.createMetadata = createMetadata
+        self.workers = workers
+        self.sourceScanner = (
+            sourceScanner
+            if sourceScanner is not None
+            else SourceScanner(database, sourceFolder)
+        )
+        self.jobJournal = (
+            jobJournal if jobJournal is not None else JobJournalInterface()
+        )
+        self.jobsRecovered = False
 
-    def execute(self, interactive=False):
+    def execute(self, interactive=False, rescan=False):
         try:
-            new_chapters: Set[Chapter] = set()
             dateScriptStart = datetime.datetime.now()
-            # Globs chapters
-            for chapterPathStr in glob.iglob(f"{self.sourceFolder}/*/*/*/*"):
-                self.logger.info(f"Parsing: {chapterPathStr}")
-                # Inferring information from files
-                chapterPath = Path(chapterPathStr)
-
-                chapterName = html.unescape(chapterPath.name)
-                seriesName = html.unescape(chapterPath.parent.name)
-
-                regexParseResults = self.calcChapterName.calc_from_filename(chapterName)
-                if regexParseResults is None:
-                    self.logger.debug(f"{chapterPathStr} does not have a valid filename. Quarantining...")
-                    self.filesystem.simple_quarantine(chapterPathStr)
-                    continue
-
-                [chapter_name, chapter_number, year, scan_info] = regexParseResults
-                anilistId = self.database.getAnilistIDForSeries(chapter_name)
-                # chapterNumber = self.calcChapterName.execute(chapterName, anilistId)
-
-                estimatedArchivePath = self.generate_simple_archive_path(chapterPathStr)
-
-                chapterData = Chapter(
-                    anilistId,
-                    seriesName,
-                    chapter_number,
-                    chapter_name,
-                    chapterPath,
-                    estimatedArchivePath,
-                    scan_info,
-                    year
-                )
-                self.logger.debug(f"Already had tracker ID: {anilistId}")
-
-                isChapterOnDB = self.database.doesExistChapterAndAnilist(
-                    anilistId, chapter_number
-                )
-                if not anilistId or anilistId is None:
-                    foundAnilistId = self.findAnilistIdForSeries(
-                        chapter_name, interactive=interactive
-                    )
-                    estimatedArchivePath = self.generate_simple_archive_path(chapterPathStr)
-                    chapterData.archivePath = estimatedArchivePath
-                    if not foundAnilistId or foundAnilistId is None:
-                        self.logger.error(f"No anilistId for {chapterData.seriesName}")
-                        return
-                    chapterData.anilistId = foundAnilistId
-                if not isChapterOnDB:
-                    self.setupMetadata(chapterData)
-                    self.compressChapter(chapterData)
-                    # self.insertInDatabase(chapterData)
-                    new_chapters.add(chapterData)
-                    self.filesystem.deleteFolder(location=chapterPathStr)
-                else:
-                    self.logger.info("Source exists but chapter's already in db")
-                    # self.filesystem.deleteFolder(location=chapterPathStr)
+            # Only folders that changed since the last run
+            chapterPaths = self.sourceScanner.scan(rescan=rescan)
+            new_chapters = self.__ingest(chapterPaths, interactive=interactive)
+            for chapter in new_chapters:
+                self.sourceScanner.markDone(str(chapter.sourcePath))
+            self.sourceScanner.commit()
             # deleted_chapters = self.deleteReadChapters.execute()
             # for deleted_chapter in deleted_chapters:
             #     if deleted_chapter in new_chapters:
@@ -119,6 +88,180 @@ class MainRunner:
             self.logger.error(str(thrown_exception))
             # self.send_error(thrown_exception)
 
+    def executeFor(self, chapterPaths: Iterable[str], interactive=False):
+        """Processes only the given chapter folders, as watch mode sees them"""
+        try:
+            existing = [path for path in chapterPaths if os.path.isdir(path)]
+            self.__ingest(existing, interactive=interactive)
+        except Exception as thrown_exception:
+            self.logger.error("Exception thrown")
+            self.logger.error(str(thrown_exception))
+
+    def __ingest(self, chapterPaths: Iterable[str], interactive=False) -> Set[Chapter]:
+        if not self.jobsRecovered:
+            # Chapters a killed run left half done are processed again
+            chapterPaths = [*self.__recoverJobs(), *chapterPaths]
+            self.jobsRecovered = True
+        storedChapters = self.database.getActiveChapterKeys()
+        # Chapters are found as the pipeline asks for them,
+        # so discovery overlaps with archiving the ones found before
+        chapters = self.__prefetchAhead(
+            self.__resolveChapters(
+                dict.fromkeys(str(Path(x)) for x in chapterPaths),
+                storedChapters,
+                interactive=interactive,
+            )
+        )
+        if self.workers > 1:
+            return self.__processPipelined(chapters)
+        return self.__processSerially(chapters)
+
+    def __prefetchAhead(self, chapters: Iterable[Chapter]) -> Iterator[Chapter]:
+        """Yields chapters, prefetching their metadata PREFETCH_BATCH at a time"""
+        batch: List[Chapter] = []
+        for chapter in chapters:
+            batch.append(chapter)
+            if len(batch) >= self.PREFETCH_BATCH:
+                self.createMetadata.prefetch(batch)
+                yield from batch
+                batch = []
+        if batch:
+            self.createMetadata.prefetch(batch)
+            yield from batch
+
+    def __recoverJobs(self) -> List[str]:
+        """Finishes the jobs whose archive was complete and rolls back the rest.
+        Returns the sources of the rolled back ones that still exist"""
+        retry = []
+        for job in self.jobJournal.unfinished():
+            chapter = Chapter(job["anilistId"], "", job["chapter"], job["series"],
+                              Path(job["source"]), Path(job["archive"]))
+            if job["stage"] < JobJournalInterface.ARCHIVED:
+                self.logger.info(f"Rolling back unfinished {job['source']}")
+                self.filesystem.discardPartialArchive(chapter.archivePath)
+                self.jobJournal.finish(chapter)
+                if os.path.isdir(job["source"]):
+                    retry.append(job["source"])
+                continue
+            self.logger.info(f"Finishing interrupted {job['source']}")
+            if job["stage"] < JobJournalInterface.STORED:
+                self.__store([chapter])
+            self.__cleanupStep(chapter)
+        return retry
+
+    def __resolveChapters(
+        self,
+        chapterPaths: Iterable[str],
+        storedChapters: Set[Tuple[int, str]],
+        interactive=False,
+    ) -> Iterator[Chapter]:
+        """Yields the chapters that still have to be archived.
+        storedChapters holds the (anilistId, chapter) already in the database.
+        Stops at the first series for which no tracker ID can be found"""
+        chapterPaths = list(chapterPaths)
+        # Every folder name is parsed at once, before the first lookup
+        parsedNames = self.calcChapterName.calc_from_filenames(
+            html.unescape(Path(x).name) for x in chapterPaths
+        )
+        for chapterPathStr in chapterPaths:
+            self.logger.info(f"Parsing: {chapterPathStr}")
+            # Inferring information from files
+            chapterPath = Path(chapterPathStr)
+
+            chapterName = html.unescape(chapterPath.name)
+            seriesName = html.unescape(chapterPath.parent.name)
+
+            parsed = parsedNames[chapterName]
+            if parsed is None:
+                self.logger.debug(f"{chapterPathStr} does not have a valid filename. Quarantining...")
+                self.filesystem.simple_quarantine(chapterPathStr)
+                self.sourceScanner.markDone(chapterPathStr)
+                continue
+
+            anilistId = self.database.getAnilistIDForSeries(parsed.seriesName)
+            # chapterNumber = self.calcChapterName.execute(chapterName, anilistId)
+
+            estimatedArchivePath = self.generate_simple_archive_path(chapterPathStr)
+
+            chapterData = Chapter(
+                anilistId,
+                seriesName,
+                parsed.chapterNumber,
+                parsed.seriesName,
+                chapterPath,
+                estimatedArchivePath,
+                parsed.scanInfo,
+                parsed.year
+            )
+            self.logger.debug(f"Already had tracker ID: {anilistId}")
+
+            isChapterOnDB = (anilistId, parsed.chapterNumber) in storedChapters
+            if not anilistId or anilistId is None:
+                foundAnilistId = self.findAnilistIdForSeries(
+                    parsed.seriesName, interactive=interactive
+                )
+                if not foundAnilistId or foundAnilistId is None:
+                    self.logger.error(f"No anilistId for {chapterData.seriesName}")
+                    return
+                chapterData = chapterData.replace(anilistId=foundAnilistId)
+            if isChapterOnDB:
+                self.logger.info("Source exists but chapter's already in db")
+                # self.filesystem.deleteFolder(location=chapterPathStr)
+                self.sourceScanner.markDone(chapterPathStr)
+                continue
+            yield chapterData
+
+    def __processSerially(self, chapters: Iterable[Chapter]) -> Set[Chapter]:
+        new_chapters: Set[Chapter] = set()
+        for chapterData in chapters:
+            self.__compressStep(self.__metadataStep(chapterData))
+            self.__store([chapterData])
+            new_chapters.add(chapterData)
+            self.__cleanupStep(chapterData)
+        return new_chapters
+
+    def __processPipelined(self, chapters: Iterable[Chapter]) -> Set[Chapter]:
+        """Same steps as __processSerially, but compression of several chapters
+        overlaps with the metadata of the next ones. Archived chapters are
+        stored from this thread, which owns the database connection,
+        before their sources are cleaned up in parallel"""
+        archived = Pipeline(
+            [
+                Stage("metadata", self.__metadataStep),
+                Stage("compress", self.__compressStep, workers=self.workers),
+            ],
+            queueSize=self.workers * 2,
+        ).run(chapters)
+        self.__store(archived)
+        cleanup = Pipeline(
+            [Stage("cleanup", self.__cleanupStep, workers=self.workers)],
+            queueSize=self.workers * 2,
+        )
+        return set(cleanup.run(archived))
+
+    def __metadataStep(self, chapter: Chapter) -> Tuple[Chapter, Optional[bytes]]:
+        self.jobJournal.begin(chapter)
+        comicInfo = self.setupMetadata(chapter)
+        self.jobJournal.advance([chapter], JobJournalInterface.METADATA_WRITTEN)
+        return chapter, comicInfo
+
+    def __compressStep(self, item: Tuple[Chapter, Optional[bytes]]) -> Chapter:
+        chapter, comicInfo = item
+        self.compressChapter(chapter, comicInfo)
+        self.jobJournal.advance([chapter], JobJournalInterface.ARCHIVED)
+        return chapter
+
+    def __store(self, chapters: List[Chapter]):
+        with self.database.batch():
+            for chapter in chapters:
+                self.insertInDatabase(chapter)
+        self.jobJournal.advance(chapters, JobJournalInterface.STORED)
+
+    def __cleanupStep(self, chapter: Chapter) -> Chapter:
+        self.cleanupChapter(chapter)
+        self.jobJournal.finish(chapter)
+        return chapter
+
     def generate_simple_archive_path(self, chapterPathStr):
         chapterPath = chapterPathStr.replace(self.sourceFolder, self.archiveFolder)
         extension = "cbz"
@@ -130,18 +273,27 @@ class MainRunner:
     def findAnilistIdForSeries(self, series: str, interactive=False):
         return self.updateTrackerIds.updateFor(series, interactive=interactive)
 
-    def setupMetadata(self, chapter: Chapter):
-        self.createMetadata.execute(chapter)
+    def setupMetadata(self, chapter: Chapter) -> Optional[bytes]:
+        """ComicInfo.xml for the archive, None if it was written to the source"""
+        return self.createMetadata.generate(chapter)
+
+    def compressChapter(self, chapter: Chapter, comicInfo: Optional[bytes] = None):
+        self.filesystem.compress_chapter(
+            chapter.archivePath, chapter.sourcePath, comicInfo=comicInfo
+        )
 
-    def compressChapter(self, chapter: Chapter):
-        self.filesystem.compress_chapter(chapter.archivePath, chapter.sourcePath)
+    def cleanupChapter(self, chapter: Chapter):
+        self.filesystem.deleteFolder(location=str(chapter.sourcePath))
 
     def insertInDatabase(self, chapter: Chapter):
-        self.database.insertChapter(
-            chapter.seriesName,
-            chapter.chapterNumber,
-            str(chapter.archivePath.resolve()),
-            str(chapter.sourcePath.resolve()),
+        # chapterName is the series name the anilist table knows it by
+        self.database.insertOrReplaceChapters(
+            [(
+                chapter.chapterName,
+                chapter.chapterNumber,
+                str(chapter.archivePath.resolve()),
+                str(chapter.sourcePath.resolve()),
+            )]
         )
 
     def send_push(self, chapters: Set[Chapter], gaps: List[MissingChapter]):
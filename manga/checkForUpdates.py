@@ -1,19 +1,23 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from cross.decorators import Logger
 from manga.gateways.mangaupd import MangaUpdatesGateway
 from manga.gateways.database import DatabaseGateway
 from manga.gateways.anilist import TrackerGatewayInterface
-import time
 
 
+@Logger
 class CheckForUpdates:
     def __init__(
         self,
         mangaUpdatesGateway: MangaUpdatesGateway,
         database: DatabaseGateway,
         tracker: TrackerGatewayInterface,
+        workers: int = 4,
     ):
         self.mangaUpdatesGateway = mangaUpdatesGateway
         self.database = database
         self.tracker = tracker
+        self.workers = max(1, workers)
 
     def updateLocalIds(self):
         allLocalSeries = self.database.getAllSeries()
@@ -25,43 +29,78 @@ class CheckForUpdates:
         for row in allLocalSeriesWithoutIds:
             mangaUpdId = self.mangaUpdatesGateway.searchForSeries(row.seriesName)
             self.database.insertMangaUpdt(row.anilistId, mangaUpdatesId=mangaUpdId)
-            time.sleep(2)
 
     def checkForUpdates(self):
+        """Prints series whose latest MangaUpdates release is newer than
+        what's archived, as the answers come in. Requests run concurrently,
+        paced by the MangaUpdates rate limiter"""
         # This isn't checking:
         # - Series that were never in db (not in anilist)
-        allTrackerEntries = self.tracker.getAllEntries()
+        allTrackerEntries = self.tracker.getSnapshot()
+        if allTrackerEntries is None:
+            self.logger.error("Couldn't get the Anilist list, updates not checked")
+            return
+        allDbInfo = self.database.getHighestChapterAndLastUpdatedForAllSeries()
 
         runningSeries = filter(
-            lambda x: x.chapters is None, allTrackerEntries
+            lambda x: x.chapters is None, allTrackerEntries.values()
         )
 
-        # Perhaps should get anilistIDs from db, rather than API
+        toCheck = []
         for series in runningSeries:
-            time.sleep(2)
-            anilistId = series.id
-            dbInfo = self.database.getHighestChapterAndLastUpdatedForSeries(anilistId)
+            dbInfo = allDbInfo.get(series.tracker_id)
             if not dbInfo:
                 continue
             if not dbInfo["mangaUpdatesId"]:
                 continue
-            releaseNum = self.mangaUpdatesGateway.latestReleaseForId(
-                dbInfo["mangaUpdatesId"]
-            )
-            latestInDb = dbInfo["max_chapter"]
-            if latestInDb is None:
-                latestInDb = 0
-            if releaseNum is None:
-                continue
-            try:
-                intReleaseNum = int(releaseNum)
-                if series["progress"] >= intReleaseNum:
-                    continue
-                if latestInDb < intReleaseNum:
-                    print(
-                        (f"{dbInfo['series']} ({dbInfo['anilistId']})",
-                         " - has {latestInDb} in DB. Last read {series.progress}. ",
-                         "Latest chapter is {intReleaseNum}")
+            toCheck.append((series, dbInfo))
+
+        outdated = 0
+        failed = 0
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            futures = {
+                executor.submit(
+                    self.mangaUpdatesGateway.latestReleaseForId,
+                    dbInfo["mangaUpdatesId"],
+                ): (series, dbInfo)
+                for (series, dbInfo) in toCheck
+            }
+            for future in as_completed(futures):
+                series, dbInfo = futures[future]
+                try:
+                    releaseNum = future.result()
+                except Exception as thrown_exception:
+                    failed += 1
+                    self.logger.error(
+                        f"Couldn't check {dbInfo['series']}: {thrown_exception}"
                     )
-            except ValueError:
-                continue
+                    continue
+                if self.__isOutdated(series, dbInfo, releaseNum):
+                    outdated += 1
+
+        print(
+            f"Checked {len(toCheck)} series. "
+            f"{outdated} have newer releases, {failed} couldn't be checked"
+        )
+
+    def __isOutdated(self, series, dbInfo, releaseNum) -> bool:
+        latestInDb = dbInfo["max_chapter"]
+        if latestInDb is None:
+            latestInDb = 0
+        if releaseNum is None:
+            return False
+        try:
+            intReleaseNum = int(releaseNum)
+        except ValueError:
+            return False
+        if series.progress >= intReleaseNum:
+            return False
+        if latestInDb < intReleaseNum:
+            print(
+                f"{dbInfo['series']} ({dbInfo['anilistId']})"
+                f" - has {latestInDb} in DB. Last read {series.progress}. "
+                f"Latest chapter is {intReleaseNum}",
+                flush=True,
+            )
+            return True
+        return False
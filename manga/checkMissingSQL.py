@@ -21,11 +21,17 @@ class CheckMissingChaptersInSQL:
     def execute(self, fixAfter=False):
         archiveChapterGlob = self.archiveRootPath.glob("*/*.cbz")
         print("checking")
+        storedChapters = self.database.getActiveChapterKeys()
+        with self.database.batch():
+            self.__checkArchives(archiveChapterGlob, storedChapters, fixAfter)
+
+    def __checkArchives(self, archiveChapterGlob, storedChapters, fixAfter):
         for file in archiveChapterGlob:
             chapterNumber = file.stem
             anilistId = file.parent.name
-            chapExistsInSQL = self.database.doesExistChapterAndAnilist(
-                anilistId, chapterNumber
+            chapExistsInSQL = (
+                anilistId.isdigit()
+                and (int(anilistId), chapterNumber) in storedChapters
             )
             if not chapExistsInSQL:
                 print("File exist in disk, not in SQL")
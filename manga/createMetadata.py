@@ -1,4 +1,5 @@
 import xml.etree.ElementTree as ET
+from typing import Iterable, Optional
 from models.manga import Chapter
 from cross.decorators import Logger
 from manga.gateways.filesystem import FilesystemInterface
@@ -8,6 +9,17 @@ class CreateMetadataInterface:
     def execute(self, chapter: Chapter):
         pass
 
+    def generate(self, chapter: Chapter) -> Optional[bytes]:
+        """ComicInfo.xml of chapter, written straight into its archive.
+        Implementations that don't override it write it to the source folder
+        with execute and return None"""
+        self.execute(chapter)
+        return None
+
+    def prefetch(self, chapters: Iterable[Chapter]):
+        """Called with each batch of a run's chapters before they're executed"""
+        pass
+
 
 @Logger
 class CreateMetadata(CreateMetadataInterface):
@@ -41,7 +41,9 @@ class CreateMetadata2(CreateMetadataInterface):
         # return f'<?xml version="1.0" encoding="utf-8"?>\n{xmlAsStr}'
 
     def __getCountryForChapter(self, chapter: Chapter) -> Optional[str]:
-        tracker_data = self.anilist.getAllEntries()
+        tracker_data = self.anilist.getSnapshot()
+        if tracker_data is None:
+            return None
 
         current_series = tracker_data.get(chapter.anilistId)
         if current_series is not None:
@@ -49,7 +51,9 @@ class CreateMetadata2(CreateMetadataInterface):
         return None
 
     def __getAltSeriesForChapter(self, chapter: Chapter) -> Optional[str]:
-        tracker_data = self.anilist.getAllEntries()
+        tracker_data = self.anilist.getSnapshot()
+        if tracker_data is None:
+            return None
 
         current_series = tracker_data.get(chapter.anilistId)
         if current_series is not None:
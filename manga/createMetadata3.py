@@ -1,13 +1,99 @@
 import string
-from typing import Optional
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional
 from lxml import etree
 from models.manga import Chapter
 from cross.decorators import Logger
 from manga.gateways.filesystem import FilesystemInterface
 from manga.gateways.anilist import AnilistGateway
+from models.anilistToComicInfo import AnilistComicInfo
 from .createMetadata import CreateMetadataInterface
 
 
+# Elements that change between chapters of the same series
+CHAPTER_FIELDS = ("Title", "Volume", "Year", "ScanInformation")
+
+
+def buildComicInfo(
+    anilistData: AnilistComicInfo,
+    title: str,
+    volume: str,
+    year: str,
+    scanInfo: str,
+) -> bytes:
+    """The whole ComicInfo.xml of one chapter"""
+    root = etree.Element("ComicInfo")
+    etree.SubElement(root, "Title").text = title
+    etree.SubElement(root, "Series").text = anilistData.title
+    etree.SubElement(root, "Volume").text = volume
+    etree.SubElement(root, "AlternateSeries").text = anilistData.altTitles
+    etree.SubElement(root, "Summary").text = anilistData.summary
+    etree.SubElement(root, "Notes").text = anilistData.status
+    etree.SubElement(root, "Year").text = year
+    etree.SubElement(root, "Writer").text = anilistData.writer
+    etree.SubElement(root, "Penciller").text = anilistData.penciller
+    etree.SubElement(root, "Inker").text = anilistData.inker
+    etree.SubElement(root, "Genre").text = anilistData.genres
+    etree.SubElement(root, "Web").text = anilistData.site_url
+    etree.SubElement(root, "Format").text = anilistData.format
+    if anilistData.country_of_origin == "JP":
+        etree.SubElement(root, "BlackAndWhite").text = "Yes"
+        etree.SubElement(root, "Manga").text = "YesAndRightToLeft"
+    etree.SubElement(root, "ScanInformation").text = scanInfo
+    etree.SubElement(root, "AgeRating").text = anilistData.age_rating
+
+    return etree.tostring(
+        root, pretty_print=True, xml_declaration=True, encoding="utf-8"
+    )
+
+
+# Titles, years and scan groups repeat across a series' chapters
+@lru_cache(maxsize=4096)
+def _serializeField(tag: str, text: Optional[str]) -> bytes:
+    element = etree.Element(tag)
+    element.text = text
+    return etree.tostring(element, encoding="utf-8", xml_declaration=False)
+
+
+def chapterFieldsOf(comicInfo: bytes) -> List[Optional[str]]:
+    """The CHAPTER_FIELDS of an existing ComicInfo.xml, None if missing"""
+    root = etree.fromstring(comicInfo)
+    fields = []
+    for tag in CHAPTER_FIELDS:
+        element = root.find(tag)
+        fields.append(element.text if element is not None else None)
+    return fields
+
+
+class ComicInfoTemplate:
+    """ComicInfo.xml of a series, serialized once, with gaps for the
+    chapter fields. Fills them with the same bytes buildComicInfo gives"""
+
+    PLACEHOLDER = "placeholder"
+
+    def __init__(self, anilistData: AnilistComicInfo) -> None:
+        self.anilistData = anilistData
+        serialized = buildComicInfo(anilistData, *[self.PLACEHOLDER] * 4)
+        self.segments: List[bytes] = []
+        for tag in CHAPTER_FIELDS:
+            before, serialized = serialized.split(
+                _serializeField(tag, self.PLACEHOLDER), 1
+            )
+            self.segments.append(before)
+        self.segments.append(serialized)
+
+    def fill(self, title: str, volume: str, year: str, scanInfo: str) -> bytes:
+        fields = [
+            _serializeField(tag, text)
+            for tag, text in zip(CHAPTER_FIELDS, (title, volume, year, scanInfo))
+        ]
+        parts = [self.segments[0]]
+        for field, segment in zip(fields, self.segments[1:]):
+            parts.append(field)
+            parts.append(segment)
+        return b"".join(parts)
+
+
 @Logger
 class CreateMetadata3(CreateMetadataInterface):
     """lxml implementation of CreateMetadataInterface.
@@ -16,37 +102,30 @@ class CreateMetadata3(CreateMetadataInterface):
     def __init__(self, filesystem: FilesystemInterface, anilist: AnilistGateway):
         self.filesystem = filesystem
         self.anilist = anilist
+        # anilistId -> template, rebuilt when Anilist returns new data
+        self.templates: Dict[int, ComicInfoTemplate] = {}
+
+    def prefetch(self, chapters: Iterable[Chapter]):
+        anilistIds = set(chapter.anilistId for chapter in chapters)
+        self.logger.debug(f"Prefetching {len(anilistIds)} series from Anilist")
+        self.anilist.search_media_by_ids(anilistIds)
 
     def execute(self, chapter: Chapter):
-        result = self.__generate_metadata(chapter)
+        result = self.generate(chapter)
         destination = chapter.sourcePath.joinpath("ComicInfo.xml")
         self.filesystem.saveFile(stringData=result, filepath=destination)
 
-    def __generate_metadata(self, chapter: Chapter) -> str:
+    def generate(self, chapter: Chapter) -> bytes:
         anilistData = self.anilist.search_media_by_id(chapter.anilistId)
-
-        root = etree.Element("ComicInfo")
-        etree.SubElement(root, "Title").text = chapter.chapterName
-        etree.SubElement(root, "Series").text = anilistData.title
-        etree.SubElement(root, "Volume").text = chapter.chapterNumber
-        etree.SubElement(root, "AlternateSeries").text = anilistData.altTitles
-        etree.SubElement(root, "Summary").text = anilistData.summary
-        etree.SubElement(root, "Notes").text = anilistData.status
-        etree.SubElement(root, "Year").text = str(chapter.year)
-        etree.SubElement(root, "Writer").text = anilistData.writer
-        etree.SubElement(root, "Penciller").text = anilistData.penciller
-        etree.SubElement(root, "Inker").text = anilistData.inker
-        etree.SubElement(root, "Genre").text = anilistData.genres
-        etree.SubElement(root, "Web").text = anilistData.site_url
-        etree.SubElement(root, "Format").text = anilistData.format
-        if anilistData.country_of_origin == "JP":
-            etree.SubElement(root, "BlackAndWhite").text = "Yes"
-            etree.SubElement(root, "Manga").text = "YesAndRightToLeft"
-        etree.SubElement(root, "ScanInformation").text = chapter.scan_info
-        etree.SubElement(root, "AgeRating").text = anilistData.age_rating
-
-        return etree.tostring(
-            root, pretty_print=True, xml_declaration=True, encoding="utf-8"
+        template = self.templates.get(chapter.anilistId)
+        if template is None or template.anilistData is not anilistData:
+            template = ComicInfoTemplate(anilistData)
+            self.templates[chapter.anilistId] = template
+        return template.fill(
+            chapter.chapterName,
+            chapter.chapterNumber,
+            str(chapter.year),
+            chapter.scan_info,
         )
 
     @staticmethod
@@ -24,15 +24,19 @@ class DeleteReadChapters:
         self.database = database
 
     def execute(self):
-        series = self.anilist.getAllEntries()
+        series = self.anilist.getSnapshot()
+        if series is None:
+            self.logger.error("Couldn't get the Anilist list, nothing deleted")
+            return []
 
         deleted_chapters: [SimpleChapter] = []
 
         rows = self.database.getAllSeriesWithLocalFiles()
+        toCheck = []
+        limits = dict()
         row: AnilistSeries
         for row in rows:
             completion = False
-            dbSeries = row.seriesName
             dbAnilistId = row.anilistId
             anilistSeries = series.get(dbAnilistId)
             if anilistSeries is None:
@@ -44,11 +48,15 @@ class DeleteReadChapters:
             if lastReleasedChapter == lastReadChapter:
                 completion = True
                 lastReadChapter += 30  # Making sure to delete all stored chapters
-            chaptersToDelete = self.database.getChaptersForSeriesBeforeNumber(
-                dbAnilistId, lastReadChapter
-            )
-            for chap in chaptersToDelete:
-                chapterToDelete = chap["chapter"]
+            toCheck.append((row, completion, lastReadChapter))
+            limits[dbAnilistId] = lastReadChapter
+
+        allChaptersToDelete = self.database.getChaptersForSeriesBeforeNumbers(limits)
+        for row, completion, lastReadChapter in toCheck:
+            dbSeries = row.seriesName
+            dbAnilistId = row.anilistId
+            chaptersToDelete = allChaptersToDelete.get(dbAnilistId, [])
+            for chapterToDelete in chaptersToDelete:
                 deleted_chapters.append(SimpleChapter(dbAnilistId, chapterToDelete))
                 self.logger.info(
                     "Deleting "
@@ -59,6 +67,12 @@ class DeleteReadChapters:
                     + ("Completion" if completion else str(lastReadChapter))
                     + ")"
                 )
-                self.filesystem.deleteArchive(dbAnilistId, chapterToDelete)
-                self.database.deleteChapter(dbAnilistId, chapterToDelete)
+
+        # Rows are deactivated before any file is removed, so a failed delete
+        # leaves an archive the DB no longer lists instead of a row without one
+        self.database.deleteChapters(
+            (x.anilistId, x.chapterNumber) for x in deleted_chapters
+        )
+        for chapter in deleted_chapters:
+            self.filesystem.deleteArchive(chapter.anilistId, chapter.chapterNumber)
         return deleted_chapters
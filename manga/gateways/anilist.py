@@ -1,9 +1,15 @@
-import http.client
+import hashlib
 import json
-from functools import reduce
-from typing import List, Mapping
+import math
+import threading
+import time
+from itertools import chain
+from typing import Mapping, Optional
 from models.tracker import TrackerSeries
 from models.anilistToComicInfo import AnilistComicInfo
+from .responseCache import ResponseCache
+from .trackerSnapshot import TrackerSnapshot
+from .utils.httpPool import HttpConnectionPool
 
 
 class TrackerGatewayInterface:
@@ -16,38 +22,109 @@ class TrackerGatewayInterface:
     def getAllEntries(self) -> Mapping[int, TrackerSeries]:
         pass
 
+    def getSnapshot(self) -> TrackerSnapshot:
+        return TrackerSnapshot(self.getAllEntries())
+
+    def invalidateEntries(self):
+        pass
+
     def search_media_by_id(self, id) -> AnilistComicInfo:
         pass
 
+    def search_media_by_ids(self, ids) -> Mapping[int, AnilistComicInfo]:
+        pass
+
 
 class AnilistGateway(TrackerGatewayInterface):
-    def __init__(self, authToken: str, userId: str) -> None:
+    # Seconds a persisted response is served without asking Anilist again.
+    # The user's list and progress change often, media details rarely do
+    LIST_TTL = 10 * 60
+    SEARCH_TTL = 24 * 60 * 60
+    MEDIA_TTL = 7 * 24 * 60 * 60
+
+    def __init__(
+        self,
+        authToken: str,
+        userId: str,
+        responseCache: Optional[ResponseCache] = None,
+        offline: bool = False,
+        http: Optional[HttpConnectionPool] = None,
+    ) -> None:
         self.token = authToken
         self.userId = userId
         self.cache = {}
-
-    def __prepareRequest(self, query, variables):
+        self.cacheExpiry = {}
+        # Parsed media details by Anilist ID, as (expires at, AnilistComicInfo)
+        self.mediaCache = {}
+        self.snapshot: Optional[TrackerSnapshot] = None
+        self.snapshotSource = None
+        self.snapshotLock = threading.Lock()
+        self.responseCache = responseCache
+        # When set, only responses already in responseCache are used
+        self.offline = offline
+        self.http = http if http is not None else HttpConnectionPool()
+
+    def __prepareRequest(self, query, variables, ttl=0):
         query_key = (query, str(variables))
         cache_value = self.cache.get(query_key)
         if cache_value is not None:
-            return cache_value
+            if time.time() < self.cacheExpiry.get(query_key, math.inf):
+                return cache_value
+            # Long running processes (--watch) ask again once ttl passed
+            del self.cache[query_key]
+
+        persisted = None
+        persisted_key = None
+        if self.responseCache is not None:
+            persisted_key = self.__persistedKey(query, variables)
+            persisted = self.responseCache.lookup(persisted_key)
+            if persisted is not None and (self.offline or persisted.age() < ttl):
+                result = json.loads(persisted.body)
+                self.__remember(query_key, result, ttl)
+                return result
+
+        if self.offline:
+            return {"errors": [{"message": "Offline and response isn't cached"}]}
 
-        conn = http.client.HTTPSConnection("graphql.anilist.co")
         headers = {"Content-Type": "application/json", "Authorization": self.token}
+        if persisted is not None and persisted.etag is not None:
+            headers["If-None-Match"] = persisted.etag
 
         body = json.dumps({"query": query, "variables": variables})
-        conn.request("POST", "", body, headers)
-        res = conn.getresponse()
+        # Only queries are sent, so sending one twice is harmless
+        res = self.http.request(
+            "graphql.anilist.co", "POST", "/", body, headers, idempotent=True
+        )
         data = res.read()
+
+        if res.status == 304:
+            self.responseCache.revalidated(persisted_key)
+            result = json.loads(persisted.body)
+            self.__remember(query_key, result, ttl)
+            return result
+
         utfData = data.decode("utf-8")
 
         result = json.loads(utfData)
 
         if res.status == 200:
-            self.cache[query_key] = result
+            self.__remember(query_key, result, ttl)
+            if persisted_key is not None and ttl > 0:
+                self.responseCache.store(persisted_key, utfData, res.getheader("ETag"))
 
         return result
 
+    @staticmethod
+    def __persistedKey(query, variables) -> str:
+        return hashlib.sha256(
+            json.dumps([query, variables], sort_keys=True).encode("utf-8")
+        ).hexdigest()
+
+    def __remember(self, query_key, result, ttl):
+        self.cache[query_key] = result
+        if ttl > 0:
+            self.cacheExpiry[query_key] = time.time() + ttl
+
     def getProgressFor(self, mediaId):
         try:
             query = """
@@ -60,7 +137,7 @@ class AnilistGateway(TrackerGatewayInterface):
     }
   """
             variables = {"mediaId": mediaId, "userId": self.userId}
-            result = self.__prepareRequest(query, variables)
+            result = self.__prepareRequest(query, variables, ttl=self.LIST_TTL)
             errors = result.get("errors")
             if errors is not None:
                 print("Error in getProgressFor %s" % mediaId)
@@ -87,7 +164,7 @@ class AnilistGateway(TrackerGatewayInterface):
   }"""
         variables = {"searchId": title}
 
-        result = self.__prepareRequest(query, variables)
+        result = self.__prepareRequest(query, variables, ttl=self.SEARCH_TTL)
         print(result)
         media = result["data"]["Media"]
         titleObj = media["title"]
@@ -116,7 +193,7 @@ class AnilistGateway(TrackerGatewayInterface):
         }"""
         variables = {"searchId": title}
 
-        result = self.__prepareRequest(query, variables)
+        result = self.__prepareRequest(query, variables, ttl=self.SEARCH_TTL)
         errors = result.get("errors")
         if errors is not None:
             print(result["errors"])
@@ -124,30 +201,18 @@ class AnilistGateway(TrackerGatewayInterface):
 
         searchResults = result["data"]["Page"]["media"]
 
-        models: List[TrackerSeries] = []
-        for series in searchResults:
-            main_titles = [
-                series["title"]["userPreferred"],
-                series["title"]["romaji"],
-            ]
-
-            models.append(
-                TrackerSeries(
-                    series["id"],
-                    main_titles,
-                    series["status"],
-                    series["chapters"],
-                    series["countryOfOrigin"],
-                    0,
-                )
+        models = [
+            TrackerSeries.fromGraphQL(
+                series, titleKeys=("userPreferred", "romaji")
             )
+            for series in searchResults
+        ]
 
         # Create anilist ID keyed dictionary
         model_dictionary = dict((v.tracker_id, v) for v in models)
         return model_dictionary
 
-    def getAllEntries(self) -> Mapping[int, TrackerSeries]:
-        query = """
+    ALL_ENTRIES_QUERY = """
       query($userId: Int) {
     MediaListCollection(userId: $userId, type: MANGA) {
       lists {
@@ -174,51 +239,57 @@ class AnilistGateway(TrackerGatewayInterface):
   }
       """
 
-        variables = {"userId": self.userId}
+    def getAllEntries(self) -> Mapping[int, TrackerSeries]:
+        return self.getSnapshot()
 
-        result = self.__prepareRequest(query, variables)
+    def getSnapshot(self) -> Optional[TrackerSnapshot]:
+        """The user's list, parsed once and shared until the response changes
+        (its TTL passed) or invalidateEntries is called"""
+        result = self.__prepareRequest(
+            self.ALL_ENTRIES_QUERY, self.__allEntriesVariables(), ttl=self.LIST_TTL
+        )
         errors = result.get("errors")
         if errors is not None:
             print(result["errors"])
             return
 
-        # Merge all of the user's manga lists
-        lists = result["data"]["MediaListCollection"]["lists"]
-        mapped = map((lambda x: x["entries"]), lists)
-        reduced = reduce((lambda x, y: x + y), mapped)
-
-        models: List[TrackerSeries] = []
-        for series in reduced:
-            main_titles = [
-                series["media"]["title"]["english"],
-                series["media"]["title"]["romaji"],
-            ]
-            all_titles = main_titles + series["media"]["synonyms"]
-            non_empty_all_titles = list(filter(None, all_titles))
-
-            models.append(
-                TrackerSeries(
-                    series["media"]["id"],
-                    non_empty_all_titles,
-                    series["media"]["status"],
-                    series["media"]["chapters"],
-                    series["media"]["countryOfOrigin"],
-                    series["progress"],
-                )
-            )
+        with self.snapshotLock:
+            if self.snapshot is not None and self.snapshotSource is result:
+                return self.snapshot
 
-        # Create anilist ID keyed dictionary
-        model_dictionary = dict((v.tracker_id, v) for v in models)
-        return model_dictionary
+            # Merge all of the user's manga lists
+            lists = result["data"]["MediaListCollection"]["lists"]
+            merged = chain.from_iterable(x["entries"] for x in lists)
 
-    def search_media_by_id(self, id):
+            models = (
+                TrackerSeries.fromGraphQL(series["media"], series["progress"])
+                for series in merged
+            )
 
-        cache_value = self.cache.get(id)
-        if cache_value is not None:
-            return cache_value
+            # Create anilist ID keyed snapshot
+            self.snapshot = TrackerSnapshot((v.tracker_id, v) for v in models)
+            self.snapshotSource = result
+            return self.snapshot
+
+    def invalidateEntries(self):
+        """Makes the next getSnapshot ask Anilist again,
+        for when the list was changed (e.g. progress was updated)"""
+        with self.snapshotLock:
+            self.snapshot = None
+            self.snapshotSource = None
+        variables = self.__allEntriesVariables()
+        query_key = (self.ALL_ENTRIES_QUERY, str(variables))
+        self.cache.pop(query_key, None)
+        self.cacheExpiry.pop(query_key, None)
+        if self.responseCache is not None:
+            self.responseCache.invalidate(
+                self.__persistedKey(self.ALL_ENTRIES_QUERY, variables)
+            )
 
-        query = """query ($anilistId: Int) {
-          Media(id: $anilistId, type: MANGA, sort: POPULARITY_DESC) {
+    def __allEntriesVariables(self):
+        return {"userId": self.userId}
+
+    MEDIA_FIELDS = """
             id
             idMal
             title {
@@ -251,70 +322,80 @@ class AnilistGateway(TrackerGatewayInterface):
               category
               isGeneralSpoiler
               rank
-            }
+            }"""
+
+    # Anilist doesn't return more than this per page
+    MEDIA_PER_PAGE = 50
+
+    def __cachedMedia(self, id) -> Optional[AnilistComicInfo]:
+        cache_value = self.mediaCache.get(id)
+        if cache_value is None:
+            return None
+        expiresAt, anilistData = cache_value
+        if time.time() < expiresAt:
+            return anilistData
+        del self.mediaCache[id]
+        return None
+
+    def __rememberMedia(self, id, anilistData: AnilistComicInfo):
+        self.mediaCache[id] = (time.time() + self.MEDIA_TTL, anilistData)
+
+    def search_media_by_id(self, id):
+
+        cache_value = self.__cachedMedia(id)
+        if cache_value is not None:
+            return cache_value
+
+        query = """query ($anilistId: Int) {
+          Media(id: $anilistId, type: MANGA, sort: POPULARITY_DESC) {%s
           }
-        }"""
+        }""" % self.MEDIA_FIELDS
 
         variable = {"anilistId": id}
 
-        result = self.__prepareRequest(query, variable)
+        result = self.__prepareRequest(query, variable, ttl=self.MEDIA_TTL)
         errors = result.get("errors")
         if errors is not None:
             print(result["errors"])
             return
 
         media = result["data"]["Media"]
+        anilistData = AnilistComicInfo.fromGraphQL(id, media)
+        self.__rememberMedia(id, anilistData)
 
-        staff = media["staff"]
-        writer = ""
-        penciller = ""
-        inker = ""
+        return anilistData
 
-        for edge in staff["edges"]:
-            node = edge["node"]
-            language = node["languageV2"]
-            if language != "Japanese":
-                continue
+    def search_media_by_ids(self, ids) -> Mapping[int, AnilistComicInfo]:
+        """search_media_by_id for many series, in as few requests as possible.
+        Results are kept so later search_media_by_id calls don't hit the network"""
+        found = dict()
+        missing = []
+        for id in sorted(set(ids)):
+            cache_value = self.__cachedMedia(id)
+            if cache_value is not None:
+                found[id] = cache_value
+            else:
+                missing.append(id)
+
+        query = """query ($anilistIds: [Int], $perPage: Int) {
+          Page(page: 1, perPage: $perPage) {
+            media(id_in: $anilistIds, type: MANGA) {%s
+            }
+          }
+        }""" % self.MEDIA_FIELDS
 
-            role = edge["role"]
-            name = node["name"]["userPreferred"]
-            if role.startswith("Story"):
-                writer = name
-            if role.endswith("Art"):
-                penciller = name
-                inker = name
-
-        all_tags = media["tags"]
-        tags = []
-        for tag in all_tags:
-            tag_name = tag["name"]
-            tag_category = tag["category"]
-            is_spoiler = tag["isGeneralSpoiler"]
-            rank = tag["rank"]
-            # dont add "weak" tags or spoiler-marked tags
-            if is_spoiler or rank < 60:
+        for start in range(0, len(missing), self.MEDIA_PER_PAGE):
+            chunk = missing[start:start + self.MEDIA_PER_PAGE]
+            variables = {"anilistIds": chunk, "perPage": self.MEDIA_PER_PAGE}
+            result = self.__prepareRequest(query, variables, ttl=self.MEDIA_TTL)
+            errors = result.get("errors")
+            if errors is not None:
+                print(result["errors"])
                 continue
-            tags.append(f"{tag_category}: {tag_name}")
-
-        anilistData = AnilistComicInfo(
-            tracker_id=id,
-            title=media["title"]["userPreferred"],
-            manga_format=media["format"],
-            status=media["status"],
-            description=media["description"],
-            country_of_origin=media["countryOfOrigin"],
-            original_source=media["source"],
-            genres=media["genres"],
-            writer=writer,
-            penciller=penciller,
-            inker=inker,
-            synonyms=media["title"]["romaji"],
-            is_adult=media["isAdult"],
-            site_url=media["siteUrl"],
-            chapters=media["chapters"],
-            volumes=media["volumes"],
-            tags=tags
-        )
-        self.cache[id] = anilistData
 
-        return anilistData
+            for media in result["data"]["Page"]["media"]:
+                anilistData = AnilistComicInfo.fromGraphQL(media["id"], media)
+                self.__rememberMedia(media["id"], anilistData)
+                found[media["id"]] = anilistData
+
+        return found
@@ -1,35 +1,160 @@
+from contextlib import contextmanager
 from datetime import datetime
 import sqlite3
-from typing import List
+from typing import Dict, Iterable, List, Mapping, Optional, Set, Tuple
 from .utils.databaseModels import AnilistSeries
 from .databaseMigrations import DatabaseMigrations
 
 
 class DatabaseGateway:
-    def __init__(self, databaseLocation: str) -> None:
+    def __init__(self, databaseLocation: str, walMode: bool = False) -> None:
         self.conn = sqlite3.connect(databaseLocation)
+        if walMode:
+            # Commits no longer wait for an fsync of the whole database
+            self.conn.executescript(
+                """
+                PRAGMA journal_mode = WAL;
+                PRAGMA synchronous = NORMAL;
+                """
+            )
         self.migrations = DatabaseMigrations()
         self.migrations.doMigrations(self.conn)
         self.conn.row_factory = sqlite3.Row
+        self.__batchDepth = 0
         super().__init__()
 
     def __getCursor(self):
         cur = self.conn.cursor()
         return cur
 
+    def __commit(self):
+        if self.__batchDepth == 0:
+            self.conn.commit()
+
+    @contextmanager
+    def batch(self):
+        """Groups every write inside it into one transaction.
+        Committed when the outermost batch ends, rolled back if it raises"""
+        self.__batchDepth += 1
+        try:
+            yield self
+        except BaseException:
+            self.__batchDepth -= 1
+            if self.__batchDepth == 0:
+                self.conn.rollback()
+            raise
+        self.__batchDepth -= 1
+        self.__commit()
+
     def getAllChapters(self):
         cur = self.__getCursor()
         query = """
         SELECT chapter, anilistId
         FROM manga
         INNER JOIN anilist
-        ON manga.series = anilist.series
+        ON manga.anilist_ref = anilist.id
         WHERE active = 1
         """
         cur.execute(query)
         rows = cur.fetchall()
         return rows
 
+    def getChapterGaps(
+        self, minimumGap: float, dirtyOnly: bool = False
+    ) -> Dict[int, List[Tuple[float, float]]]:
+        """Consecutive active chapters further apart than minimumGap,
+        as anilistId -> [(previous, chapter)] in chapter order.
+        dirtyOnly limits it to the series marked dirty in series_gaps"""
+        cur = self.__getCursor()
+        cur.execute(
+            f"""
+            SELECT anilistId, previous, chapter_num FROM (
+              SELECT b.anilistId, a.chapter_num,
+               LAG(a.chapter_num) OVER (
+                 PARTITION BY b.anilistId ORDER BY a.chapter_num
+               ) AS previous
+              FROM manga a
+              INNER JOIN anilist b
+              ON a.anilist_ref = b.id
+              WHERE a.active = 1
+              {self.__DIRTY_SERIES if dirtyOnly else ""}
+            )
+            WHERE chapter_num - previous > ?
+            ORDER BY anilistId, chapter_num
+            """,
+            (minimumGap,),
+        )
+        gaps: Dict[int, List[Tuple[float, float]]] = dict()
+        for row in cur.fetchall():
+            gaps.setdefault(row["anilistId"], []).append(
+                (row["previous"], row["chapter_num"])
+            )
+        return gaps
+
+    __DIRTY_SERIES = """AND b.anilistId IN (
+                SELECT anilistId FROM series_gaps WHERE dirty = 1)"""
+
+    def getChapterStatsForDirtySeries(self) -> List[sqlite3.Row]:
+        """anilistId, first_chapter (lowest manga id), lowest, highest
+        and chapters (count) of the active chapters of every dirty series.
+        Series left without active chapters aren't returned"""
+        cur = self.__getCursor()
+        cur.execute(
+            f"""
+            SELECT b.anilistId, MIN(a.id) AS first_chapter,
+             MIN(a.chapter_num) AS lowest, MAX(a.chapter_num) AS highest,
+             COUNT(*) AS chapters
+            FROM manga a
+            INNER JOIN anilist b
+            ON a.anilist_ref = b.id
+            WHERE a.active = 1
+            {self.__DIRTY_SERIES}
+            GROUP BY b.anilistId
+            """
+        )
+        return cur.fetchall()
+
+    def getSeriesGapState(self) -> Dict[int, sqlite3.Row]:
+        """anilistId -> its series_gaps row"""
+        cur = self.__getCursor()
+        cur.execute("SELECT * FROM series_gaps")
+        return dict((row["anilistId"], row) for row in cur.fetchall())
+
+    def markAllSeriesGapsDirty(self):
+        cur = self.__getCursor()
+        cur.execute("UPDATE series_gaps SET dirty = 1")
+        self.__commit()
+
+    def saveSeriesGapState(self, states: Iterable[Mapping]):
+        """Stores evaluated series_gaps rows, which are no longer dirty"""
+        with self.batch():
+            cur = self.__getCursor()
+            cur.executemany(
+                """INSERT OR REPLACE INTO series_gaps(anilistId, first_chapter,
+                 lowest, highest, chapters, gaps, progress, quarantined, dirty)
+                VALUES(:anilistId, :first_chapter, :lowest, :highest,
+                 :chapters, :gaps, :progress, :quarantined, 0)""",
+                states,
+            )
+
+    def getArchivesForAllSeries(self) -> Dict[int, List[str]]:
+        """anilistId -> archive paths of its active chapters"""
+        cur = self.__getCursor()
+        cur.execute(
+            """
+            SELECT b.anilistId, a.archive
+            FROM manga a
+            INNER JOIN anilist b
+            ON a.anilist_ref = b.id
+            WHERE a.active = 1 AND b.anilistId IS NOT NULL
+            ORDER BY b.anilistId, a.chapter_num
+            """
+        )
+        archives: Dict[int, List[str]] = dict()
+        for row in cur.fetchall():
+            archives.setdefault(row["anilistId"], []).append(row["archive"])
+        return archives
+
     def getSeriesForAnilist(self, anilistId):
         cur = self.__getCursor()
 
@@ -69,13 +194,27 @@ class DatabaseGateway:
         SELECT a.series
         FROM manga a
         INNER JOIN anilist b
-        ON a.series = b.series
+        ON a.anilist_ref = b.id
         WHERE chapter = ? AND anilistId = ? AND a.active = 1
         """
         cur.execute(query, (chapterNumber, anilistId))
         row = cur.fetchone()
         return row
 
+    def getActiveChapterKeys(self) -> Set[Tuple[int, str]]:
+        """(anilistId, chapter) of every active chapter.
+        Loaded once, replaces a doesExistChapterAndAnilist call per chapter"""
+        cur = self.__getCursor()
+        query = """
+        SELECT b.anilistId, a.chapter
+        FROM manga a
+        INNER JOIN anilist b
+        ON a.anilist_ref = b.id
+        WHERE a.active = 1
+        """
+        cur.execute(query)
+        return set((row[0], row[1]) for row in cur.fetchall())
+
     def deleteChapter(self, anilistId, chapterNumber):
         cur = self.__getCursor()
 
@@ -84,30 +223,109 @@ class DatabaseGateway:
         UPDATE manga
         SET active = 0, last_active = datetime('now')
         WHERE chapter = ?
-        AND series IN ( SELECT series FROM anilist WHERE anilistId = ?)
+        AND anilist_ref IN ( SELECT id FROM anilist WHERE anilistId = ?)
         """
         cur.execute(query, (chapterNumber, anilistId))
-        self.conn.commit()
+        self.__commit()
+
+    def deleteChapters(self, chapters: Iterable[Tuple[int, str]]):
+        """deleteChapter for many (anilistId, chapterNumber) at once"""
+        cur = self.__getCursor()
+
+        query = """
+        UPDATE manga
+        SET active = 0, last_active = datetime('now')
+        WHERE chapter = ?
+        AND anilist_ref IN ( SELECT id FROM anilist WHERE anilistId = ?)
+        """
+        cur.executemany(
+            query, ((chapterNumber, anilistId) for anilistId, chapterNumber in chapters)
+        )
+        self.__commit()
 
     def insertChapter(self, seriesName, chapterNumber: str, archivePath, sourcePath):
         cur = self.__getCursor()
 
         query = """
-        INSERT INTO manga(series, chapter, archive, source)
-        VALUES(?,?,?,?)
+        INSERT INTO manga(series, chapter, archive, source, chapter_num, anilist_ref)
+        VALUES(?,?,?,?, CAST(? AS REAL), (SELECT id FROM anilist WHERE series = ?))
         """
-        cur.execute(query, (seriesName, chapterNumber, archivePath, sourcePath))
-        self.conn.commit()
+        cur.execute(
+            query,
+            (seriesName, chapterNumber, archivePath, sourcePath,
+             chapterNumber, seriesName),
+        )
+        self.__commit()
 
-    def insertTracking(self, seriesName, anilistId: int):
+    def insertChapters(self, chapters: Iterable[Tuple[str, str, str, str]]):
+        """insertChapter for many (seriesName, chapterNumber, archivePath, sourcePath)
+        at once"""
         cur = self.__getCursor()
 
         query = """
-        INSERT OR REPLACE INTO anilist(series, anilistId)
-        VALUES(?, ?)
+        INSERT INTO manga(series, chapter, archive, source, chapter_num, anilist_ref)
+        VALUES(?,?,?,?, CAST(? AS REAL), (SELECT id FROM anilist WHERE series = ?))
         """
-        cur.execute(query, (seriesName, anilistId))
-        self.conn.commit()
+        cur.executemany(
+            query,
+            (
+                (seriesName, chapterNumber, archivePath, sourcePath,
+                 chapterNumber, seriesName)
+                for seriesName, chapterNumber, archivePath, sourcePath in chapters
+            ),
+        )
+        self.__commit()
+
+    def insertOrReplaceChapters(self, chapters: Iterable[Tuple[str, str, str, str]]):
+        """insertChapters, replacing the rows with the same archive or source.
+        Storing a chapter again, like after an interrupted run
+        or once it's downloaded again, doesn't fail"""
+        cur = self.__getCursor()
+
+        query = """
+        INSERT OR REPLACE INTO manga(series, chapter, archive, source,
+         chapter_num, anilist_ref)
+        VALUES(?,?,?,?, CAST(? AS REAL), (SELECT id FROM anilist WHERE series = ?))
+        """
+        cur.executemany(
+            query,
+            (
+                (seriesName, chapterNumber, archivePath, sourcePath,
+                 chapterNumber, seriesName)
+                for seriesName, chapterNumber, archivePath, sourcePath in chapters
+            ),
+        )
+        self.__commit()
+
+    def insertTracking(self, seriesName, anilistId: int):
+        cur = self.__getCursor()
+
+        # Not INSERT OR REPLACE, which would give the series a new id
+        # and leave its manga rows pointing at nothing
+        cur.execute(
+            """
+            UPDATE anilist
+            SET anilistId = ?, mangaUpdatesId = NULL
+            WHERE series = ?
+            """,
+            (anilistId, seriesName),
+        )
+        cur.execute(
+            """
+            INSERT OR IGNORE INTO anilist(series, anilistId)
+            VALUES(?, ?)
+            """,
+            (seriesName, anilistId),
+        )
+        cur.execute(
+            """
+            UPDATE manga
+            SET anilist_ref = (SELECT id FROM anilist WHERE series = ?)
+            WHERE series = ?
+            """,
+            (seriesName, seriesName),
+        )
+        self.__commit()
 
     def insertMangaUpdt(self, anilistId, mangaUpdatesId: int):
         cur = self.__getCursor()
@@ -118,7 +336,7 @@ class DatabaseGateway:
         WHERE anilistId = ?
         """
         cur.execute(query, (mangaUpdatesId, anilistId))
-        self.conn.commit()
+        self.__commit()
 
     def getAllSeriesWithLocalFiles(self) -> List[AnilistSeries]:
         cur = self.__getCursor()
@@ -128,16 +346,11 @@ class DatabaseGateway:
                         b.mangaUpdatesId AS mangaUpdatesId
                         FROM manga a
                         INNER JOIN anilist b
-                        ON a.series = b.series
+                        ON a.anilist_ref = b.id
                         WHERE a.active = 1"""
         )
         rows = cur.fetchall()
-        return map(lambda a:
-                   AnilistSeries(
-                       a["anilistId"],
-                       a["series"],
-                       a["mangaUpdatesId"]),
-                   rows)
+        return map(AnilistSeries.fromRow, rows)
 
     def getAllSeries(self) -> List[AnilistSeries]:
         cur = self.__getCursor()
@@ -147,19 +360,14 @@ class DatabaseGateway:
             """
         )
         rows = cur.fetchall()
-        return map(lambda a:
-                   AnilistSeries(
-                       a["anilistId"],
-                       a["series"],
-                       a["mangaUpdatesId"]),
-                   rows)
+        return map(AnilistSeries.fromRow, rows)
 
     def getAllSeriesWithoutTrackerIds(self) -> List[str]:
         cur = self.__getCursor()
         cur.execute(
             """SELECT DISTINCT a.series FROM manga a
                         LEFT JOIN anilist b
-                        ON a.series = b.series
+                        ON a.anilist_ref = b.id
                     WHERE anilistId IS NULL and a.active = 1"""
         )
         rows = cur.fetchall()
@@ -172,9 +380,9 @@ class DatabaseGateway:
             SELECT chapter
             FROM manga a
             INNER JOIN anilist b
-            ON a.series = b.series
+            ON a.anilist_ref = b.id
             WHERE anilistId = ?
-            AND CAST(chapter AS REAL) <= ?
+            AND chapter_num <= ?
             AND a.active = 1
                         """,
             (anilistId, chapter),
@@ -182,6 +390,40 @@ class DatabaseGateway:
         rows = cur.fetchall()
         return rows
 
+    def getChaptersForSeriesBeforeNumbers(
+        self, limits: Mapping[int, float]
+    ) -> Dict[int, List[str]]:
+        """getChaptersForSeriesBeforeNumber for many series in one query.
+        limits maps anilistId to the highest chapter to return"""
+        cur = self.__getCursor()
+        cur.execute(
+            """CREATE TEMP TABLE IF NOT EXISTS chapter_limits(
+                anilistId integer primary key, upTo real)"""
+        )
+        cur.execute("DELETE FROM chapter_limits")
+        cur.executemany(
+            "INSERT INTO chapter_limits(anilistId, upTo) VALUES(?,?)",
+            limits.items(),
+        )
+        cur.execute(
+            """
+            SELECT b.anilistId, a.chapter
+            FROM chapter_limits l
+            INNER JOIN anilist b
+            ON b.anilistId = l.anilistId
+            INNER JOIN manga a
+            ON a.anilist_ref = b.id
+            WHERE a.chapter_num <= l.upTo
+            AND a.active = 1
+            """
+        )
+        result: Dict[int, List[str]] = dict()
+        for row in cur.fetchall():
+            result.setdefault(row["anilistId"], []).append(row["chapter"])
+        cur.execute("DELETE FROM chapter_limits")
+        self.__commit()
+        return result
+
     def getSourceForChapter(self, series, chapter):
         cur = self.__getCursor()
         cur.execute(
@@ -230,7 +472,7 @@ class DatabaseGateway:
         SELECT MIN(CAST(a.chapter AS INT)), a.series, anilistId, MAX(a.creation_date)
         FROM manga a
         INNER JOIN anilist AS b
-        ON a.series = b.series
+        ON a.anilist_ref = b.id
         WHERE a.active = 1
         GROUP BY anilistId
                         """
@@ -249,21 +491,39 @@ class DatabaseGateway:
           MAX(a.creation_date) AS max_date
         FROM anilist b
         LEFT JOIN manga AS a
-        ON a.series = b.series
+        ON a.anilist_ref = b.id
         WHERE anilistId = ? AND a.active = 1
         GROUP BY anilistId;
                         """, (anilistId,))
         return cur.fetchone()
 
+    def getHighestChapterAndLastUpdatedForAllSeries(self) -> Dict[int, sqlite3.Row]:
+        """getHighestChapterAndLastUpdatedForSeries for every series, by anilistId"""
+        cur = self.__getCursor()
+        cur.execute(
+            """
+        SELECT MAX(CAST(a.chapter AS INT)) AS max_chapter,
+          b.series,
+          anilistId,
+          mangaUpdatesId,
+          MAX(a.creation_date) AS max_date
+        FROM anilist b
+        LEFT JOIN manga AS a
+        ON a.anilist_ref = b.id
+        WHERE a.active = 1
+        GROUP BY anilistId;
+                        """)
+        return dict((row["anilistId"], row) for row in cur.fetchall())
+
     def getAllChaptersOfSeriesUpdatedAfter(self, lastUpdated: datetime):
         cur = self.__getCursor()
         query = """
         SELECT chapter, anilistId
         FROM manga a
         INNER JOIN anilist b
-        ON a.series = b.series
-        WHERE active = 1 AND a.series IN (
-          SELECT DISTINCT series
+        ON a.anilist_ref = b.id
+        WHERE active = 1 AND a.anilist_ref IN (
+          SELECT DISTINCT anilist_ref
           FROM manga c
           WHERE creation_date > ?
         )
@@ -278,7 +538,7 @@ class DatabaseGateway:
         SELECT anilistId, MAX(a.creation_date) AS lastUpdated
         FROM manga a
         INNER JOIN anilist b
-        ON a.series = b.series
+        ON a.anilist_ref = b.id
         WHERE a.creation_date > ?
         GROUP BY anilistId
         """
@@ -286,12 +546,39 @@ class DatabaseGateway:
         rows = cur.fetchall()
         return rows
 
+    def getScanState(self) -> Dict[str, Tuple[Optional[str], Tuple[int, int, int]]]:
+        """path -> (parent, (mtime_ns, size, inode))"""
+        cur = self.__getCursor()
+        cur.execute("SELECT path, parent, mtime_ns, size, inode FROM scan_state")
+        return {
+            row["path"]: (row["parent"], (row["mtime_ns"], row["size"], row["inode"]))
+            for row in cur.fetchall()
+        }
+
+    def replaceScanState(
+        self,
+        stale: Iterable[str],
+        fresh: Iterable[Tuple[str, Optional[str], Tuple[int, int, int]]],
+    ):
+        """Deletes the stale paths and inserts or updates (path, parent, state)"""
+        with self.batch():
+            cur = self.__getCursor()
+            cur.executemany(
+                "DELETE FROM scan_state WHERE path = ?", ((path,) for path in stale)
+            )
+            cur.executemany(
+                """INSERT OR REPLACE INTO scan_state(path, parent,
+                 mtime_ns, size, inode)
+                VALUES(?,?,?,?,?)""",
+                ((path, parent, *state) for path, parent, state in fresh),
+            )
+
     # def getVolumeChapters(self, anilistId):
     #    cur = self.__getCursor()
     #    cur.execute(
     #        """SELECT volume, MAX(volumeChapter) FROM manga a
     #           INNER JOIN anilist b
-    #           ON a.series = b.series
+    #           ON a.anilist_ref = b.id
     #           WHERE anilistId = ?
     #           GROUP BY anilistId, volume;
     #        """,
@@ -5,7 +5,7 @@ from cross.decorators import Logger
 @Logger
 class DatabaseMigrations:
     def __init__(self):
-        self.LATEST_DB_VERSION = 4
+        self.LATEST_DB_VERSION = 8
 
     def doMigrations(self, conn: sqlite3.Connection):
         version = -1
@@ -14,6 +14,8 @@ class DatabaseMigrations:
             cur = conn.cursor()
             cur.execute("PRAGMA user_version;")
             version = cur.fetchone()[0]
+            if version == self.LATEST_DB_VERSION:
+                break
             self.__executeMigration(conn, version)
 
     def __executeMigration(self, conn, currentVersion):
@@ -25,6 +27,14 @@ class DatabaseMigrations:
             self.__version2To3(conn)
         elif currentVersion == 3:
             self.__version3To4(conn)
+        elif currentVersion == 4:
+            self.__version4To5(conn)
+        elif currentVersion == 5:
+            self.__version5To6(conn)
+        elif currentVersion == 6:
+            self.__version6To7(conn)
+        elif currentVersion == 7:
+            self.__version7To8(conn)
         elif currentVersion > self.LATEST_DB_VERSION:
             self.logger.error(
                 "This version of the application is too old to run this database"
@@ -79,3 +89,119 @@ class DatabaseMigrations:
         """
         cur = conn.cursor()
         cur.executescript(query)
+
+    def __version4To5(self, conn: sqlite3.Connection):
+        """manga rows point to anilist through anilist_ref instead of joining
+        on the series text, and keep their chapter as a number in chapter_num
+        so range queries can use an index"""
+        self.logger.info("Executing migration version 4 -> 5")
+        query = """
+             ALTER TABLE manga ADD chapter_num real;
+             ALTER TABLE manga ADD anilist_ref integer REFERENCES anilist(id);
+
+             UPDATE manga SET chapter_num = CAST(chapter AS REAL);
+             UPDATE manga SET anilist_ref = (
+               SELECT id FROM anilist WHERE anilist.series = manga.series);
+
+             CREATE INDEX manga_series ON manga(series);
+             CREATE INDEX manga_anilist_ref_active
+               ON manga(anilist_ref, active, chapter_num, chapter);
+             CREATE INDEX manga_creation_date ON manga(creation_date);
+             CREATE INDEX anilist_anilistId ON anilist(anilistId);
+
+             PRAGMA user_version = 5;
+        """
+        cur = conn.cursor()
+        cur.executescript(query)
+
+    def __version5To6(self, conn: sqlite3.Connection):
+        """scan_state remembers the source folders seen by previous runs,
+        so unchanged ones aren't listed again"""
+        self.logger.info("Executing migration version 5 -> 6")
+        query = """
+             CREATE TABLE scan_state(path text primary key,
+              parent text,
+              mtime_ns integer,
+              size integer,
+              inode integer);
+
+             PRAGMA user_version = 6;
+        """
+        cur = conn.cursor()
+        cur.executescript(query)
+
+    def __version6To7(self, conn: sqlite3.Connection):
+        """series_gaps keeps what the last gap check found for every series.
+        Triggers mark a series dirty whenever its chapters change,
+        so the next check only looks at those"""
+        self.logger.info("Executing migration version 6 -> 7")
+        query = """
+             CREATE TABLE series_gaps(anilistId integer primary key,
+              first_chapter integer,
+              lowest real,
+              highest real,
+              chapters integer,
+              gaps integer,
+              progress integer,
+              quarantined integer,
+              dirty integer NOT NULL DEFAULT 1);
+
+             CREATE TRIGGER manga_gaps_insert AFTER INSERT ON manga
+             BEGIN
+               INSERT OR IGNORE INTO series_gaps(anilistId)
+                 SELECT anilistId FROM anilist
+                 WHERE id = NEW.anilist_ref AND anilistId IS NOT NULL;
+               UPDATE series_gaps SET dirty = 1 WHERE anilistId =
+                 (SELECT anilistId FROM anilist WHERE id = NEW.anilist_ref);
+             END;
+
+             CREATE TRIGGER manga_gaps_update
+             AFTER UPDATE OF active, chapter_num, anilist_ref ON manga
+             BEGIN
+               INSERT OR IGNORE INTO series_gaps(anilistId)
+                 SELECT anilistId FROM anilist
+                 WHERE id = NEW.anilist_ref AND anilistId IS NOT NULL;
+               UPDATE series_gaps SET dirty = 1 WHERE anilistId IN
+                 (SELECT anilistId FROM anilist
+                  WHERE id IN (OLD.anilist_ref, NEW.anilist_ref));
+             END;
+
+             CREATE TRIGGER manga_gaps_delete AFTER DELETE ON manga
+             BEGIN
+               UPDATE series_gaps SET dirty = 1 WHERE anilistId =
+                 (SELECT anilistId FROM anilist WHERE id = OLD.anilist_ref);
+             END;
+
+             CREATE TRIGGER anilist_gaps_update AFTER UPDATE OF anilistId ON anilist
+             WHEN NEW.anilistId IS NOT NULL
+             BEGIN
+               INSERT OR IGNORE INTO series_gaps(anilistId) VALUES(NEW.anilistId);
+               UPDATE series_gaps SET dirty = 1
+                 WHERE anilistId IN (OLD.anilistId, NEW.anilistId);
+             END;
+
+             INSERT OR IGNORE INTO series_gaps(anilistId)
+               SELECT anilistId FROM anilist WHERE anilistId IS NOT NULL;
+
+             PRAGMA user_version = 7;
+        """
+        cur = conn.cursor()
+        cur.executescript(query)
+
+    def __version7To8(self, conn: sqlite3.Connection):
+        """ingest_jobs records how far every chapter being ingested got,
+        so a run that was killed can be finished or undone"""
+        self.logger.info("Executing migration version 7 -> 8")
+        query = """
+             CREATE TABLE ingest_jobs(source text primary key,
+              archive text,
+              series text,
+              chapter text,
+              anilistId integer,
+              stage integer NOT NULL,
+              updated datetime default CURRENT_TIMESTAMP);
+
+             PRAGMA user_version = 8;
+        """
+        cur = conn.cursor()
+        cur.executescript(query)
@@ -1,9 +1,65 @@
+import copy
+import ctypes
+import ctypes.util
+import errno
+import json
 import os
+import struct
+import threading
+import time
+import uuid
 import zipfile
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 import shutil
+from typing import Iterator, List, Optional, Tuple
 from cross.decorators import Logger
 
+# Archives are written through a buffer this big,
+# so each page turns into few large writes instead of many 8KB ones
+ARCHIVE_WRITE_BUFFER = 4 * 1024 * 1024
+COMIC_INFO = "ComicInfo.xml"
+# Members are copied between archives this many bytes at a time
+COPY_CHUNK = 1024 * 1024
+# From the zip specification (APPNOTE.TXT 4.3.9)
+DATA_DESCRIPTOR_FLAG = 0x08
+DATA_DESCRIPTOR_SIGNATURE = b"PK\x07\x08"
+# Extra field giving 8 byte sizes, which the data descriptor then uses too
+ZIP64_EXTRA_ID = 0x0001
+
+# From <fcntl.h> and <linux/fs.h>
+AT_FDCWD = -100
+RENAME_NOREPLACE = 1
+
+_libc = None
+
+
+def _renameNoReplace(source: Path, target: Path):
+    """Renames source to target in one step, raising FileExistsError
+    instead of replacing target if it was created in the meantime"""
+    global _libc
+    if _libc is None:
+        try:
+            libcName = ctypes.util.find_library("c") or "libc.so.6"
+            _libc = ctypes.CDLL(libcName, use_errno=True)
+        except OSError:
+            _libc = False
+    if _libc and hasattr(_libc, "renameat2"):
+        result = _libc.renameat2(
+            AT_FDCWD, os.fsencode(source), AT_FDCWD, os.fsencode(target),
+            RENAME_NOREPLACE,
+        )
+        if result == 0:
+            return
+        error = ctypes.get_errno()
+        # Filesystems without renameat2 flags fall through to a plain rename
+        if error not in (errno.EINVAL, errno.ENOSYS):
+            raise OSError(error, os.strerror(error), str(source), None, str(target))
+    if os.path.lexists(target):
+        raise FileExistsError(errno.EEXIST, os.strerror(errno.EEXIST), str(target))
+    os.rename(source, target)
+
 
 class FilesystemInterface:
     def deleteArchive(self, anilistId, chapterNumber):
@@ -27,8 +83,23 @@ class FilesystemInterface:
     def saveFile(self, stringData: str, filepath: Path):
         pass
 
-    def compress_chapter(self, archive_path: Path, source_path: Path):
-        '''Compresses chapter at source_path with destination archive_path'''
+    def compress_chapter(
+        self, archive_path: Path, source_path: Path, comicInfo: Optional[bytes] = None
+    ):
+        '''Compresses chapter at source_path with destination archive_path.
+        comicInfo is stored as its ComicInfo.xml instead of the source's one'''
+        pass
+
+    def discardPartialArchive(self, archive_path: Path):
+        """Deletes what an interrupted compress_chapter left behind"""
+        pass
+
+    def readArchiveMember(self, archive_path: Path, name: str) -> Optional[bytes]:
+        """None if the archive has no member called name"""
+        pass
+
+    def replaceArchiveMember(self, archive_path: Path, name: str, data: bytes):
+        """Stores data as the archive's member called name"""
         pass
 
 
@@ -47,14 +118,27 @@ class FilesystemFakeGateway(FilesystemInterface):
 @Logger
 class FilesystemGateway(FilesystemInterface):
     def __init__(
-        self, sourceFolder: str, archiveFolder: str, quarantineFolder: str
+        self,
+        sourceFolder: str,
+        archiveFolder: str,
+        quarantineFolder: str,
+        ioConcurrency: int = 4,
     ) -> None:
         self.sourceFolder = sourceFolder
         self.archiveRootPath = Path(archiveFolder)
         self.quarantineFolder = Path(quarantineFolder)
+        # Shared by every chapter being compressed,
+        # so the disk never sees more than ioConcurrency reads at once
+        self.ioConcurrency = max(1, ioConcurrency)
+        self.pageReaders = ThreadPoolExecutor(
+            max_workers=self.ioConcurrency, thread_name_prefix="pageReader"
+        )
+        self.archiveSlots = threading.BoundedSemaphore(self.ioConcurrency)
 
         self.archiveRootPath.mkdir(parents=True, exist_ok=True)
         self.quarantineFolder.mkdir(parents=True, exist_ok=True)
+        self.journalFolder = self.quarantineFolder.joinpath(".journal")
+        self.__finishInterruptedMoves()
         super().__init__()
 
     def deleteArchive(self, anilistId, chapterNumber):
@@ -95,9 +179,12 @@ class FilesystemGateway(FilesystemInterface):
 
         shutil.rmtree(location)
 
-        # Parent
-        if (seriesPath.exists) and (not any(seriesPath.iterdir())):
-            shutil.rmtree(seriesPath.resolve())
+        # Parent. rmdir only succeeds on an empty folder, which keeps this
+        # safe while other chapters of the series are being cleaned up
+        try:
+            seriesPath.rmdir()
+        except OSError:
+            pass
 
     def simple_quarantine(self, chapter_path_str: str):
         """
@@ -116,15 +203,7 @@ class FilesystemGateway(FilesystemInterface):
             self.logger.info(f"Updating {chapter_path_str} in quarantine")
         else:
             self.logger.info(f"Adding {chapter_path_str} newly to quarantine")
-            quarantine_path.mkdir(parents=True)
-
-        for file in original_path.iterdir():
-            filename = file.name
-            file_quarantine_path = quarantine_path.joinpath(filename)
-            file.rename(file_quarantine_path)
-
-        original_path.rmdir()
-        pass
+        self.__moveFolder(original_path, quarantine_path)
 
     def quarantineSeries(self, anilistId: str):
         archiveSeriesPath = Path.joinpath(self.archiveRootPath, f"{anilistId}")
@@ -138,28 +217,71 @@ class FilesystemGateway(FilesystemInterface):
             self.logger.info(f"Updating {anilistId} in quarantine")
         else:
             self.logger.info(f"Adding {anilistId} to quarantine")
-            quarantineSeriesPath.mkdir(parents=True)
-
-        for file in archiveSeriesPath.iterdir():
-            filename = file.name
-            trg_path = quarantineSeriesPath.joinpath(filename)
-            file.rename(trg_path)
-        archiveSeriesPath.rmdir()
+        self.__moveFolder(archiveSeriesPath, quarantineSeriesPath)
 
     def restoreQuarantinedArchive(self, anilistId: str):
         archiveSeriesPath = Path.joinpath(self.archiveRootPath, f"{anilistId}")
         quarantineSeriesPath = Path.joinpath(self.quarantineFolder, f"{anilistId}")
 
         self.logger.info(f"Removing {anilistId} from quarantine")
-        archiveSeriesPath.mkdir(parents=True, exist_ok=True)
-        for file in quarantineSeriesPath.iterdir():
-            filename = file.name
-            trg_path = archiveSeriesPath.joinpath(filename)
-            file.rename(trg_path)
-        quarantineSeriesPath.rmdir()
+        self.__moveFolder(quarantineSeriesPath, archiveSeriesPath)
+
+    def __moveFolder(self, source: Path, target: Path):
+        """Moves source to target with a single rename when target doesn't exist.
+        Otherwise their files are merged, with a journal entry so a merge
+        interrupted by a crash is finished on the next start"""
+        target.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            _renameNoReplace(source, target)
+            return
+        except FileExistsError:
+            pass
+        except OSError as error:
+            # Linux reports an existing, non-empty target as ENOTEMPTY
+            if error.errno != errno.ENOTEMPTY:
+                raise
+        entry = self.__writeJournal(source, target)
+        self.__mergeFolder(source, target)
+        entry.unlink()
+
+    @staticmethod
+    def __mergeFolder(source: Path, target: Path):
+        """Files in source replace the ones with the same name in target.
+        Safe to run again on a partly merged folder"""
+        if not source.exists():
+            return
+        for file in source.iterdir():
+            os.replace(file, target.joinpath(file.name))
+        source.rmdir()
+
+    def __writeJournal(self, source: Path, target: Path) -> Path:
+        self.journalFolder.mkdir(exist_ok=True)
+        entry = self.journalFolder.joinpath(f"{uuid.uuid4().hex}.json")
+        partial = entry.with_suffix(".part")
+        with open(partial, "w") as file:
+            json.dump({"source": str(source), "target": str(target)}, file)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(partial, entry)
+        return entry
+
+    def __finishInterruptedMoves(self):
+        if not self.journalFolder.exists():
+            return
+        for entry in sorted(self.journalFolder.glob("*.json")):
+            move = json.loads(entry.read_text())
+            self.logger.info(f"Finishing interrupted move to {move['target']}")
+            self.__mergeFolder(Path(move["source"]), Path(move["target"]))
+            entry.unlink()
+        for partial in self.journalFolder.glob("*.part"):
+            # Nothing was moved before its entry was complete
+            partial.unlink()
 
     def getQuarantinedSeries(self):
-        quarantinedSeries = self.quarantineFolder.iterdir()
+        # Skips the journal and the chapters moved by simple_quarantine
+        quarantinedSeries = filter(
+            lambda x: x.name.isdigit() and x.is_dir(), self.quarantineFolder.iterdir()
+        )
         trackerIds = list(map(lambda x: int(x.stem), quarantinedSeries))
         return trackerIds
 
@@ -167,14 +289,160 @@ class FilesystemGateway(FilesystemInterface):
         with open(filepath.resolve(), "wb") as file:
             file.write(stringData)
 
-    def compress_chapter(self, archive_path: Path, source_path: Path):
+    def compress_chapter(
+        self, archive_path: Path, source_path: Path, comicInfo: Optional[bytes] = None
+    ):
         archive_path.parent.mkdir(parents=True, exist_ok=True)
         destination = archive_path.resolve()
-        ziphandler = zipfile.ZipFile(destination, "w", zipfile.ZIP_STORED)
         path = source_path.resolve()
+        pages: List[Tuple[str, str]] = []
         for root, dirs, files in os.walk(path):
             for file in files:
                 if file.startswith("."):
                     continue
-                ziphandler.write(os.path.join(root, file), file)
-        ziphandler.close()
+                if comicInfo is not None and file == COMIC_INFO:
+                    continue
+                pages.append((os.path.join(root, file), file))
+
+        # Written next to the destination and renamed once fsynced,
+        # so an archive at archive_path is always complete
+        partial = self.__partialPath(destination)
+        with self.archiveSlots:
+            with open(partial, "wb", buffering=ARCHIVE_WRITE_BUFFER) as archive:
+                with zipfile.ZipFile(archive, "w", zipfile.ZIP_STORED) as ziphandler:
+                    if comicInfo is not None:
+                        ziphandler.writestr(self.__newMember(COMIC_INFO), comicInfo)
+                    for zinfo, data in self.__readAhead(pages):
+                        ziphandler.writestr(zinfo, data)
+                archive.flush()
+                os.fsync(archive.fileno())
+            os.replace(partial, destination)
+            self.__fsyncFolder(destination.parent)
+
+    def discardPartialArchive(self, archive_path: Path):
+        self.__unlinkIfExists(self.__partialPath(archive_path))
+
+    def readArchiveMember(self, archive_path: Path, name: str) -> Optional[bytes]:
+        with zipfile.ZipFile(archive_path) as archive:
+            try:
+                return archive.read(name)
+            except KeyError:
+                return None
+
+    def replaceArchiveMember(self, archive_path: Path, name: str, data: bytes):
+        """Rewrites the archive with data as its first member. The other
+        members are copied byte for byte, without decompressing them"""
+        destination = archive_path.resolve()
+        partial = self.__partialPath(destination)
+        with self.archiveSlots:
+            with zipfile.ZipFile(destination) as source:
+                try:
+                    with open(partial, "wb", buffering=ARCHIVE_WRITE_BUFFER) as output:
+                        with zipfile.ZipFile(output, "w", zipfile.ZIP_STORED) as target:
+                            target.writestr(self.__newMember(name), data)
+                            for info in source.infolist():
+                                if info.filename != name:
+                                    self.__copyRawMember(source, info, target, output)
+                        output.flush()
+                        os.fsync(output.fileno())
+                    os.replace(partial, destination)
+                except BaseException:
+                    # No job journal rolls this one back
+                    self.__unlinkIfExists(partial)
+                    raise
+            self.__fsyncFolder(destination.parent)
+
+    @staticmethod
+    def __copyRawMember(
+        source: zipfile.ZipFile, info: zipfile.ZipInfo, target: zipfile.ZipFile, output
+    ):
+        source.fp.seek(info.header_offset)
+        header = source.fp.read(zipfile.sizeFileHeader)
+        fields = struct.unpack(zipfile.structFileHeader, header)
+        nameLength, extraLength = fields[10], fields[11]
+        length = nameLength + extraLength + info.compress_size
+        if info.flag_bits & DATA_DESCRIPTOR_FLAG:
+            source.fp.seek(nameLength, os.SEEK_CUR)
+            extra = source.fp.read(extraLength)
+            source.fp.seek(info.compress_size, os.SEEK_CUR)
+            hasSignature = source.fp.read(4) == DATA_DESCRIPTOR_SIGNATURE
+            # CRC and both sizes
+            length += 20 if FilesystemGateway.__hasZip64Extra(extra) else 12
+            length += 4 if hasSignature else 0
+            source.fp.seek(info.header_offset + len(header))
+
+        copied = copy.copy(info)
+        copied.header_offset = output.tell()
+        output.write(header)
+        while length > 0:
+            chunk = source.fp.read(min(length, COPY_CHUNK))
+            if not chunk:
+                raise zipfile.BadZipFile(f"Truncated member {info.filename}")
+            output.write(chunk)
+            length -= len(chunk)
+        # ZipFile has no public way to add a member that's already encoded.
+        # Its central directory is written from filelist, starting at start_dir
+        target.filelist.append(copied)
+        target.NameToInfo[copied.filename] = copied
+        target.start_dir = output.tell()
+
+    @staticmethod
+    def __hasZip64Extra(extra: bytes) -> bool:
+        offset = 0
+        while offset + 4 <= len(extra):
+            fieldId, size = struct.unpack("<HH", extra[offset:offset + 4])
+            if fieldId == ZIP64_EXTRA_ID:
+                return True
+            offset += 4 + size
+        return False
+
+    @staticmethod
+    def __newMember(name: str) -> zipfile.ZipInfo:
+        # What ZipFile.write gives a regular file written now
+        zinfo = zipfile.ZipInfo(name, time.localtime()[:6])
+        zinfo.external_attr = 0o100644 << 16
+        return zinfo
+
+    @staticmethod
+    def __partialPath(archive_path: Path) -> Path:
+        return archive_path.with_name(archive_path.name + ".part")
+
+    @staticmethod
+    def __unlinkIfExists(path: Path):
+        # Path.unlink(missing_ok=True) needs Python 3.8
+        try:
+            path.unlink()
+        except FileNotFoundError:
+            pass
+
+    @staticmethod
+    def __fsyncFolder(folder: Path):
+        """Makes a rename into folder durable. Windows can't open a folder,
+        and its renames don't need it"""
+        if os.name == "nt":
+            return
+        descriptor = os.open(str(folder), os.O_RDONLY)
+        try:
+            os.fsync(descriptor)
+        finally:
+            os.close(descriptor)
+
+    def __readAhead(
+        self, pages: List[Tuple[str, str]]
+    ) -> Iterator[Tuple[zipfile.ZipInfo, bytes]]:
+        """Yields pages in order while the next ones are already being read"""
+        window = self.ioConcurrency * 2
+        pending = deque()
+        for page in pages:
+            pending.append(self.pageReaders.submit(self.__readPage, *page))
+            if len(pending) >= window:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+    @staticmethod
+    def __readPage(filepath: str, arcname: str) -> Tuple[zipfile.ZipInfo, bytes]:
+        # Same ZipInfo ZipFile.write would build, so the archive stays identical
+        zinfo = zipfile.ZipInfo.from_file(filepath, arcname)
+        with open(filepath, "rb") as page:
+            return zinfo, page.read()
@@ -1,31 +1,72 @@
+import os
 from .anilist import AnilistGateway
 from .database import DatabaseGateway
 from .pushover import PushoverGateway
 from .mangaupd import MangaUpdatesGateway
 from .filesystem import FilesystemGateway
+from .jobJournal import JobJournal
+from .responseCache import ResponseCache
+from .utils.httpPool import HttpConnectionPool
+from .utils.rateLimiter import RateLimiter
 
 
 class GatewayContainer:
     def __init__(self, configuration) -> None:
         self.config = configuration
-        self.database = DatabaseGateway(self.config["database"]["sqlitelocation"])
+        self.rateLimiter = RateLimiter()
+        self.rateLimiter.configure(
+            "graphql.anilist.co",
+            self.config.getint("tracker", "ratelimitperminute", fallback=90),
+            self.config.getint("tracker", "ratelimitburst", fallback=10),
+        )
+        self.rateLimiter.configure(
+            MangaUpdatesGateway.HOST,
+            self.config.getint("mangaupdates", "ratelimitperminute", fallback=60),
+            self.config.getint("mangaupdates", "ratelimitburst", fallback=5),
+        )
+        self.http = HttpConnectionPool(
+            maxConnectionsPerHost=self.config["system"].getint(
+                "httpmaxconnections", fallback=4
+            ),
+            timeout=self.config["system"].getfloat("httptimeout", fallback=30),
+            retries=self.config["system"].getint("httpretries", fallback=3),
+            rateLimiter=self.rateLimiter,
+        )
+        self.database = DatabaseGateway(
+            self.config["database"]["sqlitelocation"],
+            self.config["database"].getboolean("walmode", fallback=False),
+        )
+        # Opened after DatabaseGateway, which creates its table
+        self.jobJournal = JobJournal(self.config["database"]["sqlitelocation"])
         self.filesystem = FilesystemGateway(
             self.config["manga"]["sourcefolder"],
             self.config["manga"]["archivefolder"],
             self.config["manga"]["quarantinefolder"],
+            self.config["manga"].getint("ioconcurrency", fallback=4),
         )
         # self.filesystem = FilesystemFakeGateway()
 
+        databaseLocation = self.config["database"]["sqlitelocation"]
+        cacheLocation = self.config["tracker"].get("cachelocation") or os.path.join(
+            os.path.dirname(databaseLocation), "anilistCache.db"
+        )
+        self.trackerCache = ResponseCache(
+            cacheLocation,
+            self.config["tracker"].getint("cachesizemb", fallback=64) * 1024 * 1024,
+        )
         self.tracker = AnilistGateway(
             self.config["tracker"]["anilisttoken"],
             self.config["tracker"]["anilistuserid"],
+            self.trackerCache,
+            http=self.http,
         )
 
-        self.mangaUpdates = MangaUpdatesGateway()
+        self.mangaUpdates = MangaUpdatesGateway(self.rateLimiter)
         # self.tracker = FakeAnilistGateway()
 
         self.push = PushoverGateway(
             tokenUser=self.config["push"]["pushoveruserkey"],
             tokenApp=self.config["push"]["pushoverappkey"],
+            http=self.http,
         )
         pass
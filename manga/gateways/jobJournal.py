@@ -0,0 +1,80 @@
+import sqlite3
+import threading
+from typing import Iterable, List
+from models.manga import Chapter
+
+
+class JobJournalInterface:
+    """Durable record of the chapters being ingested and the last step
+    each one finished. A chapter's job is removed once its source is deleted"""
+
+    PENDING = 0
+    # ComicInfo.xml is generated, for the archive or in the source folder
+    METADATA_WRITTEN = 1
+    # The archive is complete and fsynced
+    ARCHIVED = 2
+    # Its row is committed to the database
+    STORED = 3
+
+    def begin(self, chapter: Chapter):
+        pass
+
+    def advance(self, chapters: Iterable[Chapter], stage: int):
+        pass
+
+    def finish(self, chapter: Chapter):
+        pass
+
+    def unfinished(self) -> List[sqlite3.Row]:
+        return []
+
+
+class JobJournal(JobJournalInterface):
+    """ingest_jobs table of the main database. Steps are recorded from the
+    ingest pipeline's threads, so it has its own connection"""
+
+    def __init__(self, databaseLocation: str) -> None:
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(
+            databaseLocation, timeout=30, check_same_thread=False
+        )
+        self.conn.row_factory = sqlite3.Row
+
+    def begin(self, chapter: Chapter):
+        with self.lock, self.conn:
+            self.conn.execute(
+                """INSERT OR REPLACE INTO ingest_jobs(source, archive, series,
+                 chapter, anilistId, stage)
+                VALUES(?,?,?,?,?,?)""",
+                (
+                    str(chapter.sourcePath),
+                    str(chapter.archivePath),
+                    chapter.chapterName,
+                    chapter.chapterNumber,
+                    chapter.anilistId,
+                    self.PENDING,
+                ),
+            )
+
+    def advance(self, chapters: Iterable[Chapter], stage: int):
+        with self.lock, self.conn:
+            self.conn.executemany(
+                """UPDATE ingest_jobs SET stage = ?, updated = CURRENT_TIMESTAMP
+                WHERE source = ?""",
+                ((stage, str(chapter.sourcePath)) for chapter in chapters),
+            )
+
+    def finish(self, chapter: Chapter):
+        with self.lock, self.conn:
+            self.conn.execute(
+                "DELETE FROM ingest_jobs WHERE source = ?", (str(chapter.sourcePath),)
+            )
+
+    def unfinished(self) -> List[sqlite3.Row]:
+        """source, archive, series, chapter, anilistId and stage
+        of the jobs left behind by a run that didn't finish"""
+        with self.lock:
+            return self.conn.execute(
+                """SELECT source, archive, series, chapter, anilistId, stage
+                FROM ingest_jobs ORDER BY updated"""
+            ).fetchall()
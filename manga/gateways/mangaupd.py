@@ -1,14 +1,22 @@
 import pymanga
+from .utils.rateLimiter import RateLimiter
 
 
 class MangaUpdatesGateway:
+    HOST = "www.mangaupdates.com"
+
+    def __init__(self, rateLimiter: RateLimiter) -> None:
+        self.rateLimiter = rateLimiter
+
     def searchForSeries(self, name: str):
+        self.rateLimiter.acquire(self.HOST)
         try:
             return pymanga.api.search(name)["series"][0]["id"]
         except IndexError:
             return None
 
     def latestReleaseForId(self, id: int):
+        self.rateLimiter.acquire(self.HOST)
         try:
             return pymanga.api.releases(id)[0]['chapter']
         except IndexError:
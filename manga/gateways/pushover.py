@@ -1,6 +1,7 @@
-import http.client
-import urllib
+import urllib.parse
+from typing import Optional
 from cross.decorators import Logger
+from .utils.httpPool import HttpConnectionPool
 
 
 class PushServiceInterface:
@@ -10,13 +11,19 @@ class PushServiceInterface:
 
 @Logger
 class PushoverGateway(PushServiceInterface):
-    def __init__(self, tokenUser: str, tokenApp: str) -> None:
+    def __init__(
+        self,
+        tokenUser: str,
+        tokenApp: str,
+        http: Optional[HttpConnectionPool] = None,
+    ) -> None:
         self.tokenUser = tokenUser
         self.tokenApp = tokenApp
+        self.http = http if http is not None else HttpConnectionPool()
 
     def sendPush(self, msg: str):
-        conn = http.client.HTTPSConnection("api.pushover.net:443")
-        conn.request(
+        response = self.http.request(
+            "api.pushover.net",
             "POST",
             "/1/messages.json",
             urllib.parse.urlencode(
@@ -28,7 +35,6 @@ class PushoverGateway(PushServiceInterface):
             ),
             {"Content-type": "application/x-www-form-urlencoded"},
         )
-        response = conn.getresponse()
         self.logger.debug(f'{response.status} {response.reason}')
         self.logger.debug(response.read())
 
@@ -0,0 +1,103 @@
+import sqlite3
+import threading
+import time
+from typing import Optional
+from cross.decorators import Logger
+
+
+class CachedResponse:
+    def __init__(self, body: str, etag: Optional[str], storedAt: float):
+        self.body = body
+        self.etag = etag
+        self.storedAt = storedAt
+
+    def age(self) -> float:
+        return time.time() - self.storedAt
+
+
+@Logger
+class ResponseCache:
+    """Persistent cache of API responses, kept in its own sqlite file.
+    Entries are evicted least recently used first once maxSizeBytes is exceeded.
+    Losing it only costs requests, so it's written without fsync"""
+
+    def __init__(self, location: str, maxSizeBytes: int = 64 * 1024 * 1024) -> None:
+        self.maxSizeBytes = maxSizeBytes
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(location, check_same_thread=False)
+        self.conn.executescript(
+            """
+            PRAGMA journal_mode = WAL;
+            PRAGMA synchronous = OFF;
+            CREATE TABLE IF NOT EXISTS responses(key text primary key,
+             body text,
+             etag text,
+             stored_at real,
+             last_access real,
+             size integer);
+            CREATE INDEX IF NOT EXISTS responses_last_access
+             ON responses(last_access);
+            """
+        )
+
+    def lookup(self, key: str) -> Optional[CachedResponse]:
+        with self.lock:
+            cur = self.conn.cursor()
+            cur.execute(
+                "SELECT body, etag, stored_at FROM responses WHERE key = ?", (key,)
+            )
+            row = cur.fetchone()
+            if row is None:
+                return None
+            cur.execute(
+                "UPDATE responses SET last_access = ? WHERE key = ?",
+                (time.time(), key),
+            )
+            self.conn.commit()
+            return CachedResponse(row[0], row[1], row[2])
+
+    def store(self, key: str, body: str, etag: Optional[str] = None):
+        now = time.time()
+        with self.lock:
+            cur = self.conn.cursor()
+            cur.execute(
+                """
+                INSERT OR REPLACE INTO responses(key, body, etag,
+                 stored_at, last_access, size)
+                VALUES(?,?,?,?,?,?)
+                """,
+                (key, body, etag, now, now, len(body)),
+            )
+            self.__evict(cur)
+            self.conn.commit()
+
+    def revalidated(self, key: str):
+        """The server confirmed the entry is still current"""
+        now = time.time()
+        with self.lock:
+            self.conn.execute(
+                "UPDATE responses SET stored_at = ?, last_access = ? WHERE key = ?",
+                (now, now, key),
+            )
+            self.conn.commit()
+
+    def invalidate(self, key: str):
+        """Removes the entry, so it's requested again"""
+        with self.lock:
+            self.conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            self.conn.commit()
+
+    def __evict(self, cur: sqlite3.Cursor):
+        cur.execute("SELECT COALESCE(SUM(size), 0) FROM responses")
+        total = cur.fetchone()[0]
+        if total <= self.maxSizeBytes:
+            return
+        cur.execute("SELECT key, size FROM responses ORDER BY last_access")
+        evicted = []
+        for key, size in cur.fetchall():
+            if total <= self.maxSizeBytes:
+                break
+            evicted.append((key,))
+            total -= size
+        cur.executemany("DELETE FROM responses WHERE key = ?", evicted)
+        self.logger.debug(f"Evicted {len(evicted)} cached responses")
@@ -0,0 +1,34 @@
+import threading
+from collections.abc import Mapping
+from types import MappingProxyType
+from typing import Iterator, Optional
+from models.tracker import TrackerSeries
+from manga.utils.titleMatcher import TitleIndex
+
+
+class TrackerSnapshot(Mapping):
+    """Read-only view of the user's tracker list at one point in time,
+    keyed by tracker ID. Shared by everything that needs the list,
+    so it's parsed once instead of once per caller"""
+
+    def __init__(self, entries: Mapping) -> None:
+        self.__entries = MappingProxyType(dict(entries))
+        self.__titleIndex: Optional[TitleIndex] = None
+        self.__lock = threading.Lock()
+
+    def __getitem__(self, trackerId: int) -> TrackerSeries:
+        return self.__entries[trackerId]
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self.__entries)
+
+    def __len__(self) -> int:
+        return len(self.__entries)
+
+    @property
+    def titleIndex(self) -> TitleIndex:
+        "Built the first time it's needed"
+        with self.__lock:
+            if self.__titleIndex is None:
+                self.__titleIndex = TitleIndex(self.__entries.values())
+            return self.__titleIndex
@@ -1,8 +1,16 @@
 from typing import Optional
+from models.immutable import Immutable
 
 
-class AnilistSeries:
+class AnilistSeries(Immutable):
+    __slots__ = ("anilistId", "seriesName", "mangaUpdatesId")
+
     def __init__(self, anilistId: int, seriesName: str, mangaUpdatesId: Optional[int]):
-        self.anilistId = anilistId
-        self.seriesName = seriesName
-        self.mangaUpdatesId = mangaUpdatesId
+        self._init(
+            anilistId=anilistId, seriesName=seriesName, mangaUpdatesId=mangaUpdatesId
+        )
+
+    @classmethod
+    def fromRow(cls, row) -> "AnilistSeries":
+        """From a sqlite3.Row with anilistId, series and mangaUpdatesId"""
+        return cls(row["anilistId"], row["series"], row["mangaUpdatesId"])
@@ -0,0 +1,188 @@
+import http.client
+import random
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+from cross.decorators import Logger
+from .rateLimiter import RateLimiter
+
+
+class HttpResponse:
+    """Fully read response. The connection is back in the pool
+    by the time this is returned"""
+
+    def __init__(self, status: int, reason: str, headers: List[Tuple[str, str]],
+                 body: bytes):
+        self.status = status
+        self.reason = reason
+        self.headers = headers
+        self.body = body
+
+    def getheader(self, name: str, default: Optional[str] = None) -> Optional[str]:
+        lowerName = name.lower()
+        for key, value in self.headers:
+            if key.lower() == lowerName:
+                return value
+        return default
+
+    def read(self) -> bytes:
+        return self.body
+
+
+class _RequestNotSent(ConnectionError):
+    """The request failed before it was written, so the server never saw it.
+    The original error is its __cause__"""
+
+
+class _HostConnections:
+    def __init__(self, maxConnections: int):
+        self.idle: List[http.client.HTTPSConnection] = []
+        self.slots = threading.BoundedSemaphore(maxConnections)
+
+
+@Logger
+class HttpConnectionPool:
+    """Thread-safe pool of keep-alive HTTPS connections shared by every gateway.
+    Requests go through rateLimiter, which is fed the rate limit headers
+    of every response. Retries connection errors, 429 and 5xx
+    with jittered exponential backoff, honouring Retry-After.
+
+    Requests that aren't idempotent (POST unless told otherwise) are only
+    retried when the server can't have acted on them: the request
+    wasn't written, or it was answered with 429"""
+
+    RETRY_STATUSES = (429, 500, 502, 503, 504)
+    NOT_PROCESSED_STATUSES = (429,)
+    IDEMPOTENT_METHODS = ("GET", "HEAD", "OPTIONS", "PUT", "DELETE")
+
+    def __init__(
+        self,
+        maxConnectionsPerHost: int = 4,
+        timeout: float = 30,
+        retries: int = 3,
+        backoffBase: float = 1.0,
+        backoffMax: float = 60.0,
+        rateLimiter: Optional[RateLimiter] = None,
+        sleep=time.sleep,
+    ) -> None:
+        self.maxConnectionsPerHost = max(1, maxConnectionsPerHost)
+        self.timeout = timeout
+        self.retries = retries
+        self.backoffBase = backoffBase
+        self.backoffMax = backoffMax
+        self.sleep = sleep
+        self.rateLimiter = (
+            rateLimiter if rateLimiter is not None else RateLimiter(sleep=sleep)
+        )
+        self.lock = threading.Lock()
+        self.hosts: Dict[str, _HostConnections] = {}
+
+    def request(
+        self,
+        host: str,
+        method: str,
+        path: str,
+        body=None,
+        headers: Optional[Dict[str, str]] = None,
+        idempotent: Optional[bool] = None,
+    ) -> HttpResponse:
+        """idempotent is for requests that can safely be sent twice,
+        like a GraphQL query sent as POST. Guessed from method otherwise"""
+        if idempotent is None:
+            idempotent = method.upper() in self.IDEMPOTENT_METHODS
+        retryStatuses = (
+            self.RETRY_STATUSES if idempotent else self.NOT_PROCESSED_STATUSES
+        )
+        hostConnections = self.__connectionsFor(host)
+        attempt = 0
+        while True:
+            self.rateLimiter.acquire(host)
+            try:
+                response = self.__send(hostConnections, host, method, path,
+                                       body, headers or {}, idempotent)
+            except (OSError, http.client.HTTPException) as thrown_exception:
+                notSent = isinstance(thrown_exception, _RequestNotSent)
+                error = thrown_exception.__cause__ if notSent else thrown_exception
+                if attempt >= self.retries or not (idempotent or notSent):
+                    raise error
+                delay = self.__backoff(attempt)
+                self.logger.debug(
+                    f"{method} {host}{path} failed ({error}). "
+                    f"Retrying in {delay:.1f}s")
+            else:
+                self.rateLimiter.updateFromHeaders(host, response.getheader)
+                if response.status not in retryStatuses or \
+                        attempt >= self.retries:
+                    return response
+                delay = self.__retryAfter(response)
+                if delay is None:
+                    delay = self.__backoff(attempt)
+                self.logger.debug(
+                    f"{method} {host}{path} returned {response.status}. "
+                    f"Retrying in {delay:.1f}s")
+            attempt += 1
+            self.sleep(delay)
+
+    def __connectionsFor(self, host: str) -> _HostConnections:
+        with self.lock:
+            hostConnections = self.hosts.get(host)
+            if hostConnections is None:
+                hostConnections = _HostConnections(self.maxConnectionsPerHost)
+                self.hosts[host] = hostConnections
+            return hostConnections
+
+    def __send(self, hostConnections: _HostConnections, host, method, path,
+               body, headers, idempotent: bool) -> HttpResponse:
+        with hostConnections.slots:
+            with self.lock:
+                conn = hostConnections.idle.pop() if hostConnections.idle else None
+            reused = conn is not None
+            if conn is None:
+                conn = http.client.HTTPSConnection(host, timeout=self.timeout)
+            sent = False
+            try:
+                try:
+                    conn.request(method, path, body, headers)
+                    sent = True
+                    res = conn.getresponse()
+                except (ConnectionError, http.client.HTTPException):
+                    # The server may have acted on a request that was written
+                    if not reused or (sent and not idempotent):
+                        raise
+                    # The server closed the kept-alive connection, try a fresh one
+                    conn.close()
+                    conn = http.client.HTTPSConnection(host, timeout=self.timeout)
+                    sent = False
+                    conn.request(method, path, body, headers)
+                    sent = True
+                    res = conn.getresponse()
+                response = HttpResponse(
+                    res.status, res.reason, res.getheaders(), res.read()
+                )
+            except (OSError, http.client.HTTPException) as thrown_exception:
+                conn.close()
+                if not sent:
+                    raise _RequestNotSent(str(thrown_exception)) from thrown_exception
+                raise
+            except BaseException:
+                conn.close()
+                raise
+            if res.will_close:
+                conn.close()
+            else:
+                with self.lock:
+                    hostConnections.idle.append(conn)
+            return response
+
+    def __backoff(self, attempt: int) -> float:
+        ceiling = min(self.backoffMax, self.backoffBase * (2 ** attempt))
+        return random.uniform(ceiling / 2, ceiling)
+
+    def __retryAfter(self, response: HttpResponse) -> Optional[float]:
+        value = response.getheader("Retry-After")
+        if value is None:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            return None
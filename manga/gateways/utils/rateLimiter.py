@@ -0,0 +1,116 @@
+import threading
+import time
+from typing import Callable, Dict, Optional
+from cross.decorators import Logger
+
+
+class TokenBucket:
+    """Allows `burst` calls at once, refilled at `rate` calls per second.
+    A rate of None doesn't limit, but still honours blocks from the server"""
+
+    def __init__(
+        self,
+        rate: Optional[float],
+        burst: int = 1,
+        clock=time.monotonic,
+        sleep=time.sleep,
+    ) -> None:
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.clock = clock
+        self.sleep = sleep
+        self.tokens = float(self.burst)
+        self.updatedAt = clock()
+        self.blockedUntil = 0.0
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Blocks until a call is allowed. The lock isn't held while waiting,
+        so update() can change the rate or block meanwhile"""
+        while True:
+            with self.lock:
+                now = self.clock()
+                if now < self.blockedUntil:
+                    wait = self.blockedUntil - now
+                elif self.rate is None:
+                    return
+                else:
+                    self.__refill(now)
+                    if self.tokens >= 1:
+                        self.tokens -= 1
+                        return
+                    wait = (1 - self.tokens) / self.rate
+            self.sleep(wait)
+
+    def update(
+        self,
+        ratePerMinute: Optional[float] = None,
+        remaining: Optional[int] = None,
+        resetIn: Optional[float] = None,
+    ):
+        """Adjusts the bucket to what the server reports"""
+        with self.lock:
+            now = self.clock()
+            if self.rate is not None:
+                self.__refill(now)
+            else:
+                self.updatedAt = now
+            if ratePerMinute is not None and ratePerMinute > 0:
+                self.rate = ratePerMinute / 60
+            if remaining is not None:
+                self.tokens = min(self.tokens, remaining)
+                if remaining <= 0 and resetIn is not None:
+                    self.blockedUntil = now + resetIn
+
+    def __refill(self, now: float):
+        elapsed = now - self.updatedAt
+        self.updatedAt = now
+        self.tokens = min(self.burst, self.tokens + elapsed * self.rate)
+
+
+@Logger
+class RateLimiter:
+    """One TokenBucket per remote host, shared by every gateway talking to it.
+    Hosts that weren't configured aren't limited
+    until the server's rate limit headers say otherwise"""
+
+    def __init__(self, clock=time.monotonic, sleep=time.sleep) -> None:
+        self.clock = clock
+        self.sleep = sleep
+        self.lock = threading.Lock()
+        self.buckets: Dict[str, TokenBucket] = {}
+
+    def configure(self, host: str, ratePerMinute: float, burst: int = 1):
+        with self.lock:
+            self.buckets[host] = TokenBucket(
+                ratePerMinute / 60, burst, clock=self.clock, sleep=self.sleep
+            )
+
+    def acquire(self, host: str):
+        self.__bucketFor(host).acquire()
+
+    def updateFromHeaders(self, host: str, getheader: Callable[[str], Optional[str]]):
+        """Reads X-RateLimit-Limit (per minute), X-RateLimit-Remaining
+        and X-RateLimit-Reset (epoch seconds) like Anilist sends them"""
+        try:
+            limit = getheader("X-RateLimit-Limit")
+            remaining = getheader("X-RateLimit-Remaining")
+            reset = getheader("X-RateLimit-Reset")
+            ratePerMinute = float(limit) if limit is not None else None
+            remainingCalls = int(remaining) if remaining is not None else None
+            resetIn = float(reset) - time.time() if reset is not None else None
+        except ValueError:
+            return
+        if ratePerMinute is None and remainingCalls is None:
+            return
+        if remainingCalls is not None and remainingCalls <= 0:
+            self.logger.debug(f"Rate limit for {host} used up")
+        self.__bucketFor(host).update(ratePerMinute, remainingCalls, resetIn)
+
+    def __bucketFor(self, host: str) -> TokenBucket:
+        with self.lock:
+            bucket = self.buckets.get(host)
+            if bucket is None:
+                bucket = TokenBucket(None, clock=self.clock, sleep=self.sleep)
+                self.buckets[host] = bucket
+            return bucket
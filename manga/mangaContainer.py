@@ -11,6 +11,8 @@ from manga.createMetadata3 import CreateMetadata3
 from manga.deleteReadAnilist import DeleteReadChapters
 from manga.checkMissingSQL import CheckMissingChaptersInSQL
 from manga.checkForUpdates import CheckForUpdates
+from manga.sourceScanner import SourceScanner
+from manga.refreshMetadata import RefreshMetadata
 
 
 class MangaContainer:
@@ -55,7 +57,21 @@ class MangaContainer:
             self.database, self.filesystem, self.tracker
         )
 
+        self.sourceScanner = SourceScanner(
+            self.database, self.config["manga"]["sourcefolder"]
+        )
+
+        self.refreshMetadata = RefreshMetadata(
+            self.database,
+            self.filesystem,
+            self.tracker,
+            self.config["manga"].getint("refreshworkers", fallback=4),
+        )
+
         self.checkForUpdates = CheckForUpdates(
-            mangaUpdates, self.database, self.tracker
+            mangaUpdates,
+            self.database,
+            self.tracker,
+            self.config.getint("mangaupdates", "workers", fallback=4),
         )
         pass
@@ -1,10 +1,16 @@
-from typing import Optional
+from typing import Dict, Iterable, Optional
 from cross.decorators import Logger
 from manga.gateways.anilist import TrackerGatewayInterface
-import os
+from manga.utils.filenameParser import parseFilename, parseFilenames
+from manga.utils.newestEntry import newestEntryIn
+from models.manga import ParsedFilename
 from pathlib import Path
 import re
-import glob
+
+VOL_NOTATION = re.compile(r"v([0-9]+\.?[0-9]*)")
+EX_NOTATION = re.compile(r"^(\w+_|\#)?ex\ -\ .*?([0-9]+)?")
+CH_NOTATION = re.compile(r"Ch\.\ ?([0-9]+\.?[0-9]*)")
+ANY_NUMBER = re.compile(r"[0-9]+\.?[0-9]*")
 
 
 @Logger
@@ -19,11 +25,10 @@ class CalculateChapterName:
         else:
             return num
 
-    def _getNewestFileIn(self, folder):
-        list_of_files = glob.glob(
-            folder + "/*"
-        )
-        latest_file = max(list_of_files, key=os.path.getctime)
+    def _getNewestFileIn(self, folder) -> Optional[str]:
+        latest_file = newestEntryIn(folder)
+        if latest_file is None:
+            return None
         return Path(latest_file).stem
 
     def _getNewestChAnilistFor(self, anilistId):
@@ -52,15 +57,13 @@ class CalculateChapterName:
         return detectedChapter
 
     def __volNotation(self, chapterName: str, anilistId: int) -> Optional[str]:
-        volRegex = r"v([0-9]+\.?[0-9]*)"
-        matchObj = re.search(volRegex, chapterName)
+        matchObj = VOL_NOTATION.search(chapterName)
         if matchObj:
             return matchObj.group(1).lstrip("0") or ("0")
         return None
 
     def __exNotation(self, chapterName: str, anilistId: int) -> Optional[str]:
-        exRegex = r"^(\w+_|\#)?ex\ -\ .*?([0-9]+)?"
-        matchObj = re.search(exRegex, chapterName)
+        matchObj = EX_NOTATION.search(chapterName)
         if matchObj:
             result = self._getNewestChAnilistFor(anilistId)
             if result:
@@ -70,8 +73,7 @@ class CalculateChapterName:
     def __defaultChapterNotation(self,
                                  chapterName: str,
                                  anilistId: int) -> Optional[str]:
-        chRegex = r"Ch\.\ ?([0-9]+\.?[0-9]*)"
-        matchObj = re.search(chRegex, chapterName)
+        matchObj = CH_NOTATION.search(chapterName)
         if matchObj:
             return matchObj.group(1).lstrip("0") or "0"
         return None
@@ -79,8 +81,7 @@ class CalculateChapterName:
     def __anyOtherNumberNotation(self,
                                  chapterName: str,
                                  anilistId: int) -> Optional[str]:
-        largeNumRegex = r"[0-9]+\.?[0-9]*"
-        matchObj = re.findall(largeNumRegex, chapterName)
+        matchObj = ANY_NUMBER.findall(chapterName)
         if matchObj:
             intMatch = map(lambda x: float(x), matchObj)
             result = sorted(intMatch, reverse=True)
@@ -96,22 +97,25 @@ class CalculateChapterName:
                 return str(result) + ".8"
         return None
 
-    def calc_from_filename(self, file_name) -> Optional[list[str]]:
+    def calc_from_filename(self, file_name) -> Optional[ParsedFilename]:
         """for an explanation of the regex, check the bottom of the file"""
-        expected_filename_regex = r"^(.+)\sv([0-9]+\.?[0-9]*)\s(\((\d+)\))?\s\(Digital\)[\(F\d\)\s]+\((.+)\)$"
-        match_obj = re.search(expected_filename_regex, file_name)
-        if match_obj is None:
+        result = parseFilename(file_name)
+        if result is None:
             # breaks file naming, might as well quarantine it and fix filenames later
             return None
 
-        chapter_name = match_obj.group(1)
-        chapter_number = match_obj.group(2).lstrip("0") or "0"
-        # group(3) is just `(group(4))`
-        year = match_obj.group(4)
-        scan_info = match_obj.group(5)
-
-        self.logger.debug(f"Regex results for {file_name}: [ {chapter_name}, {chapter_number}, {year}, {scan_info} ]")
-        return [chapter_name, chapter_number, year, scan_info]
+        self.logger.debug(f"Regex results for {file_name}: {result}")
+        return result
+
+    def calc_from_filenames(
+        self, file_names: Iterable[str]
+    ) -> Dict[str, Optional[ParsedFilename]]:
+        """calc_from_filename for a whole folder listing, keyed by file name"""
+        results = parseFilenames(file_names)
+        for file_name, result in results.items():
+            if result is not None:
+                self.logger.debug(f"Regex results for {file_name}: {result}")
+        return results
 
 
 """
@@ -1,4 +1,4 @@
-from typing import Optional, List
+from typing import Iterable, List, Optional, Tuple
 import datetime
 from manga.gateways.anilist import AnilistGateway
 from manga.gateways.database import DatabaseGateway
@@ -30,26 +30,56 @@ class CheckGapsInChapters:
         self.filesystem = filesystem
         pass
 
-    def getGapsFromChaptersSince(self, date: datetime):
-        dbresult = self.database.getAllChapters()
-        # dbresult = self.database.getAllChaptersOfSeriesUpdatedAfter(date)
+    # Gaps can only be over MAX_GAP once rounded if they're over this
+    GAP_CANDIDATE = 1.0
+    MAX_GAP = 1.1
+
+    def getGapsFromChaptersSince(self, date: datetime, full: bool = False):
+        """Series updated since date that have gaps, quarantining every series
+        with gaps and restoring the ones that no longer have them.
+        Only series whose chapters changed since the last check are looked at
+        again, unless full, which recomputes everything and checks
+        the quarantine folder too"""
+        if full:
+            self.database.markAllSeriesGapsDirty()
+        storedState = self.database.getSeriesGapState()
+        # Lowest chapter and gaps are computed by the database,
+        # so chapters aren't loaded one by one
+        changedStats = dict(
+            (row["anilistId"], row)
+            for row in self.database.getChapterStatsForDirtySeries()
+        )
+        candidateGaps = self.database.getChapterGaps(
+            self.GAP_CANDIDATE, dirtyOnly=True
+        )
         lastUpdatedSeries = self.database.getSeriesLastUpdatedSince(date)
-        trackerMapData = self.anilist.getAllEntries()
+        trackerMapData = self.anilist.getSnapshot()
+        if trackerMapData is None:
+            self.logger.error("Couldn't get the Anilist list, gaps not checked")
+            return
 
         lastUpdatedMapData = dict((v["anilistId"], v) for v in lastUpdatedSeries)
-        dbMapData = dict()
-        for i in dbresult:
-            if not i["anilistId"] in dbMapData:
-                dbMapData[i["anilistId"]] = [i]
-            else:
-                dbMapData[i["anilistId"]].append(i)
+
+        states = dict()
+        for anilistId, stored in storedState.items():
+            state = dict(stored)
+            if stored["dirty"]:
+                stats = changedStats.get(anilistId)
+                state.update(stats if stats is not None else dict(
+                    first_chapter=None, lowest=None, highest=None, chapters=0))
+                state["gaps"] = None
+            states[anilistId] = state
 
         newQuarantineList = list()
         allQuarantineAnilist = list()
-
-        for row in dbMapData.items():
-            rowAnilistId = row[0]
-            rowData = row[1]
+        toRestore = list()
+        changedStates = list()
+
+        withChapters = [x for x in states.values() if x["chapters"]]
+        withChapters.sort(key=lambda x: x["first_chapter"])
+        for state in withChapters:
+            rowAnilistId = state["anilistId"]
+            lowestChapter = state["lowest"]
             trackerData = trackerMapData.get(rowAnilistId)
             if trackerData is None:
                 self.logger.error(f"{rowAnilistId} not in tracker")
@@ -59,41 +89,76 @@ class CheckGapsInChapters:
 
             series_in_date: bool = (lastUpdatedMapData.get(rowAnilistId) is not None)
             if realProgress is None:
-                self.logger.info("no progress in Anilist for %s \n" % row[0])
+                self.logger.info("no progress in Anilist for %s \n" % rowAnilistId)
                 return
 
             titles = trackerData.titles
-            allChapters = list(map(lambda x: float(x["chapter"]), rowData))
             current_series = MissingChapter(
-                rowAnilistId, titles[0], min(allChapters), realProgress)
-
-            if self.__gapExistsInTrackerProgress(realProgress, allChapters):
+                rowAnilistId, titles[0], lowestChapter, realProgress)
+            wasDirty = bool(state["dirty"])
+            if state["gaps"] is None:
+                state["gaps"] = self.__countGaps(
+                    candidateGaps.get(rowAnilistId, []),
+                    titlesForLogging=titles,
+                    shouldLog=series_in_date,
+                )
+
+            if self.__gapExistsInTrackerProgress(realProgress, [lowestChapter]):
                 if series_in_date:
                     self.logger.info(
                         "{} - Last read at {}, but only {} is in DB".format(
-                            titles, realProgress, min(allChapters)
+                            titles, realProgress, lowestChapter
                         )
                     )
-                    newQuarantineList.append(current_series)
-                allQuarantineAnilist.append(rowAnilistId)
-                continue
-
-            noGapsInChapters = self.__checkConsecutive(
-                allChapters, titlesForLogging=titles, shouldLog=series_in_date
-            )
-            if not noGapsInChapters:
-                allQuarantineAnilist.append(rowAnilistId)
+                hasGaps = True
+            else:
+                hasGaps = state["gaps"] > 0
+
+            if hasGaps:
                 if series_in_date:
                     newQuarantineList.append(current_series)
-
-        self.__checkQuarantines(allQuarantineAnilist)
+                # Dirty series may have new archives to move into quarantine
+                if full or wasDirty or state["quarantined"] != 1:
+                    allQuarantineAnilist.append(rowAnilistId)
+            elif state["quarantined"] != 0:
+                toRestore.append(rowAnilistId)
+
+            if wasDirty or state["progress"] != realProgress or \
+                    state["quarantined"] != int(hasGaps):
+                state.update(progress=realProgress, quarantined=int(hasGaps))
+                changedStates.append(state)
+
+        for state in states.values():
+            if not state["chapters"] and (state["dirty"] or state["quarantined"]):
+                if state["quarantined"] != 0:
+                    toRestore.append(state["anilistId"])
+                state["quarantined"] = 0
+                changedStates.append(state)
+
+        if full:
+            self.__checkQuarantines(allQuarantineAnilist)
+        else:
+            self.__restoreQuarantines(toRestore)
 
         for anilistId in allQuarantineAnilist:
             self.filesystem.quarantineSeries(anilistId=anilistId)
 
+        self.database.saveSeriesGapState(changedStates)
+
         # limitedByDate = filter(lambda x: x[3] > datetime, newQuarantineList)
         return newQuarantineList
 
+    def __restoreQuarantines(self, candidates: List[int]):
+        """Restores the candidates which were quarantined.
+        The quarantine folder is only listed when some of them
+        have never been checked before"""
+        if not candidates:
+            return
+        quarantinedSeries = set(self.filesystem.getQuarantinedSeries())
+        for anilistId in candidates:
+            if anilistId in quarantinedSeries:
+                self.filesystem.restoreQuarantinedArchive(anilistId)
+
     def __checkQuarantines(self, newQuarantineList: list):
         "If a series isn't listed in the updated quarantine list. Remove it"
         quarantinedSeries = self.filesystem.getQuarantinedSeries()
@@ -104,28 +169,28 @@ class CheckGapsInChapters:
             self.filesystem.restoreQuarantinedArchive(anilistId)
         return
 
-    def __checkConsecutive(
-        self, listToCheck: list, titlesForLogging: Optional[str] = None, shouldLog=True
-    ) -> bool:
-        sortedChapters = sorted(listToCheck)
-        lastChapter = None
-        found_gap = False
-        for chap in sortedChapters:
-            if (lastChapter is not None) and (round(chap - lastChapter, 1) > 1.1):
-                found_gap = True
+    def __countGaps(
+        self,
+        pairs: Iterable[Tuple[float, float]],
+        titlesForLogging: Optional[str] = None,
+        shouldLog=True,
+    ) -> int:
+        gaps = 0
+        for lastChapter, chap in pairs:
+            if round(chap - lastChapter, 1) > self.MAX_GAP:
+                gaps += 1
                 if titlesForLogging is not None and shouldLog:
                     self.logger.info(
                         f"{titlesForLogging} - Gap between {lastChapter} and {chap}"
                     )
-            lastChapter = chap
-        return not found_gap
+        return gaps
 
     def __gapExistsInTrackerProgress(
         self, trackerProgress: int, chapters: list
     ) -> bool:
         """Checks if the lowest chapter we have
         is right after the last one in the tracker"""
-        return round(trackerProgress - min(chapters), 1) < -1.1
+        return round(trackerProgress - min(chapters), 1) < -self.MAX_GAP
 
     def __getNoLongerQuarantined(
         self, oldList: List[int], newList: List[int]
@@ -0,0 +1,86 @@
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import List
+from cross.decorators import Logger
+from manga.createMetadata3 import ComicInfoTemplate, chapterFieldsOf
+from manga.gateways.anilist import TrackerGatewayInterface
+from manga.gateways.database import DatabaseGateway
+from manga.gateways.filesystem import COMIC_INFO, FilesystemInterface
+from models.anilistToComicInfo import AnilistComicInfo
+
+
+@Logger
+class RefreshMetadata:
+    """Updates the ComicInfo.xml of archived chapters with what Anilist
+    says about their series now. Only that member of each archive is rewritten,
+    pages are copied as they are. Series are refreshed concurrently"""
+
+    def __init__(
+        self,
+        database: DatabaseGateway,
+        filesystem: FilesystemInterface,
+        tracker: TrackerGatewayInterface,
+        workers: int = 4,
+    ) -> None:
+        self.database = database
+        self.filesystem = filesystem
+        self.tracker = tracker
+        self.workers = max(1, workers)
+
+    def execute(self) -> Counter:
+        """Counts of refreshed, unchanged, skipped and failed archives"""
+        archives = self.database.getArchivesForAllSeries()
+        # Asked from this thread, the workers only touch the archives
+        allSeries = self.tracker.search_media_by_ids(archives.keys()) or {}
+
+        counts: Counter = Counter()
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            futures = {}
+            for anilistId, paths in archives.items():
+                anilistData = allSeries.get(anilistId)
+                if anilistData is None:
+                    self.logger.info(f"No Anilist data for {anilistId}, skipping")
+                    counts["skipped"] += len(paths)
+                    continue
+                future = executor.submit(self.__refreshSeries, anilistData, paths)
+                futures[future] = anilistId
+            for future in as_completed(futures):
+                counts.update(future.result())
+
+        self.logger.info(
+            "Metadata refreshed in {refreshed}, unchanged in {unchanged}, "
+            "skipped {skipped}, failed {failed} archives".format(
+                **{key: counts[key]
+                   for key in ["refreshed", "unchanged", "skipped", "failed"]}
+            )
+        )
+        return counts
+
+    def __refreshSeries(
+        self, anilistData: AnilistComicInfo, paths: List[str]
+    ) -> Counter:
+        counts: Counter = Counter()
+        template = ComicInfoTemplate(anilistData)
+        for path in paths:
+            archivePath = Path(path)
+            try:
+                current = self.filesystem.readArchiveMember(archivePath, COMIC_INFO)
+                if current is None:
+                    # Chapter fields only live in the archive's ComicInfo.xml
+                    self.logger.debug(f"{path} has no {COMIC_INFO}, skipping")
+                    counts["skipped"] += 1
+                    continue
+                updated = template.fill(*chapterFieldsOf(current))
+                if updated == current:
+                    counts["unchanged"] += 1
+                    continue
+                self.filesystem.replaceArchiveMember(archivePath, COMIC_INFO, updated)
+                counts["refreshed"] += 1
+            except FileNotFoundError:
+                self.logger.debug(f"{path} isn't in the archive folder, skipping")
+                counts["skipped"] += 1
+            except Exception as thrown_exception:
+                self.logger.error(f"Couldn't refresh {path}: {thrown_exception}")
+                counts["failed"] += 1
+        return counts
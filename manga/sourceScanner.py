@@ -0,0 +1,117 @@
+import os
+from typing import Dict, Iterator, Optional, Set, Tuple
+from cross.decorators import Logger
+from manga.gateways.database import DatabaseGateway
+
+StatKey = Tuple[int, int, int]
+
+
+def _statKey(entry: os.DirEntry) -> StatKey:
+    stat = entry.stat()
+    return (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+
+
+def _visibleEntries(path: str) -> Iterator[os.DirEntry]:
+    "Like glob's *, hidden entries are skipped"
+    try:
+        with os.scandir(path) as entries:
+            for entry in entries:
+                if not entry.name.startswith("."):
+                    yield entry
+    except (FileNotFoundError, NotADirectoryError):
+        return
+
+
+@Logger
+class SourceScanner:
+    """Lists the chapter folders (sourceFolder/*/*/<series>/<chapter>)
+    that may need work.
+
+    The mtime, size and inode of series and chapter folders are kept in
+    the database. A series folder that didn't change since a run that left
+    nothing pending in it is skipped without listing it, and inside changed
+    series only new or changed chapter folders are returned.
+    Downloaders add chapters by renaming them into the series folder,
+    which changes it. Pages changed in place are only seen by a rescan"""
+
+    def __init__(self, database: DatabaseGateway, sourceFolder: str) -> None:
+        self.database = database
+        self.sourceFolder = sourceFolder
+        self.__reset({})
+
+    def __reset(self, known):
+        self.__known = known
+        self.__skippedSeries: Set[str] = set()
+        self.__unchangedChapters: Set[str] = set()
+        self.__series: Dict[str, StatKey] = {}
+        self.__pending: Dict[str, Set[str]] = {}
+        self.__chapters: Dict[str, Tuple[str, StatKey]] = {}
+        self.__done: Set[str] = set()
+
+    def scan(self, rescan=False) -> Iterator[str]:
+        """Yields chapter paths. rescan ignores what previous runs saw.
+        Chapters passed to markDone are remembered by commit()"""
+        self.__reset(self.database.getScanState())
+        for group in _visibleEntries(self.sourceFolder):
+            for source in _visibleEntries(group.path):
+                for series in _visibleEntries(source.path):
+                    if not series.is_dir():
+                        continue
+                    yield from self.__scanSeries(series, rescan)
+
+    def __scanSeries(self, series: os.DirEntry, rescan: bool) -> Iterator[str]:
+        seriesPath = os.path.normpath(series.path)
+        seriesState = _statKey(series)
+        if not rescan and self.__knownState(seriesPath) == seriesState:
+            self.__skippedSeries.add(seriesPath)
+            return
+
+        self.__series[seriesPath] = seriesState
+        pending = self.__pending.setdefault(seriesPath, set())
+        for chapter in _visibleEntries(series.path):
+            chapterPath = os.path.normpath(chapter.path)
+            chapterState = _statKey(chapter)
+            if not rescan and self.__knownState(chapterPath) == chapterState:
+                self.__unchangedChapters.add(chapterPath)
+                continue
+            self.__chapters[chapterPath] = (seriesPath, chapterState)
+            pending.add(chapterPath)
+            yield chapter.path
+
+    def __knownState(self, path: str) -> Optional[StatKey]:
+        known = self.__known.get(path)
+        return known[1] if known is not None else None
+
+    def markDone(self, chapterPath: str):
+        """The chapter needs no more work while its folder stays unchanged"""
+        chapterPath = os.path.normpath(chapterPath)
+        if chapterPath in self.__chapters:
+            self.__done.add(chapterPath)
+
+    def commit(self):
+        """Saves what this scan saw. Series with chapters that weren't marked
+        done aren't saved, so they're listed again next time"""
+        fresh = [
+            (path, parent, state)
+            for path, (parent, state) in self.__chapters.items()
+            if path in self.__done
+        ]
+        for seriesPath, pending in self.__pending.items():
+            if pending <= self.__done:
+                fresh.append((seriesPath, None, self.__series[seriesPath]))
+
+        stale = []
+        for path, (parent, _) in self.__known.items():
+            if parent is None:
+                keep = path in self.__skippedSeries
+            else:
+                keep = parent in self.__skippedSeries or \
+                    path in self.__unchangedChapters
+            if not keep:
+                stale.append(path)
+
+        self.database.replaceScanState(stale, fresh)
+        self.logger.debug(
+            f"Scan state: {len(fresh)} saved, {len(stale)} removed, "
+            f"{len(self.__skippedSeries)} series unchanged"
+        )
@@ -1,16 +1,20 @@
 from collections import namedtuple
-from typing import Optional, Tuple
+from typing import Optional
 from cross.decorators import Logger
 from manga.gateways.database import DatabaseGateway
 from manga.gateways.anilist import AnilistGateway
-from models.tracker import TrackerSeries
-from .utils.pylev import levenschtein
+from .utils.titleMatcher import TitleIndex
 
 
 @Logger
 class UpdateTrackerIds:
     """Updates local DB with tracker's IDs"""
-    
+
+    # Titles this close are logged as possible matches
+    LOGGED_DISTANCE = 9
+    # The closest title is accepted automatically within this distance
+    MATCH_DISTANCE = 3
+
     def __init__(self, database: DatabaseGateway, anilist: AnilistGateway) -> None:
         self.anilist = anilist
         self.database = database
@@ -23,38 +27,36 @@ class UpdateTrackerIds:
 
 
     def __findTrackerForSeries(
-        self, tracker_entries: [TrackerSeries], series: str, force=False, interactive=False
+        self, index: TitleIndex, series: str, force=False, interactive=False
     ) -> FoundEntry:
-        series_to_match = series.lower()
-        bestMatch: Optional[TrackerSeries] = None
-        bestMatchDistance = 999
-
-        for tracker_entry in tracker_entries:
-            for tracker_title in tracker_entry.titles:
-                prepped_title = tracker_title.lower()
-                rdistance = levenschtein(series_to_match, prepped_title)
-                if rdistance < bestMatchDistance:
-                    bestMatch = tracker_entry
-                    bestMatchDistance = rdistance
-                if rdistance < 10:
-                    self.logger.info(
-                        (f"possible match <{prepped_title}>"
-                         f" - dist {rdistance} | id [{tracker_entry.tracker_id}]")
-                    )
+        # Interactive mode shows the best match however far it is
+        maxDistance = None if interactive else self.LOGGED_DISTANCE
+        matches = index.search(series, maxDistance)
+        bestMatch = TitleIndex.best(matches)
+        bestMatchDistance = bestMatch.distance if bestMatch is not None else 999
+
+        for match in matches:
+            if match.distance <= self.LOGGED_DISTANCE:
+                self.logger.info(
+                    (f"possible match <{match.title}>"
+                     f" - dist {match.distance} | id [{match.entry.tracker_id}]")
+                )
 
         if interactive:
-            self.logger.info(f"Best match at distance {bestMatchDistance} | {bestMatch.tracker_id}")
+            bestId = bestMatch.entry.tracker_id if bestMatch is not None else None
+            self.logger.info(f"Best match at distance {bestMatchDistance} | {bestId}")
             userValue = int(input("Enter Anilist ID: (enter 0 to Skip) "))
             if userValue != 0:
                 return self.FoundEntry(series, userValue)
-        if bestMatchDistance < 4:
-            return self.FoundEntry(series, bestMatch.tracker_id)
+        if bestMatchDistance <= self.MATCH_DISTANCE:
+            return self.FoundEntry(series, bestMatch.entry.tracker_id)
         return None
 
     def updateFor(self, series, interactive=False) -> Optional[int]:
         self.logger.info("Updating for " + series)
         entries = self.anilist.search_media_by_filename(series)
-        result = self.__findTrackerForSeries(entries.values(), series, interactive=interactive)
+        index = TitleIndex(entries.values())
+        result = self.__findTrackerForSeries(index, series, interactive=interactive)
         if result is not None:
             self.database.insertTracking(result.series_name, result.tracker_entry)
             return result.tracker_entry
@@ -64,14 +66,18 @@ class UpdateTrackerIds:
 
     def updateAll(self):
         """Updates all series in DB that don't have tracker IDs"""
-        entries = self.anilist.getAllEntries()
+        snapshot = self.anilist.getSnapshot()
+        if snapshot is None:
+            self.logger.error("Couldn't get the Anilist list, no IDs updated")
+            return
+        index = snapshot.titleIndex
 
         rows = self.database.getAllSeriesWithoutTrackerIds()
 
         toadd = list()
 
         for row in rows:
-            result = self.__findTrackerForSeries(entries, row["series"])
+            result = self.__findTrackerForSeries(index, row["series"])
             if result is not None:
                 toadd.append(result)
 
@@ -0,0 +1,31 @@
+import re
+from functools import lru_cache
+from typing import Dict, Iterable, Optional
+from models.manga import ParsedFilename
+
+# See the bottom of manga/mangagetchapter.py for an explanation
+EXPECTED_FILENAME = re.compile(
+    r"^(.+)\sv([0-9]+\.?[0-9]*)\s(\((\d+)\))?\s\(Digital\)[\(F\d\)\s]+\((.+)\)$"
+)
+# Folder names parsed, remembered. Watch mode sees the same ones again
+CACHE_SIZE = 4096
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def parseFilename(fileName: str) -> Optional[ParsedFilename]:
+    """None if fileName doesn't follow the expected naming"""
+    match = EXPECTED_FILENAME.match(fileName)
+    if match is None:
+        return None
+    # group(3) is just `(group(4))`
+    return ParsedFilename(
+        match.group(1),
+        match.group(2).lstrip("0") or "0",
+        match.group(4),
+        match.group(5),
+    )
+
+
+def parseFilenames(fileNames: Iterable[str]) -> Dict[str, Optional[ParsedFilename]]:
+    """parseFilename for a whole folder listing, keyed by file name"""
+    return {fileName: parseFilename(fileName) for fileName in fileNames}
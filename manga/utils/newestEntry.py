@@ -0,0 +1,25 @@
+import os
+from typing import Optional
+
+
+def newestEntryIn(folder: str) -> Optional[str]:
+    """Path of the newest visible entry in folder, by ctime. None if it's empty.
+
+    Same result as max(glob("folder/*"), key=os.path.getctime) in a single
+    os.scandir pass, without building the list of paths first.
+    Nothing is kept between calls, so files rewritten in place are seen"""
+    newest: Optional[str] = None
+    newestCtime = 0
+    with os.scandir(folder) as entries:
+        for entry in entries:
+            # Same entries as glob("folder/*")
+            if entry.name.startswith("."):
+                continue
+            try:
+                ctime = entry.stat().st_ctime_ns
+            except OSError:
+                continue
+            if newest is None or ctime > newestCtime:
+                newest = entry.path
+                newestCtime = ctime
+    return newest
@@ -25,6 +25,11 @@ __license__ = 'New BSD'
 import sys
 PY2 = sys.version_info[0] == 2
 
+try:
+    import numpy
+except ImportError:  # pragma: no cover - numpy is optional
+    numpy = None
+
 if PY2:
     range = xrange
 
@@ -286,6 +291,144 @@ def damerau_levenshtein(string_1, string_2):
     return d0[-1]
 
 
+def bounded_levenshtein(string_1, string_2, max_distance):
+    """
+    Calculates the Levenshtein distance between two strings, as long as it
+    is at most ``max_distance``. Returns ``max_distance + 1`` otherwise.
+
+    Only the diagonal band of width ``2 * max_distance + 1`` is computed
+    (Ukkonen), and it stops as soon as a whole row is over the bound.
+
+    Usage::
+
+        >>> bounded_levenshtein('kitten', 'sitting', 5)
+        3
+        >>> bounded_levenshtein('kitten', 'sitting', 2)
+        3
+        >>> bounded_levenshtein('kitten', 'kitten', 0)
+        0
+
+    """
+    if string_1 == string_2:
+        return 0
+
+    len_1 = len(string_1)
+    len_2 = len(string_2)
+
+    if len_1 > len_2:
+        string_2, string_1 = string_1, string_2
+        len_2, len_1 = len_1, len_2
+
+    over = max_distance + 1
+    if len_2 - len_1 > max_distance:
+        return over
+    if len_1 == 0:
+        return len_2
+
+    d0 = [j if j <= max_distance else over for j in range(len_2 + 1)]
+    d1 = [over] * (len_2 + 1)
+
+    for i in range(1, len_1 + 1):
+        low = max(1, i - max_distance)
+        high = min(len_2, i + max_distance)
+        d1[low - 1] = i if low == 1 else over
+        row_min = d1[low - 1]
+        char_1 = string_1[i - 1]
+
+        for j in range(low, high + 1):
+            cost = d0[j - 1]
+
+            if char_1 != string_2[j - 1]:
+                # substitution
+                cost += 1
+
+                # insertion
+                x_cost = d1[j - 1] + 1
+                if x_cost < cost:
+                    cost = x_cost
+
+                # deletion
+                y_cost = d0[j] + 1
+                if y_cost < cost:
+                    cost = y_cost
+
+                if cost > over:
+                    cost = over
+
+            d1[j] = cost
+            if cost < row_min:
+                row_min = cost
+
+        if high < len_2:
+            # Keeps the cell past the band out of the next row
+            d1[high + 1] = over
+        if row_min > max_distance:
+            return over
+
+        d0, d1 = d1, d0
+
+    return d0[len_2] if d0[len_2] <= max_distance else over
+
+
+# Below this many candidates setting up the arrays costs more than it saves
+NUMPY_MIN_CANDIDATES = 16
+
+
+def levenshtein_many(string_1, candidates, max_distance=None):
+    """
+    Calculates the Levenshtein distance from one string to each candidate.
+    With ``max_distance``, distances over it are returned as
+    ``max_distance + 1``.
+
+    Uses NumPy when it's installed, scoring every candidate at once one row
+    of the matrix at a time. Falls back to ``bounded_levenshtein``
+    and ``levenshtein`` otherwise.
+
+    Usage::
+
+        >>> levenshtein_many('kitten', ['sitting', 'kitten', 'mitten'])
+        [3, 0, 1]
+        >>> levenshtein_many('kitten', ['sitting', 'kitten', 'mitten'], 2)
+        [3, 0, 1]
+
+    """
+    if numpy is None or len(candidates) < NUMPY_MIN_CANDIDATES:
+        if max_distance is None:
+            return [levenshtein(string_1, candidate) for candidate in candidates]
+        return [bounded_levenshtein(string_1, candidate, max_distance)
+                for candidate in candidates]
+
+    lengths = numpy.fromiter((len(c) for c in candidates), dtype=numpy.int64,
+                             count=len(candidates))
+    width = int(lengths.max())
+    # Padding never matches a character, and is past every candidate's column
+    codes = numpy.full((len(candidates), width), -1, dtype=numpy.int64)
+    for row, candidate in enumerate(candidates):
+        codes[row, :len(candidate)] = [ord(char) for char in candidate]
+
+    columns = numpy.arange(width + 1, dtype=numpy.int64)
+    d0 = numpy.broadcast_to(columns, codes.shape[:1] + columns.shape).copy()
+    d1 = numpy.empty_like(d0)
+
+    for i, char_1 in enumerate(string_1, 1):
+        # substitution
+        numpy.add(d0[:, :-1], codes != ord(char_1), out=d1[:, 1:])
+        # deletion
+        numpy.minimum(d1[:, 1:], d0[:, 1:] + 1, out=d1[:, 1:])
+        d1[:, 0] = i
+        # insertion: d1[j] = min over k <= j of d1[k] + (j - k)
+        d1 -= columns
+        numpy.minimum.accumulate(d1, axis=1, out=d1)
+        d1 += columns
+
+        d0, d1 = d1, d0
+
+    distances = d0[numpy.arange(len(candidates)), lengths]
+    if max_distance is not None:
+        numpy.minimum(distances, max_distance + 1, out=distances)
+    return distances.tolist()
+
+
 levenshtein = wfi_levenshtein
 
 # Backward-compatibilty because I misspelled.
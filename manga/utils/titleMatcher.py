@@ -0,0 +1,89 @@
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+from models.tracker import TrackerSeries
+from .pylev import levenshtein_many
+
+
+def normalizeTitle(title: str) -> str:
+    return title.lower()
+
+
+def _bigrams(title: str) -> Counter:
+    return Counter(title[i:i + 2] for i in range(len(title) - 1))
+
+
+class TitleMatch:
+    "A tracker title within the searched distance"
+
+    def __init__(self, entry: TrackerSeries, title: str, distance: int):
+        self.entry = entry
+        self.title = title
+        self.distance = distance
+
+
+class TitleIndex:
+    """Bigram index over the normalized titles of tracker entries.
+
+    Two strings at edit distance k share at least max(len) - 1 - 2k bigrams,
+    so only titles passing that count (and the length difference) are scored,
+    with a distance bounded by maxDistance.
+    Results are the same as scoring every title, in the same order"""
+
+    def __init__(self, entries: Iterable[TrackerSeries]) -> None:
+        self.titles: List[Tuple[TrackerSeries, str]] = []
+        self.postings: Dict[str, List[Tuple[int, int]]] = defaultdict(list)
+        for entry in entries:
+            for title in entry.titles:
+                if not title:
+                    continue
+                normalized = normalizeTitle(title)
+                position = len(self.titles)
+                self.titles.append((entry, normalized))
+                for bigram, count in _bigrams(normalized).items():
+                    self.postings[bigram].append((position, count))
+
+    def search(
+        self, series: str, maxDistance: Optional[int] = None
+    ) -> List[TitleMatch]:
+        """Every title within maxDistance of series (all of them if None),
+        in the order the entries were indexed"""
+        query = normalizeTitle(series)
+        if maxDistance is None:
+            positions = range(len(self.titles))
+        else:
+            positions = self.__candidates(query, maxDistance)
+
+        shortlist = [self.titles[position] for position in positions]
+        distances = levenshtein_many(
+            query, [title for _, title in shortlist], maxDistance
+        )
+
+        matches = []
+        for (entry, title), distance in zip(shortlist, distances):
+            if maxDistance is None or distance <= maxDistance:
+                matches.append(TitleMatch(entry, title, distance))
+        return matches
+
+    def __candidates(self, query: str, maxDistance: int) -> List[int]:
+        shared = Counter()
+        for bigram, count in _bigrams(query).items():
+            for position, titleCount in self.postings.get(bigram, ()):
+                shared[position] += min(count, titleCount)
+
+        candidates = []
+        for position, (_, title) in enumerate(self.titles):
+            if abs(len(title) - len(query)) > maxDistance:
+                continue
+            required = max(len(title), len(query)) - 1 - 2 * maxDistance
+            if required <= 0 or shared[position] >= required:
+                candidates.append(position)
+        return candidates
+
+    @staticmethod
+    def best(matches: List[TitleMatch]) -> Optional[TitleMatch]:
+        "First match at the lowest distance"
+        bestMatch = None
+        for match in matches:
+            if bestMatch is None or match.distance < bestMatch.distance:
+                bestMatch = match
+        return bestMatch
@@ -1,7 +1,28 @@
 from typing import Optional
+from models.immutable import Immutable
 
 
-class AnilistComicInfo:
+class AnilistComicInfo(Immutable):
+    __slots__ = (
+        "tracker_id",
+        "title",
+        "altTitles",
+        "summary",
+        "genres",
+        "status",
+        "format",
+        "country_of_origin",
+        "original_source",
+        "age_rating",
+        "writer",
+        "penciller",
+        "inker",
+        "chapters",
+        "volumes",
+        "site_url",
+        "scan_information",
+    )
+
     def __init__(
             self,
             tracker_id: int,
@@ -22,40 +43,77 @@ class AnilistComicInfo:
             volumes: Optional[int],   # Volumes is null if ongoing
             tags: [str]
     ):
-        self.tracker_id = tracker_id
-
-        self.title = title
-        self.altTitles = synonyms
-        self.summary = description
-        self.genres = ", ".join(genres+tags)
-
-        self.status = status.lower()
-        self.format = manga_format.lower().replace("_", " ")
-        self.country_of_origin = country_of_origin
-        self.original_source = original_source.lower()
-
-        if is_adult:
-            self.age_rating = "Adults Only 18+"
-        else:
-            self.age_rating = "G"
-
-        if writer == "":
-            self.writer = None
-        else:
-            self.writer = writer
-
-        if penciller == "":
-            self.penciller = None
-        else:
-            self.penciller = penciller
-
-        if inker == "":
-            self.inker = None
-        else:
-            self.inker = inker
-
-        self.chapters = chapters
-        self.volumes = volumes
-
-        self.site_url = site_url
-        self.scan_information = ""
+        self._init(
+            tracker_id=tracker_id,
+            title=title,
+            altTitles=synonyms,
+            summary=description,
+            genres=", ".join(genres + tags),
+            status=status.lower(),
+            format=manga_format.lower().replace("_", " "),
+            country_of_origin=country_of_origin,
+            original_source=original_source.lower(),
+            age_rating="Adults Only 18+" if is_adult else "G",
+            writer=writer or None,
+            penciller=penciller or None,
+            inker=inker or None,
+            chapters=chapters,
+            volumes=volumes,
+            site_url=site_url,
+            scan_information="",
+        )
+
+    @classmethod
+    def fromGraphQL(cls, id, media) -> "AnilistComicInfo":
+        """From an Anilist Media object with the fields in
+        AnilistGateway.MEDIA_FIELDS"""
+        staff = media["staff"]
+        writer = ""
+        penciller = ""
+        inker = ""
+
+        for edge in staff["edges"]:
+            node = edge["node"]
+            language = node["languageV2"]
+            if language != "Japanese":
+                continue
+
+            role = edge["role"]
+            name = node["name"]["userPreferred"]
+            if role.startswith("Story"):
+                writer = name
+            if role.endswith("Art"):
+                penciller = name
+                inker = name
+
+        all_tags = media["tags"]
+        tags = []
+        for tag in all_tags:
+            tag_name = tag["name"]
+            tag_category = tag["category"]
+            is_spoiler = tag["isGeneralSpoiler"]
+            rank = tag["rank"]
+            # dont add "weak" tags or spoiler-marked tags
+            if is_spoiler or rank < 60:
+                continue
+            tags.append(f"{tag_category}: {tag_name}")
+
+        return cls(
+            tracker_id=id,
+            title=media["title"]["userPreferred"],
+            manga_format=media["format"],
+            status=media["status"],
+            description=media["description"],
+            country_of_origin=media["countryOfOrigin"],
+            original_source=media["source"],
+            genres=media["genres"],
+            writer=writer,
+            penciller=penciller,
+            inker=inker,
+            synonyms=media["title"]["romaji"],
+            is_adult=media["isAdult"],
+            site_url=media["siteUrl"],
+            chapters=media["chapters"],
+            volumes=media["volumes"],
+            tags=tags
+        )
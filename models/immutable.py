@@ -0,0 +1,47 @@
+class Immutable:
+    """Base for slotted models whose fields can't change after __init__.
+    Subclasses list their fields in __slots__ and set them with _init"""
+
+    __slots__ = ()
+
+    def _init(self, **fields):
+        for name, value in fields.items():
+            object.__setattr__(self, name, value)
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    @classmethod
+    def _fields(cls):
+        for klass in reversed(cls.__mro__):
+            yield from klass.__dict__.get("__slots__", ())
+
+    def replace(self, **changes):
+        """Copy with the given fields changed"""
+        copy = object.__new__(type(self))
+        for name in self._fields():
+            value = changes.pop(name) if name in changes else getattr(self, name)
+            object.__setattr__(copy, name, value)
+        if changes:
+            raise TypeError(f"Unknown fields {', '.join(changes)}")
+        return copy
+
+    def __reduce__(self):
+        return (
+            _restore,
+            (type(self), tuple(getattr(self, name) for name in self._fields())),
+        )
+
+    def __repr__(self):
+        fields = ", ".join(f"{name}={getattr(self, name)!r}" for name in self._fields())
+        return f"{type(self).__name__}({fields})"
+
+
+def _restore(cls, values):
+    instance = object.__new__(cls)
+    for name, value in zip(cls._fields(), values):
+        object.__setattr__(instance, name, value)
+    return instance
@@ -1,14 +1,17 @@
+from typing import Optional
 from pathlib import Path
+from models.immutable import Immutable
 
 
-class SimpleChapter:
+class SimpleChapter(Immutable):
+    __slots__ = ("anilistId", "chapterNumber")
+
     def __init__(
         self,
         anilistId: int,
         chapterNumber: str,
     ):
-        self.anilistId = anilistId
-        self.chapterNumber = chapterNumber
+        self._init(anilistId=anilistId, chapterNumber=chapterNumber)
 
     def __eq__(self, other):
         """Overrides the default implementation"""
@@ -20,10 +23,19 @@ class SimpleChapter:
         return False
 
     def __hash__(self):
-        return hash(self.anilistId) + hash(self.chapterNumber)
+        return hash((self.anilistId, self.chapterNumber))
 
 
 class Chapter(SimpleChapter):
+    __slots__ = (
+        "seriesName",
+        "chapterName",
+        "sourcePath",
+        "archivePath",
+        "scan_info",
+        "year",
+    )
+
     def __init__(
         self,
         anilistId: int,
@@ -35,16 +47,21 @@ class Chapter(SimpleChapter):
         scan_info="",
         year="2021"
     ):
-        self.anilistId = anilistId
-        self.seriesName = seriesName
-        self.chapterNumber = chapterNumber
-        self.chapterName = chapterName
-        self.sourcePath = sourcePath
-        self.archivePath = archivePath
-        self.scan_info = scan_info
-        self.year = year
-
-class MissingChapter:
+        self._init(
+            anilistId=anilistId,
+            seriesName=seriesName,
+            chapterNumber=chapterNumber,
+            chapterName=chapterName,
+            sourcePath=sourcePath,
+            archivePath=archivePath,
+            scan_info=scan_info,
+            year=year,
+        )
+
+
+class MissingChapter(Immutable):
+    __slots__ = ("tracker_id", "series_name", "stored_chapter", "tracker_chapter")
+
     def __init__(
         self,
         tracker_id: str,
@@ -52,7 +69,29 @@ class MissingChapter:
         stored_chapter: str,
         tracker_chapter: str,
     ) -> None:
-        self.tracker_id = tracker_id
-        self.series_name = series_name
-        self.stored_chapter = stored_chapter
-        self.tracker_chapter = tracker_chapter
+        self._init(
+            tracker_id=tracker_id,
+            series_name=series_name,
+            stored_chapter=stored_chapter,
+            tracker_chapter=tracker_chapter,
+        )
+
+
+class ParsedFilename(Immutable):
+    """What a chapter's folder name says about it"""
+
+    __slots__ = ("seriesName", "chapterNumber", "year", "scanInfo")
+
+    def __init__(
+        self,
+        seriesName: str,
+        chapterNumber: str,
+        year: Optional[str],
+        scanInfo: str,
+    ) -> None:
+        self._init(
+            seriesName=seriesName,
+            chapterNumber=chapterNumber,
+            year=year,
+            scanInfo=scanInfo,
+        )
@@ -1,20 +1,51 @@
-from typing import Optional
+from typing import Optional, Sequence, Tuple
+from models.immutable import Immutable
 
 
-class TrackerSeries:
+class TrackerSeries(Immutable):
+    __slots__ = (
+        "tracker_id",
+        "titles",
+        "status",
+        "chapters",
+        "country_of_origin",
+        "progress",
+    )
+
     def __init__(
         self,
         tracker_id: int,
-        titles: [str],
+        titles: Sequence[str],
         status: str,
         # Chapters is null if an ongoing series
         chapters: Optional[int],
         country_of_origin: str,
         progress: int,
     ):
-        self.tracker_id = tracker_id
-        self.titles = titles
-        self.status = status
-        self.chapters = chapters
-        self.country_of_origin = country_of_origin
-        self.progress = progress
+        self._init(
+            tracker_id=tracker_id,
+            titles=tuple(titles),
+            status=status,
+            chapters=chapters,
+            country_of_origin=country_of_origin,
+            progress=progress,
+        )
+
+    @classmethod
+    def fromGraphQL(
+        cls,
+        media: dict,
+        progress: int = 0,
+        titleKeys: Tuple[str, ...] = ("english", "romaji"),
+    ) -> "TrackerSeries":
+        """From an Anilist Media object. Empty titles are left out"""
+        titles = [media["title"][key] for key in titleKeys]
+        titles += media.get("synonyms") or []
+        return cls(
+            media["id"],
+            filter(None, titles),
+            media["status"],
+            media["chapters"],
+            media["countryOfOrigin"],
+            progress,
+        )
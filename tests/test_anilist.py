@@ -0,0 +1,128 @@
+import json
+import unittest
+from unittest.mock import MagicMock, patch
+from manga.gateways.anilist import AnilistGateway
+from manga.gateways.utils.httpPool import HttpResponse
+
+
+def fakeMedia(id):
+    return {
+        "id": id, "idMal": None,
+        "title": {"userPreferred": f"title{id}", "romaji": f"romaji{id}"},
+        "format": "MANGA", "status": "FINISHED", "description": "desc",
+        "countryOfOrigin": "JP", "source": "ORIGINAL", "genres": ["Drama"],
+        "staff": {"edges": [{"node": {"name": {"userPreferred": "writer"},
+                                      "languageV2": "Japanese"},
+                             "role": "Story & Art"}]},
+        "isAdult": False, "siteUrl": f"https://anilist.co/manga/{id}",
+        "chapters": 10, "volumes": 2, "tags": [],
+    }
+
+
+class TestAnilistGateway(unittest.TestCase):
+    def __fakeConnection(self, pages):
+        responses = []
+        for page in pages:
+            response = MagicMock()
+            response.status = 200
+            body = {"data": {"Page": {"media": page}}}
+            response.read = MagicMock(return_value=json.dumps(body).encode("utf-8"))
+            response.getheaders = MagicMock(return_value=[])
+            responses.append(response)
+        connection = MagicMock()
+        connection.getresponse = MagicMock(side_effect=responses)
+        return connection
+
+    def test_searchMediaByIds_manyIds_onePagePerFifty(self):
+        ids = list(range(1, 61))
+        connection = self.__fakeConnection(
+            [[fakeMedia(x) for x in ids[:50]], [fakeMedia(x) for x in ids[50:]]])
+        with patch("http.client.HTTPSConnection", return_value=connection):
+            sut = AnilistGateway("token", 1)
+            result = sut.search_media_by_ids(ids)
+
+        self.assertEqual(connection.request.call_count, 2)
+        self.assertEqual(sorted(result.keys()), ids)
+        self.assertEqual(result[7].title, "title7")
+        self.assertEqual(result[7].writer, "writer")
+
+    def test_searchMediaById_afterBatch_noRequest(self):
+        connection = self.__fakeConnection([[fakeMedia(3)]])
+        with patch("http.client.HTTPSConnection", return_value=connection):
+            sut = AnilistGateway("token", 1)
+            sut.search_media_by_ids([3])
+            result = sut.search_media_by_id(3)
+
+        self.assertEqual(connection.request.call_count, 1)
+        self.assertEqual(result.site_url, "https://anilist.co/manga/3")
+
+    def test_searchMediaById_ttlPassed_requestedAgain(self):
+        body = json.dumps({"data": {"Media": fakeMedia(3)}}).encode("utf-8")
+        http = MagicMock()
+        http.request = MagicMock(return_value=HttpResponse(200, "OK", [], body))
+        sut = AnilistGateway("token", 1, http=http)
+
+        with patch("manga.gateways.anilist.time.time", return_value=1000):
+            sut.search_media_by_id(3)
+            sut.search_media_by_ids([3])
+        with patch("manga.gateways.anilist.time.time",
+                   return_value=1000 + AnilistGateway.MEDIA_TTL):
+            result = sut.search_media_by_id(3)
+
+        self.assertEqual(result.title, "title3")
+        self.assertEqual(http.request.call_count, 2)
+
+    def test_getProgressFor_ttlPassed_requestedAgain(self):
+        body = json.dumps({"data": {"MediaList": {"progress": 4}}}).encode("utf-8")
+        http = MagicMock()
+        http.request = MagicMock(return_value=HttpResponse(200, "OK", [], body))
+        sut = AnilistGateway("token", 1, http=http)
+
+        with patch("manga.gateways.anilist.time.time", return_value=1000):
+            sut.getProgressFor(3)
+            sut.getProgressFor(3)
+        with patch("manga.gateways.anilist.time.time",
+                   return_value=1000 + AnilistGateway.LIST_TTL):
+            progress = sut.getProgressFor(3)
+
+        self.assertEqual(progress, 4)
+        self.assertEqual(http.request.call_count, 2)
+
+    def __listResponse(self, *lists):
+        body = {"data": {"MediaListCollection": {"lists": [
+            {"entries": [
+                {"progress": 1, "media": {
+                    "id": id, "synonyms": [f"syn{id}"], "countryOfOrigin": "JP",
+                    "title": {"romaji": f"romaji{id}", "english": None},
+                    "status": "RELEASING", "chapters": None}}
+                for id in ids]}
+            for ids in lists]}}}
+        return HttpResponse(200, "OK", [], json.dumps(body).encode("utf-8"))
+
+    def test_getSnapshot_severalCalls_parsedOnceAndShared(self):
+        http = MagicMock()
+        http.request = MagicMock(return_value=self.__listResponse([1, 2], [3]))
+        sut = AnilistGateway("token", 1, http=http)
+
+        snapshot = sut.getSnapshot()
+
+        self.assertIs(sut.getAllEntries(), snapshot)
+        self.assertIs(sut.getSnapshot().titleIndex, snapshot.titleIndex)
+        self.assertEqual(sorted(snapshot.keys()), [1, 2, 3])
+        self.assertEqual(snapshot[3].titles, ("romaji3", "syn3"))
+        self.assertEqual(http.request.call_count, 1)
+        with self.assertRaises(TypeError):
+            snapshot[4] = snapshot[3]
+
+    def test_getSnapshot_invalidated_requestedAgain(self):
+        http = MagicMock()
+        http.request = MagicMock(side_effect=[self.__listResponse([1]),
+                                              self.__listResponse([1, 2])])
+        sut = AnilistGateway("token", 1, http=http)
+        first = sut.getSnapshot()
+
+        sut.invalidateEntries()
+        second = sut.getSnapshot()
+
+        self.assertEqual(len(first), 1)
+        self.assertEqual(len(second), 2)
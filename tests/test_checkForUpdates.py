@@ -0,0 +1,62 @@
+import io
+import unittest
+from contextlib import redirect_stdout
+from unittest.mock import MagicMock
+from manga.checkForUpdates import CheckForUpdates
+from manga.gateways.database import DatabaseGateway
+from manga.gateways.trackerSnapshot import TrackerSnapshot
+from models.tracker import TrackerSeries
+
+
+class TestCheckForUpdates(unittest.TestCase):
+    def setUp(self) -> None:
+        self.database = DatabaseGateway(":memory:")
+        for anilistId, series, mangaUpdatesId in [
+                (1, "behind", 11), (2, "upToDate", 12),
+                (3, "noMangaUpdates", None), (4, "finished", 14)]:
+            self.database.insertTracking(series, anilistId)
+            self.database.insertMangaUpdt(anilistId, mangaUpdatesId)
+            for chapter in ["1", "2", "3"]:
+                self.database.insertChapter(
+                    series, chapter, f"{series}{chapter}a", f"{series}{chapter}s")
+
+        self.tracker = MagicMock()
+        self.tracker.getSnapshot = MagicMock(return_value=TrackerSnapshot({
+            1: TrackerSeries(1, ["behind"], "RELEASING", None, "JP", 1),
+            2: TrackerSeries(2, ["upToDate"], "RELEASING", None, "JP", 1),
+            3: TrackerSeries(3, ["noMangaUpdates"], "RELEASING", None, "JP", 1),
+            4: TrackerSeries(4, ["finished"], "FINISHED", 3, "JP", 1),
+        }))
+        self.mangaUpdates = MagicMock()
+        self.mangaUpdates.latestReleaseForId = MagicMock(
+            side_effect=lambda id: {11: "5", 12: "3"}[id])
+        self.sut = CheckForUpdates(self.mangaUpdates, self.database, self.tracker)
+        return super().setUp()
+
+    def test_checkForUpdates_mixedSeries_printsOnlyOutdated(self):
+        output = io.StringIO()
+        with redirect_stdout(output):
+            self.sut.checkForUpdates()
+
+        lines = output.getvalue().splitlines()
+        self.assertEqual(lines[0], ("behind (1) - has 3 in DB. Last read 1. "
+                                    "Latest chapter is 5"))
+        self.assertEqual(
+            lines[1], "Checked 2 series. 1 have newer releases, 0 couldn't be checked")
+        calls = self.mangaUpdates.latestReleaseForId.call_args_list
+        checked = sorted(call.args[0] for call in calls)
+        self.assertEqual(checked, [11, 12])
+
+    def test_checkForUpdates_requestFails_countedAndOthersChecked(self):
+        def release(id):
+            if id == 12:
+                raise ConnectionError("down")
+            return "5"
+        self.mangaUpdates.latestReleaseForId = MagicMock(side_effect=release)
+
+        output = io.StringIO()
+        with redirect_stdout(output):
+            self.sut.checkForUpdates()
+
+        self.assertIn("1 have newer releases, 1 couldn't be checked",
+                      output.getvalue())
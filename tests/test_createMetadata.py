@@ -102,7 +102,7 @@ class TestCreateMetadata(unittest.TestCase):
         different_case_series = "series N"
         second_series_name = "other series"
 
-        fake.seriesName = "series.N"
+        fake = fake.replace(seriesName="series.N")
 
         stub = TrackerSeries(
             fake.anilistId, [different_case_series,
@@ -119,7 +119,7 @@ class TestCreateMetadata(unittest.TestCase):
         different_case_series = " series N"
         second_series_name = "other series"
 
-        fake.seriesName = "series N"
+        fake = fake.replace(seriesName="series N")
 
         stub = TrackerSeries(
             fake.anilistId, [different_case_series,
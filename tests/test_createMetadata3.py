@@ -0,0 +1,83 @@
+# -*- coding: UTF-8 -*-
+import unittest
+from pathlib import Path
+from unittest.mock import MagicMock
+from manga.createMetadata3 import CreateMetadata3, buildComicInfo
+from models.anilistToComicInfo import AnilistComicInfo
+from models.manga import Chapter
+
+
+def comicInfo(tracker_id=1, country_of_origin="JP",
+              description="A <b>story</b> & more"):
+    return AnilistComicInfo(
+        tracker_id=tracker_id,
+        title="Série Name",
+        manga_format="MANGA",
+        status="RELEASING",
+        description=description,
+        country_of_origin=country_of_origin,
+        original_source="ORIGINAL",
+        genres=["Action"],
+        writer="Writer",
+        penciller="",
+        inker=None,
+        synonyms="Romaji Name",
+        is_adult=False,
+        site_url="https://anilist.co/manga/1",
+        chapters=None,
+        volumes=None,
+        tags=["Theme: Tag"],
+    )
+
+
+class TestCreateMetadata3(unittest.TestCase):
+    def setUp(self) -> None:
+        self.anilist = MagicMock()
+        self.anilist.search_media_by_id = MagicMock(return_value=comicInfo())
+        self.filesystem = MagicMock()
+        self.sut = CreateMetadata3(self.filesystem, self.anilist)
+        return super().setUp()
+
+    def __generate(self, chapter: Chapter) -> bytes:
+        self.sut.execute(chapter)
+        return self.filesystem.saveFile.call_args.kwargs["stringData"]
+
+    def __chapter(self, name, number, year="2021", scan="Group & Co"):
+        return Chapter(1, "folder", number, name, Path("/source/1"),
+                       Path("/archive/1.cbz"), scan, year)
+
+    def test_execute_manyChapters_sameBytesAsFullTree(self):
+        chapters = [
+            self.__chapter("Series", "1"),
+            self.__chapter("Série <special> & \"quoted\"", "2.5", None, ""),
+            self.__chapter("", "3", "2020", None),
+        ]
+        for chapter in chapters:
+            expected = buildComicInfo(
+                self.anilist.search_media_by_id(1), chapter.chapterName,
+                chapter.chapterNumber, str(chapter.year), chapter.scan_info)
+            self.assertEqual(self.__generate(chapter), expected)
+
+    def test_execute_notJapanese_sameBytesAsFullTree(self):
+        data = comicInfo(country_of_origin="KR", description=None)
+        self.anilist.search_media_by_id = MagicMock(return_value=data)
+        chapter = self.__chapter("Series", "1")
+
+        result = self.__generate(chapter)
+
+        self.assertEqual(result, buildComicInfo(data, "Series", "1", "2021",
+                                                "Group & Co"))
+        self.assertNotIn(b"<Manga>", result)
+
+    def test_execute_sameSeries_templateReused(self):
+        self.__generate(self.__chapter("Series", "1"))
+        template = self.sut.templates[1]
+        self.__generate(self.__chapter("Series", "2"))
+        self.assertIs(self.sut.templates[1], template)
+
+        self.anilist.search_media_by_id = MagicMock(
+            return_value=comicInfo(description="Updated"))
+        result = self.__generate(self.__chapter("Series", "3"))
+
+        self.assertIsNot(self.sut.templates[1], template)
+        self.assertIn(b"<Summary>Updated</Summary>", result)
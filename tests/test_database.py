@@ -0,0 +1,115 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+from manga.gateways.database import DatabaseGateway
+
+
+class TestDatabaseGateway(unittest.TestCase):
+    def setUp(self) -> None:
+        self.sut = DatabaseGateway(":memory:")
+        self.sut.insertTracking("seriesOne", 1)
+        self.sut.insertTracking("seriesTwo", 2)
+        for series, chapter in [("seriesOne", "1"), ("seriesOne", "2"),
+                                ("seriesOne", "10"), ("seriesTwo", "4.5"),
+                                ("seriesTwo", "5"), ("untracked", "1")]:
+            self.sut.insertChapter(series, chapter, f"{series}/{chapter}.cbz",
+                                   f"source/{series}/{chapter}")
+        self.sut.deleteChapter(1, "1")
+        return super().setUp()
+
+    def test_getActiveChapterKeys_onlyActiveTracked(self):
+        result = self.sut.getActiveChapterKeys()
+
+        self.assertEqual(result, {(1, "2"), (1, "10"), (2, "4.5"), (2, "5")})
+        for anilistId, chapter in result:
+            self.assertTrue(self.sut.doesExistChapterAndAnilist(anilistId, chapter))
+
+    def test_getChaptersForSeriesBeforeNumbers_sameAsOneByOne(self):
+        limits = {1: 9, 2: 4.5, 3: 100}
+
+        result = self.sut.getChaptersForSeriesBeforeNumbers(limits)
+
+        for anilistId, upTo in limits.items():
+            expected = [row["chapter"] for row in
+                        self.sut.getChaptersForSeriesBeforeNumber(anilistId, upTo)]
+            self.assertEqual(sorted(result.get(anilistId, [])), sorted(expected))
+        self.assertEqual(result[1], ["2"])
+
+    def test_getHighestChapterAndLastUpdatedForAllSeries_sameAsOneByOne(self):
+        result = self.sut.getHighestChapterAndLastUpdatedForAllSeries()
+
+        self.assertEqual(sorted(result.keys()), [1, 2])
+        for anilistId, row in result.items():
+            single = self.sut.getHighestChapterAndLastUpdatedForSeries(anilistId)
+            self.assertEqual(tuple(row), tuple(single))
+
+    def test_insertTracking_seriesWithChapters_chaptersLinked(self):
+        self.sut.insertTracking("untracked", 3)
+
+        self.assertTrue(self.sut.doesExistChapterAndAnilist(3, "1"))
+        self.assertEqual(self.sut.getAllSeriesWithoutTrackerIds(), [])
+
+    def test_insertTracking_changedId_chaptersFollow(self):
+        self.sut.insertTracking("seriesTwo", 20)
+
+        self.assertTrue(self.sut.doesExistChapterAndAnilist(20, "5"))
+        self.assertIsNone(self.sut.doesExistChapterAndAnilist(2, "5"))
+
+    def test_deleteChapters_many_sameAsOneByOne(self):
+        self.sut.deleteChapters([(1, "2"), (2, "5"), (2, "404")])
+
+        self.assertEqual(self.sut.getActiveChapterKeys(), {(1, "10"), (2, "4.5")})
+
+    def test_insertChapters_many_allLinked(self):
+        self.sut.insertChapters([("seriesOne", "11", "a11", "s11"),
+                                 ("seriesTwo", "6", "a6", "s6")])
+
+        self.assertTrue(self.sut.doesExistChapterAndAnilist(1, "11"))
+        self.assertTrue(self.sut.doesExistChapterAndAnilist(2, "6"))
+
+
+class TestDatabaseGatewayBatch(unittest.TestCase):
+    def setUp(self) -> None:
+        self.folder = tempfile.TemporaryDirectory()
+        self.location = os.path.join(self.folder.name, "test.db")
+        self.sut = DatabaseGateway(self.location, walMode=True)
+        self.sut.insertTracking("seriesOne", 1)
+        return super().setUp()
+
+    def tearDown(self) -> None:
+        self.sut.conn.close()
+        self.folder.cleanup()
+        return super().tearDown()
+
+    def __countFromOtherConnection(self):
+        other = sqlite3.connect(self.location)
+        count = other.execute("SELECT COUNT(*) FROM manga").fetchone()[0]
+        other.close()
+        return count
+
+    def test_batch_manyWrites_committedAtEnd(self):
+        with self.sut.batch():
+            for chapter in range(10):
+                self.sut.insertChapter("seriesOne", str(chapter),
+                                       f"a{chapter}", f"s{chapter}")
+                with self.sut.batch():
+                    self.sut.deleteChapter(1, str(chapter))
+            self.assertEqual(self.__countFromOtherConnection(), 0)
+
+        self.assertEqual(self.__countFromOtherConnection(), 10)
+
+    def test_batch_raises_rolledBack(self):
+        with self.assertRaises(ValueError):
+            with self.sut.batch():
+                self.sut.insertChapter("seriesOne", "1", "a1", "s1")
+                raise ValueError()
+
+        self.assertEqual(self.__countFromOtherConnection(), 0)
+        self.sut.insertChapter("seriesOne", "2", "a2", "s2")
+        self.assertEqual(self.__countFromOtherConnection(), 1)
+
+    def test_init_walMode_journalIsWal(self):
+        mode = self.sut.conn.execute("PRAGMA journal_mode").fetchone()[0]
+
+        self.assertEqual(mode, "wal")
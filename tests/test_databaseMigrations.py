@@ -15,3 +15,52 @@ class TestFilesystemGateway(unittest.TestCase):
         cursor.execute("PRAGMA user_version;")
         version = cursor.fetchone()[0]
         self.assertEqual(version, self.sut.LATEST_DB_VERSION)
+
+    def test_version4To5_existingRows_backfilled(self):
+        self.sut.LATEST_DB_VERSION = 4
+        self.sut.doMigrations(self.fakeDb)
+        self.fakeDb.executescript(
+            """
+            INSERT INTO anilist(series, anilistId) VALUES('tracked', 10);
+            INSERT INTO manga(series, chapter, archive, source)
+              VALUES('tracked', '12.5', 'a1', 's1');
+            INSERT INTO manga(series, chapter, archive, source)
+              VALUES('untracked', '3', 'a2', 's2');
+            """
+        )
+
+        self.sut.LATEST_DB_VERSION = 5
+        self.sut.doMigrations(self.fakeDb)
+
+        cursor = self.fakeDb.cursor()
+        cursor.execute(
+            """SELECT m.chapter_num, a.anilistId FROM manga m
+               LEFT JOIN anilist a ON m.anilist_ref = a.id ORDER BY m.id""")
+        self.assertEqual(cursor.fetchall(), [(12.5, 10), (3.0, None)])
+
+    def test_version6To7_chapterChanges_markSeriesDirty(self):
+        self.sut.doMigrations(self.fakeDb)
+        self.fakeDb.executescript(
+            """
+            INSERT INTO anilist(series, anilistId) VALUES('tracked', 10);
+            INSERT INTO anilist(series, anilistId) VALUES('other', 11);
+            UPDATE series_gaps SET dirty = 0;
+            INSERT INTO manga(series, chapter, archive, source, anilist_ref)
+              VALUES('tracked', '1', 'a1', 's1', 1);
+            """
+        )
+
+        cursor = self.fakeDb.cursor()
+        cursor.execute("SELECT anilistId, dirty FROM series_gaps ORDER BY anilistId")
+        self.assertEqual(cursor.fetchall(), [(10, 1)])
+
+        self.fakeDb.executescript(
+            """
+            INSERT INTO manga(series, chapter, archive, source, anilist_ref)
+              VALUES('other', '1', 'a2', 's2', 2);
+            UPDATE series_gaps SET dirty = 0;
+            UPDATE manga SET active = 0 WHERE source = 's1';
+            """
+        )
+        cursor.execute("SELECT anilistId, dirty FROM series_gaps ORDER BY anilistId")
+        self.assertEqual(cursor.fetchall(), [(10, 1), (11, 0)])
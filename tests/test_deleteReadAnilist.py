@@ -0,0 +1,38 @@
+import unittest
+from unittest.mock import MagicMock
+from manga.deleteReadAnilist import DeleteReadChapters
+from manga.gateways.utils.databaseModels import AnilistSeries
+from models.tracker import TrackerSeries
+
+
+class TestDeleteReadChapters(unittest.TestCase):
+    def setUp(self) -> None:
+        self.anilist = MagicMock()
+        self.anilist.getSnapshot = MagicMock(return_value={
+            1: TrackerSeries(1, ("title",), "RELEASING", None, "JP", 5)})
+        self.database = MagicMock()
+        self.database.getAllSeriesWithLocalFiles = MagicMock(
+            return_value=[AnilistSeries(1, "title", None)])
+        self.database.getChaptersForSeriesBeforeNumbers = MagicMock(
+            return_value={1: ["4", "5"]})
+        self.filesystem = MagicMock()
+        self.sut = DeleteReadChapters(self.anilist, self.filesystem, self.database)
+        return super().setUp()
+
+    def test_execute_deleteFails_rowsAlreadyDeactivated(self):
+        deactivated = []
+        self.database.deleteChapters = MagicMock(
+            side_effect=lambda chapters: deactivated.extend(chapters))
+        self.filesystem.deleteArchive = MagicMock(side_effect=OSError)
+
+        with self.assertRaises(OSError):
+            self.sut.execute()
+
+        self.assertEqual(deactivated, [(1, "4"), (1, "5")])
+
+    def test_execute_noSnapshot_nothingDeleted(self):
+        self.anilist.getSnapshot = MagicMock(return_value=None)
+
+        self.assertEqual(self.sut.execute(), [])
+        self.database.deleteChapters.assert_not_called()
+        self.filesystem.deleteArchive.assert_not_called()
@@ -0,0 +1,31 @@
+import unittest
+from manga.utils.filenameParser import parseFilename, parseFilenames
+
+
+class TestFilenameParser(unittest.TestCase):
+    def test_parseFilename_expectedName_fields(self):
+        result = parseFilename("Chainsaw Man v005 (2020) (Digital) (F2) (LuCaZ)")
+        self.assertEqual(
+            (result.seriesName, result.chapterNumber, result.year, result.scanInfo),
+            ("Chainsaw Man", "5", "2020", "LuCaZ"))
+
+    def test_parseFilename_noYearFractional_fields(self):
+        result = parseFilename("Some Series v00.5  (Digital) (Group Name)")
+        self.assertEqual(
+            (result.seriesName, result.chapterNumber, result.year, result.scanInfo),
+            ("Some Series", ".5", None, "Group Name"))
+
+    def test_parseFilename_unexpectedName_None(self):
+        self.assertIsNone(parseFilename("Ch. 12 - Some Title"))
+
+    def test_parseFilename_sameName_cachedRecord(self):
+        first = parseFilename("Series v1 (2021) (Digital) (Group)")
+        second = parseFilename("Series v1 (2021) (Digital) (Group)")
+        self.assertIs(first, second)
+
+    def test_parseFilenames_listing_keyedByName(self):
+        names = ["Series v1 (2021) (Digital) (Group)", "broken"]
+        result = parseFilenames(names)
+        self.assertEqual(list(result), names)
+        self.assertEqual(result[names[0]].chapterNumber, "1")
+        self.assertIsNone(result["broken"])
@@ -1,7 +1,32 @@
+import errno
+import os
 from pathlib import Path
 import shutil
 import unittest
-from manga.gateways.filesystem import FilesystemGateway
+from unittest.mock import patch
+import zipfile
+from manga.gateways.filesystem import FilesystemGateway, _renameNoReplace
+
+
+class Unseekable:
+    """Makes ZipFile write data descriptors"""
+
+    def __init__(self, file):
+        self.file = file
+
+    def write(self, data):
+        return self.file.write(data)
+
+    def flush(self):
+        self.file.flush()
+
+
+def rawRecords(archivePath):
+    """Each member's bytes, from its local header to the next member"""
+    with zipfile.ZipFile(archivePath) as archive:
+        offsets = [x.header_offset for x in archive.infolist()] + [archive.start_dir]
+    data = Path(archivePath).read_bytes()
+    return [data[start:end] for start, end in zip(offsets, offsets[1:])]
 
 
 class TestFilesystemGateway(unittest.TestCase):
@@ -134,3 +159,217 @@ class TestFilesystemGateway(unittest.TestCase):
         self.assertTrue(self.archiveSeries4QuarantineChapter2.exists())
         self.assertTrue(self.archiveSeries4QuarantineChapter1.exists())
         self.assertFalse(self.archiveSeries4Chapter1.exists())
+
+    def test_quarantine_normal_sameFolderRenamed(self):
+        inode = self.archiveSeries1.stat().st_ino
+        self.sut.quarantineSeries(self.series1)
+        self.assertEqual(self.archiveSeries1Quarantine.stat().st_ino, inode)
+
+    def test_restoreQuarantinedArchive_archiveExists_merged(self):
+        self.sut.restoreQuarantinedArchive(self.series4)
+        self.assertFalse(self.archiveSeries4Quarantine.exists())
+        self.assertTrue(self.archiveSeries4Chapter1.exists())
+        self.assertTrue(Path("/tmp/fstest/archive/seriesFour/2.cbz").exists())
+        self.assertEqual(list(self.sut.journalFolder.iterdir()), [])
+
+    def test_init_interruptedMerge_finished(self):
+        # A merge that crashed after moving one of the files
+        self.sut._FilesystemGateway__writeJournal(
+            self.archiveSeries2, self.archiveSeries4Quarantine)
+        self.archiveSeries2Chapter1.rename(
+            self.archiveSeries4Quarantine.joinpath("1.cbz"))
+
+        self.sut = FilesystemGateway(
+            sourceFolder="/tmp/fstest/source",
+            archiveFolder="/tmp/fstest/archive",
+            quarantineFolder="/tmp/fstest/quarantine",
+        )
+
+        self.assertFalse(self.archiveSeries2.exists())
+        self.assertEqual(
+            sorted(x.name for x in self.archiveSeries4Quarantine.iterdir()),
+            ["1.cbz", "2.cbz"])
+        self.assertEqual(list(self.sut.journalFolder.iterdir()), [])
+
+    def test_getQuarantinedSeries_journalAndChapters_onlySeriesIds(self):
+        Path("/tmp/fstest/quarantine/1234").mkdir()
+        Path("/tmp/fstest/quarantine/5678").write_bytes(b"")
+        self.sut.journalFolder.mkdir()
+        self.assertEqual(self.sut.getQuarantinedSeries(), [1234])
+
+    def test_renameNoReplace_targetExists_raises(self):
+        with self.assertRaises(FileExistsError):
+            _renameNoReplace(self.archiveSeries2, self.archiveSeries1)
+        self.assertTrue(self.archiveSeries2Chapter1.exists())
+        self.assertTrue(self.archiveSeries1Chapter1.exists())
+
+    def test_compressChapter_manyPages_sameBytesAsZipFileWrite(self):
+        for number in range(3, 40):
+            page = self.source1Series1Chapter1.joinpath(f"{number}.jpg")
+            page.write_bytes(os.urandom(number * 1024))
+        self.source1Series1Chapter1.joinpath(".hidden").write_bytes(b"skip")
+        expected = Path("/tmp/fstest/expected.cbz")
+        with zipfile.ZipFile(expected, "w", zipfile.ZIP_STORED) as ziphandler:
+            for root, dirs, files in os.walk(self.source1Series1Chapter1):
+                for file in files:
+                    if file.startswith("."):
+                        continue
+                    ziphandler.write(os.path.join(root, file), file)
+
+        result = Path("/tmp/fstest/archive/new/1.cbz")
+        self.sut.compress_chapter(result, self.source1Series1Chapter1)
+
+        self.assertEqual(result.read_bytes(), expected.read_bytes())
+        with zipfile.ZipFile(result) as archive:
+            self.assertIsNone(archive.testzip())
+            self.assertEqual(len(archive.namelist()), 39)
+
+    def test_compressChapter_interrupted_partialDiscarded(self):
+        result = Path("/tmp/fstest/archive/new/1.cbz")
+        self.sut.compress_chapter(result, self.source1Series1Chapter1)
+        partial = Path("/tmp/fstest/archive/new/1.cbz.part")
+        self.assertFalse(partial.exists())
+
+        partial.write_bytes(b"half an archive")
+        self.sut.discardPartialArchive(result)
+
+        self.assertFalse(partial.exists())
+        self.assertTrue(result.exists())
+
+    def test_discardPartialArchive_noPartial_nothingRaised(self):
+        self.sut.discardPartialArchive(Path("/tmp/fstest/archive/new/1.cbz"))
+
+    def test_compressChapter_windows_folderNotOpened(self):
+        result = Path("/tmp/fstest/archive/new/1.cbz")
+        with patch("os.name", "nt"), patch(
+            "os.open", side_effect=PermissionError(errno.EACCES, "Is a folder")
+        ) as folderOpen:
+            self.sut.compress_chapter(result, self.source1Series1Chapter1)
+
+        folderOpen.assert_not_called()
+        self.assertTrue(result.exists())
+
+    def test_compressChapter_comicInfo_storedInArchiveOnly(self):
+        stale = self.source1Series1Chapter1.joinpath("ComicInfo.xml")
+        stale.write_bytes(b"<ComicInfo>stale</ComicInfo>")
+        before = sorted(x.name for x in self.source1Series1Chapter1.iterdir())
+        result = Path("/tmp/fstest/archive/new/1.cbz")
+
+        self.sut.compress_chapter(result, self.source1Series1Chapter1,
+                                  comicInfo=b"<ComicInfo>new</ComicInfo>")
+
+        with zipfile.ZipFile(result) as archive:
+            self.assertIsNone(archive.testzip())
+            names = archive.namelist()
+            self.assertEqual(names[0], "ComicInfo.xml")
+            self.assertEqual(names.count("ComicInfo.xml"), 1)
+            self.assertEqual(archive.read("ComicInfo.xml"),
+                             b"<ComicInfo>new</ComicInfo>")
+        self.assertEqual(
+            sorted(x.name for x in self.source1Series1Chapter1.iterdir()), before)
+
+    def test_replaceArchiveMember_storedAndDeflated_pagesCopiedRaw(self):
+        archivePath = Path("/tmp/fstest/archive/mixed.cbz")
+        with zipfile.ZipFile(archivePath, "w") as archive:
+            archive.writestr("ComicInfo.xml", b"<ComicInfo>old</ComicInfo>")
+            archive.writestr("1.jpg", os.urandom(5000), zipfile.ZIP_STORED)
+            archive.writestr("2.txt", b"text " * 2000, zipfile.ZIP_DEFLATED)
+        with zipfile.ZipFile(archivePath) as archive:
+            before = {x.filename: (x.compress_type, x.compress_size, x.CRC)
+                      for x in archive.infolist()[1:]}
+            pages = {name: archive.read(name) for name in before}
+
+        self.sut.replaceArchiveMember(archivePath, "ComicInfo.xml", b"<ComicInfo/>")
+
+        with zipfile.ZipFile(archivePath) as archive:
+            self.assertIsNone(archive.testzip())
+            self.assertEqual(archive.namelist(), ["ComicInfo.xml", "1.jpg", "2.txt"])
+            self.assertEqual(archive.read("ComicInfo.xml"), b"<ComicInfo/>")
+            self.assertEqual(
+                {x.filename: (x.compress_type, x.compress_size, x.CRC)
+                 for x in archive.infolist()[1:]}, before)
+            self.assertEqual({name: archive.read(name) for name in before}, pages)
+        self.assertFalse(Path("/tmp/fstest/archive/mixed.cbz.part").exists())
+
+    def test_replaceArchiveMember_dataDescriptors_copied(self):
+        archivePath = Path("/tmp/fstest/archive/streamed.cbz")
+        with open(archivePath, "wb") as file:
+            with zipfile.ZipFile(Unseekable(file), "w") as archive:
+                archive.writestr("1.jpg", b"page one")
+                with archive.open("2.jpg", "w") as member:
+                    member.write(b"page two")
+        with zipfile.ZipFile(archivePath) as archive:
+            self.assertTrue(all(x.flag_bits & 0x08 for x in archive.infolist()))
+
+        records = rawRecords(archivePath)
+
+        self.sut.replaceArchiveMember(archivePath, "ComicInfo.xml", b"<ComicInfo/>")
+
+        self.assertEqual(self.sut.readArchiveMember(archivePath, "2.jpg"), b"page two")
+        with zipfile.ZipFile(archivePath) as archive:
+            self.assertIsNone(archive.testzip())
+            self.assertEqual(archive.namelist(), ["ComicInfo.xml", "1.jpg", "2.jpg"])
+        self.assertEqual(rawRecords(archivePath)[1:], records)
+
+    def test_replaceArchiveMember_zip64Extra_copied(self):
+        archivePath = Path("/tmp/fstest/archive/zip64.cbz")
+        with zipfile.ZipFile(archivePath, "w") as archive:
+            with archive.open("1.jpg", "w", force_zip64=True) as member:
+                member.write(b"page one")
+            archive.writestr("2.jpg", b"page two")
+        records = rawRecords(archivePath)
+
+        self.sut.replaceArchiveMember(archivePath, "ComicInfo.xml", b"<ComicInfo/>")
+
+        with zipfile.ZipFile(archivePath) as archive:
+            self.assertIsNone(archive.testzip())
+            self.assertEqual(archive.read("1.jpg"), b"page one")
+        self.assertEqual(rawRecords(archivePath)[1:], records)
+
+    def test_replaceArchiveMember_zip64DataDescriptor_copied(self):
+        archivePath = Path("/tmp/fstest/archive/zip64streamed.cbz")
+        with open(archivePath, "wb") as file:
+            with zipfile.ZipFile(Unseekable(file), "w") as archive:
+                with archive.open("1.jpg", "w", force_zip64=True) as member:
+                    member.write(b"page one")
+                archive.writestr("2.jpg", b"page two")
+        records = rawRecords(archivePath)
+
+        self.sut.replaceArchiveMember(archivePath, "ComicInfo.xml", b"<ComicInfo/>")
+
+        with zipfile.ZipFile(archivePath) as archive:
+            self.assertIsNone(archive.testzip())
+            self.assertEqual(archive.read("2.jpg"), b"page two")
+        self.assertEqual(rawRecords(archivePath)[1:], records)
+
+    def test_replaceArchiveMember_writeFails_partialRemoved(self):
+        archivePath = Path("/tmp/fstest/archive/full.cbz")
+        with zipfile.ZipFile(archivePath, "w") as archive:
+            archive.writestr("1.jpg", b"page one")
+
+        with patch("os.fsync", side_effect=OSError(errno.ENOSPC, "No space")):
+            with self.assertRaises(OSError):
+                self.sut.replaceArchiveMember(
+                    archivePath, "ComicInfo.xml", b"<ComicInfo/>")
+
+        self.assertFalse(Path("/tmp/fstest/archive/full.cbz.part").exists())
+        self.assertEqual(self.sut.readArchiveMember(archivePath, "1.jpg"), b"page one")
+
+    def test_replaceArchiveMember_windows_folderNotOpened(self):
+        archivePath = Path("/tmp/fstest/archive/windows.cbz")
+        with zipfile.ZipFile(archivePath, "w") as archive:
+            archive.writestr("1.jpg", b"page one")
+
+        with patch("os.name", "nt"), patch(
+            "os.open", side_effect=PermissionError(errno.EACCES, "Is a folder")
+        ) as folderOpen:
+            self.sut.replaceArchiveMember(archivePath, "ComicInfo.xml", b"<ComicInfo/>")
+
+        folderOpen.assert_not_called()
+        self.assertEqual(
+            self.sut.readArchiveMember(archivePath, "ComicInfo.xml"), b"<ComicInfo/>")
+
+    def test_readArchiveMember_missingMember_None(self):
+        archivePath = Path("/tmp/fstest/archive/new/1.cbz")
+        self.sut.compress_chapter(archivePath, self.source1Series1Chapter1)
+        self.assertIsNone(self.sut.readArchiveMember(archivePath, "ComicInfo.xml"))
@@ -0,0 +1,160 @@
+from http.client import RemoteDisconnected
+import time
+import unittest
+from unittest.mock import MagicMock, patch
+from manga.gateways.utils.httpPool import HttpConnectionPool
+from manga.gateways.utils.rateLimiter import RateLimiter
+
+
+def fakeResponse(status, headers=None, willClose=False):
+    response = MagicMock()
+    response.status = status
+    response.reason = "reason"
+    response.getheaders = MagicMock(return_value=headers or [])
+    response.read = MagicMock(return_value=b"body")
+    response.will_close = willClose
+    return response
+
+
+class TestHttpConnectionPool(unittest.TestCase):
+    def setUp(self) -> None:
+        self.sleep = MagicMock()
+        self.sut = HttpConnectionPool(retries=2, sleep=self.sleep)
+        return super().setUp()
+
+    def test_request_keepAlive_connectionReused(self):
+        connection = MagicMock()
+        connection.getresponse = MagicMock(return_value=fakeResponse(200))
+        with patch("http.client.HTTPSConnection",
+                   return_value=connection) as connectionClass:
+            self.sut.request("host", "GET", "/")
+            self.sut.request("host", "GET", "/")
+
+        self.assertEqual(connectionClass.call_count, 1)
+        self.assertEqual(connection.request.call_count, 2)
+
+    def test_request_serverCloses_newConnection(self):
+        connection = MagicMock()
+        connection.getresponse = MagicMock(
+            return_value=fakeResponse(200, willClose=True))
+        with patch("http.client.HTTPSConnection",
+                   return_value=connection) as connectionClass:
+            self.sut.request("host", "GET", "/")
+            self.sut.request("host", "GET", "/")
+
+        self.assertEqual(connectionClass.call_count, 2)
+
+    def test_request_429WithRetryAfter_waitsRetryAfter(self):
+        connection = MagicMock()
+        connection.getresponse = MagicMock(side_effect=[
+            fakeResponse(429, [("Retry-After", "7")]), fakeResponse(200)])
+        with patch("http.client.HTTPSConnection", return_value=connection):
+            result = self.sut.request("host", "GET", "/")
+
+        self.assertEqual(result.status, 200)
+        self.sleep.assert_called_once_with(7.0)
+
+    def test_request_always503_givesUpAfterRetries(self):
+        connection = MagicMock()
+        connection.getresponse = MagicMock(return_value=fakeResponse(503))
+        with patch("http.client.HTTPSConnection", return_value=connection):
+            result = self.sut.request("host", "GET", "/")
+
+        self.assertEqual(result.status, 503)
+        self.assertEqual(connection.request.call_count, 3)
+        for call in self.sleep.call_args_list:
+            self.assertLessEqual(call.args[0], 4)
+
+    def test_request_noRemaining_waitsForReset(self):
+        now = [0.0]
+        sleeps = []
+
+        def sleep(seconds):
+            sleeps.append(seconds)
+            now[0] += seconds
+        limiter = RateLimiter(clock=lambda: now[0], sleep=sleep)
+        sut = HttpConnectionPool(rateLimiter=limiter, sleep=sleep)
+        reset = str(int(time.time()) + 30)
+        connection = MagicMock()
+        connection.getresponse = MagicMock(return_value=fakeResponse(
+            200, [("X-RateLimit-Remaining", "0"), ("X-RateLimit-Reset", reset)]))
+        with patch("http.client.HTTPSConnection", return_value=connection):
+            sut.request("host", "GET", "/")
+            self.assertEqual(sleeps, [])
+            sut.request("host", "GET", "/")
+
+        self.assertGreater(sum(sleeps), 20)
+
+    def __staleKeptAlive(self, failure):
+        """A kept-alive connection failing with failure on its next request"""
+        connection = MagicMock()
+        connection.getresponse = MagicMock(return_value=fakeResponse(200))
+        fresh = MagicMock()
+        fresh.getresponse = MagicMock(return_value=fakeResponse(200))
+        with patch("http.client.HTTPSConnection", return_value=connection):
+            self.sut.request("host", "GET", "/")
+        failure(connection)
+        return connection, fresh
+
+    def test_request_postAnswerLost_notSentAgain(self):
+        def failure(connection):
+            connection.getresponse.side_effect = RemoteDisconnected("closed")
+        connection, fresh = self.__staleKeptAlive(failure)
+
+        with patch("http.client.HTTPSConnection", return_value=fresh):
+            with self.assertRaises(RemoteDisconnected):
+                self.sut.request("host", "POST", "/", "body")
+
+        self.assertEqual(connection.request.call_count, 2)
+        fresh.request.assert_not_called()
+
+    def test_request_postNotWritten_sentOnFreshConnection(self):
+        def failure(connection):
+            connection.request.side_effect = BrokenPipeError()
+        connection, fresh = self.__staleKeptAlive(failure)
+
+        with patch("http.client.HTTPSConnection", return_value=fresh):
+            result = self.sut.request("host", "POST", "/", "body")
+
+        self.assertEqual(result.status, 200)
+        fresh.request.assert_called_once()
+
+    def test_request_idempotentPostAnswerLost_sentAgain(self):
+        def failure(connection):
+            connection.getresponse.side_effect = RemoteDisconnected("closed")
+        connection, fresh = self.__staleKeptAlive(failure)
+
+        with patch("http.client.HTTPSConnection", return_value=fresh):
+            result = self.sut.request("host", "POST", "/", "body", idempotent=True)
+
+        self.assertEqual(result.status, 200)
+        fresh.request.assert_called_once()
+
+    def test_request_postRefusedConnection_retried(self):
+        connection = MagicMock()
+        connection.request = MagicMock(side_effect=[ConnectionRefusedError(), None])
+        connection.getresponse = MagicMock(return_value=fakeResponse(200))
+        with patch("http.client.HTTPSConnection", return_value=connection):
+            result = self.sut.request("host", "POST", "/", "body")
+
+        self.assertEqual(result.status, 200)
+        self.assertEqual(self.sleep.call_count, 1)
+
+    def test_request_post503_notRetried(self):
+        connection = MagicMock()
+        connection.getresponse = MagicMock(side_effect=[
+            fakeResponse(503), fakeResponse(200)])
+        with patch("http.client.HTTPSConnection", return_value=connection):
+            result = self.sut.request("host", "POST", "/", "body")
+
+        self.assertEqual(result.status, 503)
+        self.assertEqual(connection.request.call_count, 1)
+
+    def test_request_post429_retried(self):
+        connection = MagicMock()
+        connection.getresponse = MagicMock(side_effect=[
+            fakeResponse(429), fakeResponse(200)])
+        with patch("http.client.HTTPSConnection", return_value=connection):
+            result = self.sut.request("host", "POST", "/", "body")
+
+        self.assertEqual(result.status, 200)
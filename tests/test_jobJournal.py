@@ -0,0 +1,58 @@
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from manga.gateways.database import DatabaseGateway
+from manga.gateways.jobJournal import JobJournal
+from models.manga import Chapter
+
+
+class TestJobJournal(unittest.TestCase):
+    def setUp(self) -> None:
+        self.folder = tempfile.TemporaryDirectory()
+        location = os.path.join(self.folder.name, "test.db")
+        self.database = DatabaseGateway(location)
+        self.sut = JobJournal(location)
+        return super().setUp()
+
+    def tearDown(self) -> None:
+        self.sut.conn.close()
+        self.database.conn.close()
+        self.folder.cleanup()
+        return super().tearDown()
+
+    def chapter(self, number: str) -> Chapter:
+        return Chapter(7, "folder", number, "series",
+                       Path(f"/source/series/Ch {number}"),
+                       Path(f"/archive/series/Ch {number}.cbz"))
+
+    def test_advance_reopened_lastStageKept(self):
+        first, second = self.chapter("1"), self.chapter("2")
+        self.sut.begin(first)
+        self.sut.begin(second)
+        self.sut.advance([first, second], JobJournal.ARCHIVED)
+        self.sut.advance([second], JobJournal.STORED)
+
+        reopened = JobJournal(os.path.join(self.folder.name, "test.db"))
+        jobs = [(x["source"], x["archive"], x["series"], x["chapter"],
+                 x["anilistId"], x["stage"]) for x in reopened.unfinished()]
+        reopened.conn.close()
+
+        self.assertEqual(sorted(jobs), [
+            ("/source/series/Ch 1", "/archive/series/Ch 1.cbz", "series", "1", 7,
+             JobJournal.ARCHIVED),
+            ("/source/series/Ch 2", "/archive/series/Ch 2.cbz", "series", "2", 7,
+             JobJournal.STORED),
+        ])
+
+    def test_finish_begunAgain_onlyOneJob(self):
+        chapter = self.chapter("1")
+        self.sut.begin(chapter)
+        self.sut.advance([chapter], JobJournal.METADATA_WRITTEN)
+        self.sut.begin(chapter)
+        self.assertEqual([x["stage"] for x in self.sut.unfinished()],
+                         [JobJournal.PENDING])
+
+        self.sut.finish(chapter)
+
+        self.assertEqual(self.sut.unfinished(), [])
@@ -1,10 +1,19 @@
 
+from pathlib import Path
+import shutil
+import threading
 import unittest
 from unittest.mock import MagicMock
 
 from mainRunner import MainRunner
+from manga.gateways.jobJournal import JobJournalInterface
 from manga.gateways.pushover import PushServiceInterface
-from models.manga import Chapter, MissingChapter
+from models.manga import Chapter, MissingChapter, ParsedFilename
+
+
+def fakeParse(names):
+    return {x: ParsedFilename("Series", x.split("v")[-1], "2020", "scan")
+            for x in names}
 
 
 class TestMainRunner(unittest.TestCase):
@@ -60,3 +69,165 @@ class TestMainRunner(unittest.TestCase):
         gaps = [MissingChapter(1, "missingSeries", 12, 10)]
         sut.send_push(chapters, gaps)
         push.sendPush.assert_called_with(expectation)
+
+    def test_execute_pipelined_sameChaptersAsSerial(self):
+        root = Path("/tmp/mainrunnertest/source")
+        shutil.rmtree("/tmp/mainrunnertest/", ignore_errors=True)
+        for number in range(1, 21):
+            root.joinpath(f"lang/source/series/Series v{number}").mkdir(parents=True)
+
+        def run(workers):
+            database = MagicMock()
+            database.getAnilistIDForSeries = MagicMock(return_value=1)
+            database.getActiveChapterKeys = MagicMock(return_value={(1, "20")})
+            calcChapterName = MagicMock()
+            calcChapterName.calc_from_filenames = fakeParse
+            filesystem = MagicMock()
+            createMetadata = MagicMock()
+            sut = MainRunner(str(root), "/tmp/mainrunnertest/archive", database,
+                             filesystem, MagicMock(), MagicMock(), MagicMock(),
+                             calcChapterName, MagicMock(), createMetadata, workers)
+            sut.execute()
+            self.assertEqual(len(createMetadata.prefetch.call_args.args[0]), 19)
+            compressed = sorted(
+                call.args for call in filesystem.compress_chapter.call_args_list)
+            deleted = sorted(
+                call.kwargs["location"]
+                for call in filesystem.deleteFolder.call_args_list)
+            return compressed, deleted
+
+        serial = run(1)
+        pipelined = run(4)
+        shutil.rmtree("/tmp/mainrunnertest/")
+
+        self.assertEqual(len(serial[0]), 19)
+        self.assertEqual(serial, pipelined)
+
+    def test_execute_pipelined_discoveryOverlapsArchiving(self):
+        root = Path("/tmp/mainrunnertest/source")
+        shutil.rmtree("/tmp/mainrunnertest/", ignore_errors=True)
+        for number in range(1, 5):
+            root.joinpath(f"lang/source/series/Series v{number}").mkdir(parents=True)
+        firstArchived = threading.Event()
+        archivedBeforeLastFound = []
+
+        def lookup(series):
+            lookups.append(series)
+            if len(lookups) == 4:
+                # Only set by now if archiving didn't wait for discovery
+                archivedBeforeLastFound.append(firstArchived.wait(timeout=5))
+            return 1
+        lookups = []
+        database = MagicMock()
+        database.getAnilistIDForSeries = MagicMock(side_effect=lookup)
+        database.getActiveChapterKeys = MagicMock(return_value=set())
+        calcChapterName = MagicMock()
+        calcChapterName.calc_from_filenames = fakeParse
+        filesystem = MagicMock()
+        filesystem.compress_chapter = MagicMock(
+            side_effect=lambda *args, **kwargs: firstArchived.set())
+        createMetadata = MagicMock()
+        sut = MainRunner(str(root), "/tmp/mainrunnertest/archive", database,
+                         filesystem, MagicMock(), MagicMock(), MagicMock(),
+                         calcChapterName, MagicMock(), createMetadata, 2)
+        sut.PREFETCH_BATCH = 2
+
+        sut.execute()
+        shutil.rmtree("/tmp/mainrunnertest/")
+
+        self.assertEqual(archivedBeforeLastFound, [True])
+        self.assertEqual(filesystem.compress_chapter.call_count, 4)
+        self.assertEqual(
+            [len(call.args[0]) for call in createMetadata.prefetch.call_args_list],
+            [2, 2])
+
+    def test_executeFor_someMissing_onlyExistingProcessed(self):
+        root = Path("/tmp/mainrunnertest/source")
+        shutil.rmtree("/tmp/mainrunnertest/", ignore_errors=True)
+        chapter = root.joinpath("lang/source/series/Series v1")
+        chapter.mkdir(parents=True)
+        database = MagicMock()
+        database.getAnilistIDForSeries = MagicMock(return_value=1)
+        database.getActiveChapterKeys = MagicMock(return_value=set())
+        calcChapterName = MagicMock()
+        calcChapterName.calc_from_filenames = fakeParse
+        filesystem = MagicMock()
+        sut = MainRunner(str(root), "/tmp/mainrunnertest/archive", database,
+                         filesystem, MagicMock(), MagicMock(), MagicMock(),
+                         calcChapterName, MagicMock(), MagicMock())
+
+        sut.executeFor([str(chapter), str(root.joinpath("lang/source/series/gone"))])
+        shutil.rmtree("/tmp/mainrunnertest/")
+
+        calls = filesystem.compress_chapter.call_args_list
+        compressed = [call.args[1] for call in calls]
+        self.assertEqual(compressed, [chapter])
+
+    def test_execute_unfinishedJobs_resumedOrRolledBack(self):
+        root = Path("/tmp/mainrunnertest/source")
+        shutil.rmtree("/tmp/mainrunnertest/", ignore_errors=True)
+        pending = root.joinpath("lang/source/series/Series v1")
+        archived = root.joinpath("lang/source/series/Series v2")
+        pending.mkdir(parents=True)
+        archived.mkdir(parents=True)
+        jobJournal = MagicMock()
+        jobJournal.unfinished = MagicMock(return_value=[
+            {"source": str(pending), "archive": "/tmp/mainrunnertest/a/1.cbz",
+             "series": "Series", "chapter": "1", "anilistId": 1,
+             "stage": JobJournalInterface.METADATA_WRITTEN},
+            {"source": str(archived), "archive": "/tmp/mainrunnertest/a/2.cbz",
+             "series": "Series", "chapter": "2", "anilistId": 1,
+             "stage": JobJournalInterface.ARCHIVED},
+        ])
+        database = MagicMock()
+        database.getAnilistIDForSeries = MagicMock(return_value=1)
+        database.getActiveChapterKeys = MagicMock(return_value=set())
+        sourceScanner = MagicMock()
+        sourceScanner.scan = MagicMock(return_value=[])
+        calcChapterName = MagicMock()
+        calcChapterName.calc_from_filenames = fakeParse
+        filesystem = MagicMock()
+        sut = MainRunner(str(root), "/tmp/mainrunnertest/archive", database,
+                         filesystem, MagicMock(), MagicMock(), MagicMock(),
+                         calcChapterName, MagicMock(), MagicMock(), 1,
+                         sourceScanner, jobJournal)
+
+        sut.execute()
+        sut.execute()
+        shutil.rmtree("/tmp/mainrunnertest/")
+
+        filesystem.discardPartialArchive.assert_called_once_with(
+            Path("/tmp/mainrunnertest/a/1.cbz"))
+        compressed = [call.args[1]
+                      for call in filesystem.compress_chapter.call_args_list]
+        self.assertEqual(compressed, [pending])
+        stored = [call.args[0][0][:2]
+                  for call in database.insertOrReplaceChapters.call_args_list]
+        self.assertEqual(stored, [("Series", "2"), ("Series", "1")])
+        deleted = [call.kwargs["location"]
+                   for call in filesystem.deleteFolder.call_args_list]
+        self.assertEqual(deleted, [str(archived), str(pending)])
+        jobJournal.unfinished.assert_called_once()
+
+    def test_execute_generatedComicInfo_passedToArchive(self):
+        root = Path("/tmp/mainrunnertest/source")
+        shutil.rmtree("/tmp/mainrunnertest/", ignore_errors=True)
+        root.joinpath("lang/source/series/Series v1").mkdir(parents=True)
+        database = MagicMock()
+        database.getAnilistIDForSeries = MagicMock(return_value=1)
+        database.getActiveChapterKeys = MagicMock(return_value=set())
+        calcChapterName = MagicMock()
+        calcChapterName.calc_from_filenames = fakeParse
+        filesystem = MagicMock()
+        createMetadata = MagicMock()
+        createMetadata.generate = MagicMock(return_value=b"<ComicInfo/>")
+        sut = MainRunner(str(root), "/tmp/mainrunnertest/archive", database,
+                         filesystem, MagicMock(), MagicMock(), MagicMock(),
+                         calcChapterName, MagicMock(), createMetadata)
+
+        sut.execute()
+        shutil.rmtree("/tmp/mainrunnertest/")
+
+        createMetadata.execute.assert_not_called()
+        self.assertEqual(
+            filesystem.compress_chapter.call_args.kwargs["comicInfo"], b"<ComicInfo/>")
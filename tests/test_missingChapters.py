@@ -1,5 +1,9 @@
+import datetime
 import unittest
+from manga.gateways.database import DatabaseGateway
+from manga.gateways.trackerSnapshot import TrackerSnapshot
 from manga.missingChapters import CheckGapsInChapters
+from models.tracker import TrackerSeries
 from unittest.mock import MagicMock
 
 
@@ -8,32 +12,32 @@ class TestCalculateChapterName(unittest.TestCase):
         self.sut = CheckGapsInChapters(MagicMock(), MagicMock(), MagicMock())
         return super().setUp()
 
-    def test_checkConsecutive_123_True(self):
-        stub = [1, 2, 3]
-        result = self.sut._CheckGapsInChapters__checkConsecutive(stub)
-        self.assertTrue(result)
+    def __gapsIn(self, chapters):
+        """Gaps the series with chapters has, through the database's candidates
+        like getGapsFromChaptersSince counts them"""
+        database = DatabaseGateway(":memory:")
+        database.insertTracking("series", 1)
+        for chapter in chapters:
+            database.insertChapter("series", str(chapter), f"{chapter}a", f"{chapter}s")
+        candidates = database.getChapterGaps(CheckGapsInChapters.GAP_CANDIDATE)
+        return self.sut._CheckGapsInChapters__countGaps(candidates.get(1, []))
 
-    def test_checkConsecutive_321_True(self):
-        stub = [3, 2, 1]
-        result = self.sut._CheckGapsInChapters__checkConsecutive(stub)
-        self.assertTrue(result)
+    def test_countGaps_123_none(self):
+        self.assertEqual(self.__gapsIn([1, 2, 3]), 0)
 
-    def test_checkConsecutive_0d5Gap_True(self):
-        stub = [1, 1.5, 2]
-        result = self.sut._CheckGapsInChapters__checkConsecutive(stub)
-        self.assertTrue(result)
+    def test_countGaps_321_none(self):
+        self.assertEqual(self.__gapsIn([3, 2, 1]), 0)
 
-    def test_checkConsecutive_1d5Gap_False(self):
-        stub = [1, 2, 3.5]
-        result = self.sut._CheckGapsInChapters__checkConsecutive(stub)
-        self.assertFalse(result)
+    def test_countGaps_0d5Gap_none(self):
+        self.assertEqual(self.__gapsIn([1, 1.5, 2]), 0)
 
-    def test_checkConsecutive_1d1Gap_True(self):
+    def test_countGaps_1d5Gap_one(self):
+        self.assertEqual(self.__gapsIn([1, 2, 3.5]), 1)
+
+    def test_countGaps_1d1Gap_none(self):
         """Some manga have fractional chapters, generally splitting one into two (40.1, 40.2)
         Which means we can have a jump from Ch39 to Ch40.1"""
-        stub = [40.0, 41.1]
-        result = self.sut._CheckGapsInChapters__checkConsecutive(stub)
-        self.assertTrue(result)
+        self.assertEqual(self.__gapsIn([40.0, 41.1]), 0)
 
     def test_gapExistsInTrackerProgress_35prog37min_True(self):
         stub = [37.0, 38.0]
@@ -109,3 +113,109 @@ class TestCalculateChapterName(unittest.TestCase):
             alreadyQuarantined, newQuarantine
         )
         self.assertEqual(result, [])
+
+    def __buildLibrary(self):
+        database = DatabaseGateway(":memory:")
+        library = {
+            1: ("complete", 3, ["1", "2", "3", "4"]),
+            2: ("behindProgress", 1, ["6", "5"]),
+            3: ("gap", 0, ["1", "2", "4", "4.5"]),
+            4: ("split", 39, ["41.1", "40", "41.2"]),
+        }
+        tracker = dict()
+        for anilistId, (series, progress, chapters) in library.items():
+            database.insertTracking(series, anilistId)
+            for chapter in chapters:
+                database.insertChapter(series, chapter, f"{series}{chapter}a",
+                                       f"{series}{chapter}s")
+            tracker[anilistId] = TrackerSeries(
+                anilistId, [series], "RELEASING", None, "JP", progress)
+        anilist = MagicMock()
+        anilist.getSnapshot = MagicMock(return_value=TrackerSnapshot(tracker))
+        filesystem = MagicMock()
+        filesystem.getQuarantinedSeries = MagicMock(return_value=[1])
+        return database, filesystem, anilist
+
+    def __summary(self, result):
+        return [(x.tracker_id, x.series_name, x.stored_chapter, x.tracker_chapter)
+                for x in result]
+
+    def test_getGapsFromChaptersSince_database_gapsAndProgressMismatches(self):
+        database, filesystem, anilist = self.__buildLibrary()
+        sut = CheckGapsInChapters(database, filesystem, anilist)
+
+        result = sut.getGapsFromChaptersSince(datetime.datetime.utcfromtimestamp(0))
+
+        self.assertEqual(
+            self.__summary(result),
+            [(2, "behindProgress", 5.0, 1), (3, "gap", 1.0, 0)])
+        quarantined = [call.kwargs["anilistId"]
+                       for call in filesystem.quarantineSeries.call_args_list]
+        self.assertEqual(quarantined, [2, 3])
+        filesystem.restoreQuarantinedArchive.assert_called_once_with(1)
+
+    def test_getGapsFromChaptersSince_unchangedSeries_notMovedAgain(self):
+        database, filesystem, anilist = self.__buildLibrary()
+        sut = CheckGapsInChapters(database, filesystem, anilist)
+        epoch = datetime.datetime.utcfromtimestamp(0)
+        sut.getGapsFromChaptersSince(epoch)
+        filesystem.reset_mock()
+
+        result = sut.getGapsFromChaptersSince(epoch)
+
+        self.assertEqual(
+            self.__summary(result),
+            [(2, "behindProgress", 5.0, 1), (3, "gap", 1.0, 0)])
+        filesystem.quarantineSeries.assert_not_called()
+        filesystem.restoreQuarantinedArchive.assert_not_called()
+        filesystem.getQuarantinedSeries.assert_not_called()
+
+    def test_getGapsFromChaptersSince_gapFilled_onlyThatSeriesRestored(self):
+        database, filesystem, anilist = self.__buildLibrary()
+        sut = CheckGapsInChapters(database, filesystem, anilist)
+        epoch = datetime.datetime.utcfromtimestamp(0)
+        sut.getGapsFromChaptersSince(epoch)
+        filesystem.reset_mock()
+        filesystem.getQuarantinedSeries = MagicMock(return_value=[2, 3])
+
+        database.insertChapter("gap", "3", "gap3a", "gap3s")
+        result = sut.getGapsFromChaptersSince(epoch)
+
+        self.assertEqual(self.__summary(result), [(2, "behindProgress", 5.0, 1)])
+        filesystem.quarantineSeries.assert_not_called()
+        filesystem.restoreQuarantinedArchive.assert_called_once_with(3)
+        state = database.getSeriesGapState()[3]
+        self.assertEqual((state["lowest"], state["highest"], state["chapters"],
+                          state["gaps"], state["quarantined"], state["dirty"]),
+                         (1.0, 4.5, 5, 0, 0, 0))
+
+    def test_getGapsFromChaptersSince_progressChanged_reevaluated(self):
+        database, filesystem, anilist = self.__buildLibrary()
+        sut = CheckGapsInChapters(database, filesystem, anilist)
+        epoch = datetime.datetime.utcfromtimestamp(0)
+        sut.getGapsFromChaptersSince(epoch)
+        filesystem.reset_mock()
+        filesystem.getQuarantinedSeries = MagicMock(return_value=[2, 3])
+        tracker = dict(anilist.getSnapshot())
+        tracker[2] = tracker[2].replace(progress=4)
+        anilist.getSnapshot = MagicMock(return_value=TrackerSnapshot(tracker))
+
+        result = sut.getGapsFromChaptersSince(epoch)
+
+        self.assertEqual(self.__summary(result), [(3, "gap", 1.0, 0)])
+        filesystem.restoreQuarantinedArchive.assert_called_once_with(2)
+
+    def test_getGapsFromChaptersSince_full_reconcilesQuarantineFolder(self):
+        database, filesystem, anilist = self.__buildLibrary()
+        sut = CheckGapsInChapters(database, filesystem, anilist)
+        epoch = datetime.datetime.utcfromtimestamp(0)
+        sut.getGapsFromChaptersSince(epoch)
+        filesystem.reset_mock()
+        filesystem.getQuarantinedSeries = MagicMock(return_value=[2, 3, 4])
+
+        sut.getGapsFromChaptersSince(epoch, full=True)
+
+        quarantined = [call.kwargs["anilistId"]
+                       for call in filesystem.quarantineSeries.call_args_list]
+        self.assertEqual(quarantined, [2, 3])
+        filesystem.restoreQuarantinedArchive.assert_called_once_with(4)
@@ -0,0 +1,59 @@
+import pickle
+import unittest
+from pathlib import Path
+from manga.gateways.utils.databaseModels import AnilistSeries
+from models.manga import Chapter, SimpleChapter
+from models.tracker import TrackerSeries
+
+
+class TestModels(unittest.TestCase):
+    def setUp(self) -> None:
+        self.chapter = Chapter(1, "series", "12", "series", Path("/s/12"),
+                               Path("/a/12.cbz"), "scan", "2020")
+        return super().setUp()
+
+    def test_chapter_assignment_raises(self):
+        with self.assertRaises(AttributeError):
+            self.chapter.seriesName = "other"
+        with self.assertRaises(AttributeError):
+            self.chapter.other = "other"
+
+    def test_replace_someFields_copyWithChanges(self):
+        result = self.chapter.replace(anilistId=2, seriesName="other")
+
+        self.assertEqual((result.anilistId, result.seriesName, result.chapterNumber),
+                         (2, "other", "12"))
+        self.assertEqual(self.chapter.anilistId, 1)
+        with self.assertRaises(TypeError):
+            self.chapter.replace(unknown=1)
+
+    def test_hash_simpleAndFullChapter_sameKey(self):
+        self.assertEqual(SimpleChapter(1, "12"), self.chapter)
+        self.assertEqual(hash(SimpleChapter(1, "12")), hash(self.chapter))
+        self.assertIn(SimpleChapter(1, "12"), {self.chapter})
+
+    def test_hash_swappedFields_different(self):
+        self.assertNotEqual(hash(SimpleChapter(1, 2)), hash(SimpleChapter(2, 1)))
+
+    def test_pickle_chapter_sameFields(self):
+        result = pickle.loads(pickle.dumps(self.chapter))
+
+        self.assertEqual(repr(result), repr(self.chapter))
+
+    def test_trackerSeriesFromGraphQL_emptyTitles_leftOut(self):
+        media = {"id": 3, "synonyms": ["syn"], "countryOfOrigin": "KR",
+                 "title": {"english": None, "romaji": "romaji"},
+                 "status": "FINISHED", "chapters": 30}
+
+        result = TrackerSeries.fromGraphQL(media, 7)
+
+        self.assertEqual((result.tracker_id, result.titles, result.chapters,
+                          result.country_of_origin, result.progress),
+                         (3, ("romaji", "syn"), 30, "KR", 7))
+
+    def test_anilistSeriesFromRow_row_fields(self):
+        result = AnilistSeries.fromRow(
+            {"anilistId": 1, "series": "name", "mangaUpdatesId": None})
+
+        self.assertEqual((result.anilistId, result.seriesName, result.mangaUpdatesId),
+                         (1, "name", None))
@@ -0,0 +1,44 @@
+import glob
+import os
+import tempfile
+import unittest
+from manga.utils.newestEntry import newestEntryIn
+
+
+class TestNewestEntry(unittest.TestCase):
+    def setUp(self) -> None:
+        self.folder = tempfile.TemporaryDirectory()
+        return super().setUp()
+
+    def tearDown(self) -> None:
+        self.folder.cleanup()
+        return super().tearDown()
+
+    def test_newestEntryIn_hiddenEntry_sameAsGlob(self):
+        for name in ["1.cbz", "3.cbz", "2.cbz", ".hidden"]:
+            open(os.path.join(self.folder.name, name), "w").close()
+        # chmod sets ctime, making 3.cbz newest but for the hidden file
+        os.chmod(os.path.join(self.folder.name, "3.cbz"), 0o644)
+        os.chmod(os.path.join(self.folder.name, ".hidden"), 0o644)
+        expected = max(glob.glob(self.folder.name + "/*"), key=os.path.getctime)
+
+        self.assertEqual(newestEntryIn(self.folder.name), expected)
+
+    def test_newestEntryIn_empty_None(self):
+        self.assertIsNone(newestEntryIn(self.folder.name))
+
+    def test_newestEntryIn_rewrittenInPlace_seen(self):
+        first = os.path.join(self.folder.name, "1.cbz")
+        second = os.path.join(self.folder.name, "2.cbz")
+        open(first, "w").close()
+        open(second, "w").close()
+        os.chmod(second, 0o644)
+        self.assertEqual(newestEntryIn(self.folder.name), second)
+        folderTimes = os.stat(self.folder.name)
+
+        with open(first, "w") as rewritten:
+            rewritten.write("new")
+        os.utime(self.folder.name, ns=(folderTimes.st_atime_ns,
+                                       folderTimes.st_mtime_ns))
+
+        self.assertEqual(newestEntryIn(self.folder.name), first)
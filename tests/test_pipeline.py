@@ -0,0 +1,56 @@
+import threading
+import unittest
+from cross.pipeline import Pipeline, Stage
+
+
+class TestPipeline(unittest.TestCase):
+    def test_run_multipleStages_allItemsProcessed(self):
+        sut = Pipeline(
+            [
+                Stage("double", lambda x: x * 2),
+                Stage("increment", lambda x: x + 1, workers=4),
+            ],
+            queueSize=2,
+        )
+
+        result = sut.run(range(100))
+
+        self.assertEqual(sorted(result), [x * 2 + 1 for x in range(100)])
+
+    def test_run_stageReturnsNone_itemDropped(self):
+        sut = Pipeline([Stage("odd", lambda x: x if x % 2 else None, workers=3)])
+
+        result = sut.run(range(10))
+
+        self.assertEqual(sorted(result), [1, 3, 5, 7, 9])
+
+    def test_run_stageRaises_exceptionReraised(self):
+        def failOnFive(x):
+            if x == 5:
+                raise ValueError("five")
+            return x
+
+        sut = Pipeline([Stage("fail", failOnFive, workers=2)], queueSize=1)
+
+        with self.assertRaises(ValueError):
+            sut.run(range(1000))
+
+    def test_run_sourceStops_itemsAlreadyFedFinish(self):
+        seen = []
+        lock = threading.Lock()
+
+        def record(x):
+            with lock:
+                seen.append(x)
+            return x
+
+        def source():
+            yield 1
+            yield 2
+            return
+
+        sut = Pipeline([Stage("record", record, workers=2)])
+        result = sut.run(source())
+
+        self.assertEqual(sorted(result), [1, 2])
+        self.assertEqual(sorted(seen), [1, 2])
@@ -0,0 +1,61 @@
+import random
+import unittest
+from unittest.mock import patch
+from manga.utils import pylev
+from manga.utils.pylev import bounded_levenshtein, levenshtein, levenshtein_many
+
+
+class TestBoundedLevenshtein(unittest.TestCase):
+    def setUp(self) -> None:
+        rng = random.Random(7)
+        self.pairs = [
+            tuple("".join(rng.choice("abc ") for _ in range(rng.randint(0, 12)))
+                  for _ in range(2))
+            for _ in range(500)
+        ]
+        return super().setUp()
+
+    def test_boundedLevenshtein_randomPairs_sameAsFullWithinBound(self):
+        for string_1, string_2 in self.pairs:
+            distance = levenshtein(string_1, string_2)
+            for maxDistance in range(0, 8):
+                expected = distance if distance <= maxDistance else maxDistance + 1
+                self.assertEqual(
+                    bounded_levenshtein(string_1, string_2, maxDistance), expected)
+
+    def test_boundedLevenshtein_lengthDifferenceOverBound_overBound(self):
+        self.assertEqual(bounded_levenshtein("a", "abcdefgh", 3), 4)
+
+    def test_levenshteinMany_manyCandidates_sameAsOneByOne(self):
+        query = "one piece"
+        candidates = [string for pair in self.pairs for string in pair]
+
+        self.assertEqual(levenshtein_many(query, candidates),
+                         [levenshtein(query, c) for c in candidates])
+        self.assertEqual(levenshtein_many(query, candidates, 3),
+                         [min(levenshtein(query, c), 4) for c in candidates])
+
+    @unittest.skipIf(pylev.numpy is None, "numpy isn't installed")
+    def test_levenshteinMany_unicode_sameAsOneByOne(self):
+        candidates = ["Ōkami", "okami", "狼と香辛料", "", "Okami-san"] * 4
+
+        self.assertEqual(levenshtein_many("ōkami", candidates),
+                         [levenshtein("ōkami", c) for c in candidates])
+
+    @unittest.skipIf(pylev.numpy is None, "numpy isn't installed")
+    def test_levenshteinMany_numpy_sameAsBounded(self):
+        candidates = [string for pair in self.pairs for string in pair]
+        expected = dict(
+            (maxDistance, [bounded_levenshtein("ab cab", c, maxDistance)
+                           for c in candidates])
+            for maxDistance in range(0, 8)
+        )
+        unbounded = [levenshtein("ab cab", c) for c in candidates]
+
+        # Fails if the pure Python fallback is used instead of NumPy
+        with patch("manga.utils.pylev.bounded_levenshtein", side_effect=AssertionError), \
+                patch("manga.utils.pylev.levenshtein", side_effect=AssertionError):
+            for maxDistance, distances in expected.items():
+                self.assertEqual(
+                    levenshtein_many("ab cab", candidates, maxDistance), distances)
+            self.assertEqual(levenshtein_many("ab cab", candidates), unbounded)
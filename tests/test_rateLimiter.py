@@ -0,0 +1,104 @@
+import threading
+import unittest
+from manga.gateways.utils.rateLimiter import RateLimiter, TokenBucket
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+        self.sleeps = []
+
+    def clock(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class TestTokenBucket(unittest.TestCase):
+    def setUp(self) -> None:
+        self.time = FakeClock()
+        return super().setUp()
+
+    def test_acquire_withinBurst_noWait(self):
+        sut = TokenBucket(1, 3, clock=self.time.clock, sleep=self.time.sleep)
+
+        for _ in range(3):
+            sut.acquire()
+
+        self.assertEqual(self.time.sleeps, [])
+
+    def test_acquire_burstUsedUp_waitsForRate(self):
+        sut = TokenBucket(2, 2, clock=self.time.clock, sleep=self.time.sleep)
+
+        for _ in range(6):
+            sut.acquire()
+
+        self.assertAlmostEqual(sum(self.time.sleeps), 2.0)
+
+    def test_update_noneRemaining_blockedUntilReset(self):
+        sut = TokenBucket(None, clock=self.time.clock, sleep=self.time.sleep)
+
+        sut.update(remaining=0, resetIn=20)
+        sut.acquire()
+
+        self.assertAlmostEqual(sum(self.time.sleeps), 20)
+
+    def test_update_lowerRate_slowsDown(self):
+        sut = TokenBucket(60, 1, clock=self.time.clock, sleep=self.time.sleep)
+        sut.acquire()
+
+        sut.update(ratePerMinute=30)
+        sut.acquire()
+
+        self.assertAlmostEqual(sum(self.time.sleeps), 2.0)
+
+    def test_update_whileWaiting_notBlockedAndApplied(self):
+        sut = TokenBucket(0.1, 1, clock=self.time.clock, sleep=self.time.sleep)
+        sut.acquire()
+        updaters = []
+
+        def sleepWhileUpdated(seconds):
+            if not updaters:
+                updater = threading.Thread(
+                    target=sut.update, kwargs={"remaining": 0, "resetIn": 30})
+                updater.start()
+                updater.join(timeout=5)
+                updaters.append(updater)
+            self.time.sleep(seconds)
+
+        sut.sleep = sleepWhileUpdated
+        sut.acquire()
+
+        self.assertFalse(updaters[0].is_alive())
+        self.assertEqual(self.time.sleeps, [10, 20])
+
+
+class TestRateLimiter(unittest.TestCase):
+    def test_acquire_configuredHosts_independentBuckets(self):
+        time = FakeClock()
+        sut = RateLimiter(clock=time.clock, sleep=time.sleep)
+        sut.configure("one", 60, 1)
+        sut.configure("two", 60, 1)
+
+        sut.acquire("one")
+        sut.acquire("two")
+        sut.acquire("unconfigured")
+        sut.acquire("unconfigured")
+
+        self.assertEqual(time.sleeps, [])
+        sut.acquire("one")
+        self.assertAlmostEqual(sum(time.sleeps), 1.0)
+
+    def test_updateFromHeaders_limitHeader_setsRate(self):
+        time = FakeClock()
+        sut = RateLimiter(clock=time.clock, sleep=time.sleep)
+        sut.configure("host", 600, 1)
+        headers = {"X-RateLimit-Limit": "30", "X-RateLimit-Remaining": "29"}
+
+        sut.acquire("host")
+        sut.updateFromHeaders("host", headers.get)
+        sut.acquire("host")
+
+        self.assertAlmostEqual(sum(time.sleeps), 2.0)
@@ -0,0 +1,47 @@
+import unittest
+from pathlib import Path
+from unittest.mock import MagicMock
+from manga.createMetadata3 import buildComicInfo
+from manga.refreshMetadata import RefreshMetadata
+from tests.test_createMetadata3 import comicInfo
+
+
+class TestRefreshMetadata(unittest.TestCase):
+    def setUp(self) -> None:
+        self.database = MagicMock()
+        self.database.getArchivesForAllSeries = MagicMock(return_value={
+            1: ["/archive/1/1.cbz", "/archive/1/2.cbz", "/archive/1/3.cbz"],
+            2: ["/archive/2/1.cbz"],
+        })
+        self.old = comicInfo(description="Old summary")
+        self.new = comicInfo(description="New summary")
+        self.tracker = MagicMock()
+        self.tracker.search_media_by_ids = MagicMock(return_value={1: self.new})
+        self.stored = {
+            "/archive/1/1.cbz": buildComicInfo(self.old, "Series", "1", "2020", "A"),
+            "/archive/1/2.cbz": buildComicInfo(self.new, "Series", "2", None, "B"),
+            "/archive/1/3.cbz": None,
+        }
+        self.filesystem = MagicMock()
+        self.filesystem.readArchiveMember = (
+            lambda path, name: self.stored[str(path)])
+        self.sut = RefreshMetadata(self.database, self.filesystem, self.tracker, 2)
+        return super().setUp()
+
+    def test_execute_changedSeries_onlyOutdatedArchivesRewritten(self):
+        counts = self.sut.execute()
+
+        self.filesystem.replaceArchiveMember.assert_called_once_with(
+            Path("/archive/1/1.cbz"), "ComicInfo.xml",
+            buildComicInfo(self.new, "Series", "1", "2020", "A"))
+        self.assertEqual(
+            (counts["refreshed"], counts["unchanged"], counts["skipped"],
+             counts["failed"]), (1, 1, 2, 0))
+
+    def test_execute_unreadableArchive_othersStillRefreshed(self):
+        self.stored["/archive/1/2.cbz"] = b"not xml"
+
+        counts = self.sut.execute()
+
+        self.filesystem.replaceArchiveMember.assert_called_once()
+        self.assertEqual((counts["refreshed"], counts["failed"]), (1, 1))
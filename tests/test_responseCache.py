@@ -0,0 +1,113 @@
+import json
+import unittest
+from unittest.mock import MagicMock, patch
+from manga.gateways.anilist import AnilistGateway
+from manga.gateways.responseCache import ResponseCache
+
+
+class TestResponseCache(unittest.TestCase):
+    def setUp(self) -> None:
+        self.sut = ResponseCache(":memory:", maxSizeBytes=10)
+        return super().setUp()
+
+    def test_lookup_stored_returnsBodyAndEtag(self):
+        self.sut.store("key", "body", "etag")
+
+        result = self.sut.lookup("key")
+
+        self.assertEqual(result.body, "body")
+        self.assertEqual(result.etag, "etag")
+        self.assertLess(result.age(), 5)
+
+    def test_lookup_missing_None(self):
+        self.assertIsNone(self.sut.lookup("key"))
+
+    def test_invalidate_stored_removed(self):
+        self.sut.store("key", "body")
+
+        self.sut.invalidate("key")
+
+        self.assertIsNone(self.sut.lookup("key"))
+
+    def test_store_overSize_evictsLeastRecentlyUsed(self):
+        self.sut.store("first", "aaaa")
+        self.sut.store("second", "bbbb")
+        self.sut.lookup("first")
+
+        self.sut.store("third", "cccc")
+
+        self.assertIsNotNone(self.sut.lookup("first"))
+        self.assertIsNone(self.sut.lookup("second"))
+        self.assertIsNotNone(self.sut.lookup("third"))
+
+
+class TestAnilistGatewayCache(unittest.TestCase):
+    def setUp(self) -> None:
+        self.responseCache = ResponseCache(":memory:")
+        self.listResponse = {"data": {"MediaListCollection": {"lists": [
+            {"entries": [{"progress": 3, "media": {
+                "id": 1, "synonyms": [], "countryOfOrigin": "JP",
+                "title": {"romaji": "romaji", "english": "english"},
+                "status": "RELEASING", "chapters": None}}]}]}}}
+        return super().setUp()
+
+    def __fakeConnection(self, status, body, etag=None):
+        response = MagicMock()
+        response.status = status
+        response.read = MagicMock(return_value=body)
+        response.getheaders = MagicMock(
+            return_value=[] if etag is None else [("ETag", etag)])
+        connection = MagicMock()
+        connection.getresponse = MagicMock(return_value=response)
+        return connection
+
+    def test_getAllEntries_newProcess_servedFromPersistedCache(self):
+        body = json.dumps(self.listResponse).encode("utf-8")
+        with patch("http.client.HTTPSConnection",
+                   return_value=self.__fakeConnection(200, body)) as connection:
+            AnilistGateway("token", 1, self.responseCache).getAllEntries()
+            result = AnilistGateway("token", 1, self.responseCache).getAllEntries()
+
+        self.assertEqual(connection.call_count, 1)
+        self.assertEqual(result[1].progress, 3)
+
+    def test_getAllEntries_offlineNotCached_None(self):
+        with patch("http.client.HTTPSConnection") as connection:
+            sut = AnilistGateway("token", 1, self.responseCache, offline=True)
+            result = sut.getAllEntries()
+
+        connection.assert_not_called()
+        self.assertIsNone(result)
+
+    def test_getAllEntries_staleNotModified_revalidatesWithEtag(self):
+        body = json.dumps(self.listResponse).encode("utf-8")
+        with patch("http.client.HTTPSConnection",
+                   return_value=self.__fakeConnection(200, body, "v1")):
+            AnilistGateway("token", 1, self.responseCache).getAllEntries()
+
+        notModified = self.__fakeConnection(304, b"")
+        with patch("http.client.HTTPSConnection", return_value=notModified):
+            sut = AnilistGateway("token", 1, self.responseCache)
+            sut.LIST_TTL = 0
+            result = sut.getAllEntries()
+
+        headers = notModified.request.call_args.args[3]
+        self.assertEqual(headers["If-None-Match"], "v1")
+        self.assertEqual(result[1].progress, 3)
+
+    def test_getSnapshot_invalidated_persistedResponseNotServed(self):
+        first = json.dumps(self.listResponse).encode("utf-8")
+        self.listResponse["data"]["MediaListCollection"]["lists"][0]["entries"][0][
+            "progress"] = 4
+        second = json.dumps(self.listResponse).encode("utf-8")
+        responses = [self.__fakeConnection(200, first),
+                     self.__fakeConnection(200, second)]
+        with patch("http.client.HTTPSConnection",
+                   side_effect=responses) as connection:
+            sut = AnilistGateway("token", 1, self.responseCache)
+            sut.getSnapshot()
+            sut.invalidateEntries()
+            result = AnilistGateway("token", 1, self.responseCache).getSnapshot()
+
+        self.assertEqual(connection.call_count, 2)
+        self.assertEqual(result[1].progress, 4)
@@ -0,0 +1,89 @@
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from manga.gateways.database import DatabaseGateway
+from manga.sourceScanner import SourceScanner
+
+
+class TestSourceScanner(unittest.TestCase):
+    def setUp(self) -> None:
+        self.folder = tempfile.TemporaryDirectory()
+        self.root = Path(self.folder.name)
+        for series in ["Series A", "Series B"]:
+            for chapter in ["Ch 1", "Ch 2"]:
+                self.__addChapter(series, chapter)
+        self.database = DatabaseGateway(":memory:")
+        self.sut = SourceScanner(self.database, self.folder.name)
+        return super().setUp()
+
+    def tearDown(self) -> None:
+        self.folder.cleanup()
+        return super().tearDown()
+
+    def __addChapter(self, series, chapter) -> str:
+        path = self.root.joinpath("lang", "source", series, chapter)
+        path.mkdir(parents=True)
+        return str(path)
+
+    def __run(self, rescan=False, done=True):
+        paths = sorted(Path(p).relative_to(self.root).as_posix()
+                       for p in self.sut.scan(rescan=rescan))
+        if done:
+            for path in paths:
+                self.sut.markDone(str(self.root.joinpath(path)))
+        self.sut.commit()
+        return paths
+
+    def test_scan_firstRun_everyChapter(self):
+        self.assertEqual(self.__run(), [
+            "lang/source/Series A/Ch 1", "lang/source/Series A/Ch 2",
+            "lang/source/Series B/Ch 1", "lang/source/Series B/Ch 2"])
+
+    def test_scan_nothingChanged_nothing(self):
+        self.__run()
+
+        self.assertEqual(self.__run(), [])
+
+    def test_scan_newChapter_onlyNewChapter(self):
+        self.__run()
+        self.__addChapter("Series B", "Ch 3")
+
+        self.assertEqual(self.__run(), ["lang/source/Series B/Ch 3"])
+        self.assertEqual(self.__run(), [])
+
+    def __touch(self, path: Path):
+        stat = path.stat()
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+
+    def test_scan_changedChapter_onlyChangedChapter(self):
+        self.__run()
+        series = self.root.joinpath("lang", "source", "Series A")
+        series.joinpath("Ch 2", "page.png").write_bytes(b"page")
+        self.__touch(series.joinpath("Ch 2"))
+        self.__touch(series)
+
+        self.assertEqual(self.__run(), ["lang/source/Series A/Ch 2"])
+
+    def test_scan_notMarkedDone_listedAgain(self):
+        self.__run(done=False)
+
+        self.assertEqual(len(self.__run()), 4)
+        self.assertEqual(self.__run(), [])
+
+    def test_scan_rescan_everyChapter(self):
+        self.__run()
+
+        self.assertEqual(len(self.__run(rescan=True)), 4)
+
+    def test_commit_removedSeries_stateRemoved(self):
+        self.__run()
+        for chapter in ["Ch 1", "Ch 2"]:
+            self.root.joinpath("lang", "source", "Series B", chapter).rmdir()
+        self.root.joinpath("lang", "source", "Series B").rmdir()
+
+        self.__run()
+
+        self.assertEqual(
+            sorted(Path(p).name for p in self.database.getScanState()),
+            ["Ch 1", "Ch 2", "Series A"])
@@ -0,0 +1,75 @@
+import random
+import unittest
+from unittest.mock import MagicMock
+from manga.gateways.database import DatabaseGateway
+from manga.gateways.trackerSnapshot import TrackerSnapshot
+from manga.updateAnilistIds import UpdateTrackerIds
+from manga.utils.pylev import levenschtein
+from manga.utils.titleMatcher import TitleIndex
+from models.tracker import TrackerSeries
+
+
+class TestTitleIndex(unittest.TestCase):
+    def setUp(self) -> None:
+        self.entries = [
+            TrackerSeries(1, ["One Piece", "Wan Pisu"], "RELEASING", None, "JP", 0),
+            TrackerSeries(2, ["One Punch-Man", "Wanpanman"], "RELEASING", None,
+                          "JP", 0),
+            TrackerSeries(3, ["Berserk"], "RELEASING", None, "JP", 0),
+            TrackerSeries(4, ["One Piece Party"], "FINISHED", 7, "JP", 0),
+        ]
+        self.sut = TitleIndex(self.entries)
+        return super().setUp()
+
+    def test_search_bounded_closeTitlesInOrder(self):
+        matches = self.sut.search("one piece", 5)
+
+        self.assertEqual([(m.entry.tracker_id, m.title, m.distance) for m in matches],
+                         [(1, "one piece", 0)])
+
+    def test_search_unbounded_everyTitle(self):
+        matches = self.sut.search("berserk")
+
+        self.assertEqual(len(matches), 6)
+        self.assertEqual(TitleIndex.best(matches).entry.tracker_id, 3)
+
+    def test_search_randomTitles_sameAsFullScan(self):
+        rng = random.Random(4)
+        alphabet = "abcde -"
+        entries = [
+            TrackerSeries(id, ["".join(rng.choice(alphabet)
+                                       for _ in range(rng.randint(0, 14)))
+                               for _ in range(3)], "RELEASING", None, "JP", 0)
+            for id in range(60)
+        ]
+        sut = TitleIndex(entries)
+
+        for _ in range(40):
+            query = "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 14)))
+            for maxDistance in [0, 2, 4, 9]:
+                expected = [(entry.tracker_id, title.lower(),
+                             levenschtein(query, title.lower()))
+                            for entry in entries for title in entry.titles if title]
+                expected = [e for e in expected if e[2] <= maxDistance]
+                matches = sut.search(query, maxDistance)
+                self.assertEqual(
+                    [(m.entry.tracker_id, m.title, m.distance) for m in matches],
+                    expected)
+
+
+class TestUpdateTrackerIds(unittest.TestCase):
+    def test_updateAll_closeTitle_tracked(self):
+        database = DatabaseGateway(":memory:")
+        database.insertChapter("One Piece!", "1", "a1", "s1")
+        database.insertChapter("Unknown Series", "1", "a2", "s2")
+        anilist = MagicMock()
+        anilist.getSnapshot = MagicMock(return_value=TrackerSnapshot({
+            1: TrackerSeries(1, ["One Piece"], "RELEASING", None, "JP", 0),
+            3: TrackerSeries(3, ["Berserk"], "RELEASING", None, "JP", 0),
+        }))
+        sut = UpdateTrackerIds(database, anilist)
+
+        sut.updateAll()
+
+        self.assertEqual(database.getAnilistIDForSeries("One Piece!"), 1)
+        self.assertIsNone(database.getAnilistIDForSeries("Unknown Series"))
@@ -0,0 +1,38 @@
+import unittest
+from unittest.mock import MagicMock
+from cross.watcher import WatcherInterface
+from watchRunner import WatchRunner
+
+
+class FakeWatcher(WatcherInterface):
+    def __init__(self, batches, runner):
+        self.batches = list(batches)
+        self.runner = runner
+        self.closed = False
+
+    def read(self, timeout):
+        if not self.batches:
+            self.runner.stop()
+            return []
+        return self.batches.pop(0)
+
+    def close(self):
+        self.closed = True
+
+
+class TestWatchRunner(unittest.TestCase):
+    def test_run_events_catchesUpThenProcessesQuietChapters(self):
+        mainRunner = MagicMock()
+        watchers = []
+
+        def factory(root, depth):
+            watchers.append(FakeWatcher([["a", "b"], ["a"], []], sut))
+            return watchers[0]
+
+        sut = WatchRunner(mainRunner, "/source", 0, watcherFactory=factory)
+        sut.run()
+
+        mainRunner.execute.assert_called_once()
+        processed = [call.args[0] for call in mainRunner.executeFor.call_args_list]
+        self.assertEqual(processed, [["a", "b"], ["a"]])
+        self.assertTrue(watchers[0].closed)
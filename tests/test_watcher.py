@@ -0,0 +1,89 @@
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from cross.watcher import Debouncer, InotifyWatcher, PollingWatcher
+
+
+class TestDebouncer(unittest.TestCase):
+    def setUp(self) -> None:
+        self.now = 0.0
+        self.sut = Debouncer(10, clock=lambda: self.now)
+        return super().setUp()
+
+    def test_popDue_stillActive_heldBack(self):
+        self.sut.touch("a")
+        self.now = 8
+        self.sut.touch("a")
+        self.sut.touch("b")
+        self.now = 12
+
+        self.assertEqual(self.sut.popDue(), [])
+        self.assertEqual(self.sut.timeUntilDue(), 6)
+
+    def test_popDue_quiet_oldestFirstOnce(self):
+        self.sut.touch("b")
+        self.now = 1
+        self.sut.touch("a")
+        self.now = 11
+
+        self.assertEqual(self.sut.popDue(), ["b", "a"])
+        self.assertEqual(self.sut.popDue(), [])
+        self.assertIsNone(self.sut.timeUntilDue())
+
+
+class TestWatchers(unittest.TestCase):
+    def setUp(self) -> None:
+        self.folder = tempfile.TemporaryDirectory()
+        self.root = Path(self.folder.name)
+        self.series = self.root.joinpath("lang", "source", "Series")
+        self.series.joinpath("Ch 1").mkdir(parents=True)
+        return super().setUp()
+
+    def tearDown(self) -> None:
+        self.folder.cleanup()
+        return super().tearDown()
+
+    def __download(self):
+        "Like Tachiyomi, pages go to a temporary folder renamed when complete"
+        temporary = self.series.joinpath("Ch 2_tmp")
+        temporary.mkdir()
+        temporary.joinpath("001.png").write_bytes(b"page")
+        os.rename(temporary, self.series.joinpath("Ch 2"))
+        self.root.joinpath("lang", "source", "New Series", "Ch 1").mkdir(
+            parents=True)
+        self.series.joinpath("Ch 1", "002.png").write_bytes(b"page")
+
+    def __readAll(self, sut):
+        seen = set()
+        for _ in range(5):
+            found = sut.read(0.05)
+            seen.update(Path(path).relative_to(self.root).as_posix()
+                        for path in found)
+        return seen
+
+    def test_inotifyWatcher_download_chapterFolders(self):
+        try:
+            sut = InotifyWatcher(self.folder.name, 4)
+        except (OSError, AttributeError):
+            self.skipTest("inotify isn't available")
+        self.__download()
+
+        seen = self.__readAll(sut)
+        sut.close()
+
+        self.assertTrue({"lang/source/Series/Ch 1", "lang/source/Series/Ch 2",
+                         "lang/source/New Series/Ch 1"} <= seen)
+        self.assertTrue(all(path.count("/") == 3 for path in seen))
+
+    def test_pollingWatcher_download_chapterFolders(self):
+        sut = PollingWatcher(self.folder.name, 4, interval=0)
+        self.__download()
+        chapter = self.series.joinpath("Ch 1")
+        stat = chapter.stat()
+        os.utime(chapter, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+
+        seen = self.__readAll(sut)
+
+        self.assertEqual(seen, {"lang/source/Series/Ch 1", "lang/source/Series/Ch 2",
+                                "lang/source/New Series/Ch 1"})
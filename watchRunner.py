@@ -0,0 +1,57 @@
+import threading
+from typing import Callable
+from cross.decorators import Logger
+from cross.watcher import Debouncer, WatcherInterface, createWatcher
+from mainRunner import MainRunner
+
+# sourceFolder/<lang>/<source>/<series>/<chapter>
+CHAPTER_DEPTH = 4
+# Seconds between checks of stop() while nothing happens
+IDLE_WAIT = 5.0
+
+
+@Logger
+class WatchRunner:
+    """Keeps running, sending every chapter folder to MainRunner once
+    it has been quiet for debounceSeconds. The database connection and
+    tracker caches stay warm between chapters"""
+
+    def __init__(
+        self,
+        mainRunner: MainRunner,
+        sourceFolder: str,
+        debounceSeconds: float = 30,
+        watcherFactory: Callable[[str, int], WatcherInterface] = createWatcher,
+    ) -> None:
+        self.mainRunner = mainRunner
+        self.sourceFolder = sourceFolder
+        self.debounceSeconds = debounceSeconds
+        self.watcherFactory = watcherFactory
+        self.stopped = threading.Event()
+
+    def run(self, interactive=False):
+        # Watching starts before catching up, so nothing falls in between
+        watcher = self.watcherFactory(self.sourceFolder, CHAPTER_DEPTH)
+        debouncer = Debouncer(self.debounceSeconds)
+        try:
+            self.logger.info("Catching up with the source folder")
+            self.mainRunner.execute(interactive=interactive)
+            self.logger.info(f"Watching {self.sourceFolder}")
+            while not self.stopped.is_set():
+                timeout = debouncer.timeUntilDue()
+                if timeout is None:
+                    timeout = IDLE_WAIT
+                for path in watcher.read(timeout):
+                    debouncer.touch(path)
+                due = debouncer.popDue()
+                if due:
+                    self.logger.info(f"Processing {len(due)} chapters")
+                    self.mainRunner.executeFor(due, interactive=interactive)
+        except KeyboardInterrupt:
+            self.logger.info("Stopped watching")
+        finally:
+            watcher.close()
+
+    def stop(self):
+        """Stops after the chapters being processed"""
+        self.stopped.set()